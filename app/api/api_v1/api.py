@@ -1,8 +1,14 @@
 from fastapi import APIRouter
 
 from api.api_v1.endpoints import (
+    conversations,
     login,
+    pals,
+    users,
 )
 
 api_router = APIRouter()
-api_router.include_router(login.router, prefix='/oauth', tags=["login"])
\ No newline at end of file
+api_router.include_router(login.router, prefix='/oauth', tags=["login"])
+api_router.include_router(users.router, prefix='/users', tags=["users"])
+api_router.include_router(pals.router, prefix='/pals', tags=["pals"])
+api_router.include_router(conversations.router, prefix='/conversations', tags=["conversations"])
\ No newline at end of file
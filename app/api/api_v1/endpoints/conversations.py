@@ -0,0 +1,41 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud, models, schemas
+from api import deps
+from api.conditional import CachePolicy, make_etag, not_modified, representation, with_validators
+from api.sparse import adapter
+from crud.crud_conversation import CONVERSATION_SUMMARY_FIELDS
+
+router = APIRouter()
+
+CONVERSATIONS_CACHE = CachePolicy(route="read_conversations")
+
+@router.get("/", response_model=List[schemas.ConversationSummary], response_class=ORJSONResponse)
+async def read_conversations(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+) -> Response:
+    """List the current user's conversations, most recently updated first."""
+    count, last_updated_at = await crud.conversation.get_collection_version(db, current_user.id)
+    etag = make_etag(current_user.id, count, last_updated_at, representation(request))
+    if (response := not_modified(request, etag, CONVERSATIONS_CACHE)) is not None:
+        return response
+
+    rows = await crud.conversation.project(
+        db,
+        CONVERSATION_SUMMARY_FIELDS,
+        where=[models.Conversation.user_id == current_user.id],
+        order_by=[models.Conversation.updated_at.desc()],
+        skip=skip,
+        limit=limit,
+    )
+    summaries = adapter(List[schemas.ConversationSummary])
+    body = summaries.dump_python(summaries.validate_python(rows, from_attributes=True), mode="json")
+    return with_validators(ORJSONResponse(body), etag, CONVERSATIONS_CACHE)
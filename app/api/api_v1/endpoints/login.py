@@ -1,10 +1,16 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import crud, models, schemas
 from api import deps
 from core import security
+from core.log import pseudonymize
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -16,21 +22,17 @@ async def login_with_oauth2(
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    print("Received form data:", form_data.__dict__)
     user = await crud.user.authenticate(
         db, email=form_data.username, password=form_data.password
     )
     if not form_data.password or not user or not crud.user.is_active(user):
+        logger.info("Failed login", extra={"username_hash": pseudonymize(form_data.username)})
         raise HTTPException(status_code=400, detail="Login failed; incorrect email or password")
-    # check if totp active
-    refresh_token = None
-    force_totp = True
-    if not user.totp_secret:
-        force_totp = False
-        refresh_token = security.create_refresh_token(subject=user.id)
-        await crud.token.create(db=db, obj_in=refresh_token, user_obj=user)
+    refresh_token = security.create_refresh_token(subject=user.id)
+    await crud.token.create(db=db, obj_in=refresh_token, user_obj=user)
+    logger.info("Login", extra={"user_id": user.id})
     return {
-        "access_token": security.create_access_token(subject=user.id, force_totp=force_totp),
+        "access_token": security.create_access_token(subject=user.id),
         "refresh_token": refresh_token,
         "token_type": "bearer",
     }
@@ -40,23 +42,29 @@ async def signup_with_oauth2(
     db: AsyncSession = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> schemas.TokenSchema:
-    print("Received form data:", form_data.__dict__)
+    try:
+        user_in = schemas.UserCreate(
+            email=form_data.username,
+            password=form_data.password,
+            name=form_data.username.split("@")[0],
+            interests=[],
+            personality_traits={},
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors(include_url=False))
     existing_user = await crud.user.get_by_email(db, email=form_data.username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    user_in = schemas.UserCreate(
-        email=form_data.username,
-        password=form_data.password
-    )
     user = await crud.user.create(db, obj_in=user_in)
     if not user:
         raise HTTPException(status_code=400, detail="Signup failed")
     
     refresh_token = security.create_refresh_token(subject=user.id)    
     await crud.token.create(db=db, obj_in=refresh_token, user_obj=user)
+    logger.info("Signup", extra={"user_id": user.id})
     return {
         "access_token": security.create_access_token(subject=user.id),
         "refresh_token": refresh_token,
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud, models, schemas
+from api import deps
+from api.conditional import CachePolicy, make_etag, not_modified, representation, with_validators
+from api.sparse import SparseFields, render, sparse_fields
+
+router = APIRouter()
+
+PAL_ME_CACHE = CachePolicy(route="read_pal_me")
+
+@router.get("/me", response_model=schemas.Pal, response_class=ORJSONResponse)
+async def read_pal_me(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    selection: SparseFields = Depends(sparse_fields(schemas.Pal)),
+) -> Response:
+    """Get the current user's pal; polls with If-None-Match cost one indexed lookup."""
+    version = await crud.pal.get_version(db, current_user.id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Pal not found")
+    etag = make_etag(version.id, version.updated_at, representation(request))
+    if (response := not_modified(request, etag, PAL_ME_CACHE)) is not None:
+        return response
+
+    pal = await crud.pal.get_by_user_id(db, current_user.id)
+    return with_validators(render(pal, schemas.Pal, selection), etag, PAL_ME_CACHE)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud, models, schemas
+from api import deps
+from api.conditional import CachePolicy, make_etag, not_modified, representation, with_validators
+from api.sparse import SparseFields, loader_options, render, sparse_fields
+
+router = APIRouter()
+
+USER_ME_CACHE = CachePolicy(route="read_user_me")
+
+@router.get("/me", response_model=schemas.User, response_class=ORJSONResponse)
+async def read_user_me(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    selection: SparseFields = Depends(sparse_fields(schemas.User)),
+) -> Response:
+    """
+    Get the current user. Nested collections are only loaded and returned
+    when requested, e.g. ``?expand=pal,conversations.messages&fields=id,name``.
+    """
+    version = (current_user.updated_at,)
+    if selection.expand:
+        version = await crud.user.get_version(db, current_user.id, selection.expand)
+    etag = make_etag(current_user.id, *version, representation(request))
+    if (response := not_modified(request, etag, USER_ME_CACHE)) is not None:
+        return response
+
+    user = current_user
+    if selection.expand:
+        user = await crud.user.get(db, id=current_user.id, options=loader_options(models.User, selection.expand))
+    return with_validators(render(user, schemas.User, selection), etag, USER_ME_CACHE)
@@ -0,0 +1,57 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+from core.config import settings
+
+@dataclass(frozen=True, slots=True)
+class CachePolicy:
+    """
+    Cache-Control for a route. ``max_age=0`` (the default) lets clients keep
+    the body but makes them revalidate with If-None-Match on every poll.
+    Any route can be overridden by name through ``settings.HTTP_CACHE_CONTROL``.
+    """
+    route: str
+    max_age: int = 0
+    private: bool = True
+
+    @property
+    def header(self) -> str:
+        override = settings.HTTP_CACHE_CONTROL.get(self.route)
+        if override is not None:
+            return override
+        scope = "private" if self.private else "public"
+        return f"{scope}, max-age={self.max_age}" if self.max_age else f"{scope}, no-cache"
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the version parts (ids, updated_at, counts, representation)."""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def representation(request: Request) -> str:
+    # different fields/expand/paging are different bodies, so they get different tags
+    return str(sorted(request.query_params.multi_items()))
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def not_modified(request: Request, etag: str, policy: CachePolicy) -> Optional[Response]:
+    """A 304 to return as is when the client already holds ``etag``; otherwise None."""
+    if not _matches(request, etag):
+        return None
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": policy.header}
+    )
+
+def with_validators(response: Response, etag: str, policy: CachePolicy) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = policy.header
+    return response
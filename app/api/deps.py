@@ -10,7 +10,7 @@ from core.config import settings
 from db.session import SessionLocal
 
 oauth2_scheme = OAuth2PasswordBearer(
-    tokenUrl=f"{settings.API_V1_STR}/login/oauth",
+    tokenUrl=f"{settings.API_V1_STR}/oauth/oauth",
     auto_error=False
 )
 
@@ -55,25 +55,24 @@ async def get_refresh_user(
     db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> models.User:
-    async with db.begin():
-        token_payload = await get_token_payload(token)
-        if not token_payload.refresh:
-            # access token is not a valid refresh token
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Refresh token required",
-            )
-        user = await crud.user.get(db, id=token_payload.sub)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        if not crud.user.is_active(user):
-            raise HTTPException(status_code=400, detail="Inactive user")
-        # check and revoke this refresh token
-        token_obj = await crud.token.get(token=token, user=user)
-        if not token_obj:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Could not validate credentials",
-            )
-        await crud.token.remove(db, db_obj=token_obj)
+    token_payload = await get_token_payload(token)
+    if not token_payload.refresh:
+        # access token is not a valid refresh token
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Refresh token required",
+        )
+    user = await crud.user.get(db, id=token_payload.sub)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not crud.user.is_active(user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    # check and revoke this refresh token
+    token_obj = await crud.token.get(db, token=token, user=user)
+    if not token_obj:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    await crud.token.remove(db, token=token_obj)
     return user
\ No newline at end of file
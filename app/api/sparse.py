@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, FrozenSet, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from fastapi import HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model, field_validator
+
+from crud.loading import load_paths
+
+@dataclass(frozen=True, slots=True)
+class SparseFields:
+    """
+    Parsed ``fields=`` / ``expand=`` query parameters. ``fields`` limits the
+    top-level scalar fields (None means all); nested schemas are left out
+    unless named in ``expand``, as dotted paths (``conversations.messages``).
+    """
+    fields: Optional[FrozenSet[str]] = None
+    expand: FrozenSet[str] = frozenset()
+
+def _split(value: Optional[str]) -> FrozenSet[str]:
+    return frozenset(part.strip() for part in (value or "").split(",") if part.strip())
+
+def unknown_fields(schema: Type[BaseModel], fields: Optional[FrozenSet[str]], expand: FrozenSet[str]) -> FrozenSet[str]:
+    """Names in ``fields`` and dotted paths in ``expand`` that ``schema`` does not declare."""
+    unknown = set((fields or frozenset()) - set(schema.model_fields))
+    for path in expand:
+        current: Optional[Type[BaseModel]] = schema
+        for part in path.split("."):
+            info = current.model_fields.get(part) if current is not None else None
+            nested = _nested(info.annotation) if info is not None else None
+            if nested is None:
+                unknown.add(path)
+                break
+            current = nested[0]
+    return frozenset(unknown)
+
+def sparse_fields(schema: Type[BaseModel]) -> Callable[..., SparseFields]:
+    """
+    A dependency that parses ``fields=`` / ``expand=`` for responses of
+    ``schema`` and rejects names the schema does not have with a 400, before
+    the endpoint runs any query.
+    """
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated top-level fields to return"),
+        expand: Optional[str] = Query(None, description="Comma-separated nested collections to include, e.g. pal,conversations.messages"),
+    ) -> SparseFields:
+        expand_paths = _split(expand)
+        # expanding a.b implies expanding a
+        expand_paths |= {path.rsplit(".", 1)[0] for path in expand_paths if "." in path}
+        selection = SparseFields(fields=_split(fields) or None, expand=frozenset(expand_paths))
+        unknown = unknown_fields(schema, selection.fields, selection.expand)
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return selection
+    return dependency
+
+def _nested(annotation: Any) -> Optional[Tuple[Type[BaseModel], bool]]:
+    """The nested schema behind ``annotation`` and whether it is a list, or None for scalars."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (list, List) and args:
+        nested = _nested(args[0])
+        return (nested[0], True) if nested else None
+    if origin is Union:
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return _nested(members[0])
+    return None
+
+def _children(expand: FrozenSet[str], name: str) -> FrozenSet[str]:
+    prefix = f"{name}."
+    return frozenset(path[len(prefix):] for path in expand if path.startswith(prefix))
+
+@lru_cache(maxsize=512)
+def sparse_model(schema: Type[BaseModel], fields: Optional[FrozenSet[str]], expand: FrozenSet[str]) -> Type[BaseModel]:
+    """
+    A copy of ``schema`` holding only the selected fields. Unselected
+    relationships are not declared at all, so validating an ORM object never
+    touches (or lazy-loads) them. Field validators are carried over. The
+    selection is expected to be validated already (see ``sparse_fields``).
+    """
+    unknown = unknown_fields(schema, fields, expand)
+    if unknown:
+        raise ValueError(f"{schema.__name__} has no fields {', '.join(sorted(unknown))}")
+
+    definitions = {}
+    for name, info in schema.model_fields.items():
+        nested = _nested(info.annotation)
+        if nested is None:
+            if fields is None or name in fields:
+                definitions[name] = (info.annotation, info)
+            continue
+        if name not in expand:
+            continue
+        nested_schema, is_list = nested
+        sub_model = sparse_model(nested_schema, None, _children(expand, name))
+        definitions[name] = (List[sub_model] if is_list else Optional[sub_model], info.default if not is_list else [])
+
+    validators = {
+        f"_{name}": field_validator(*kept, mode=decorator.info.mode)(decorator.func.__func__)
+        for name, decorator in schema.__pydantic_decorators__.field_validators.items()
+        if (kept := [field for field in decorator.info.fields if field in definitions])
+    }
+    return create_model(
+        f"{schema.__name__}Sparse",
+        __config__=ConfigDict(from_attributes=True, populate_by_name=True),
+        __validators__=validators,
+        **definitions,
+    )
+
+@lru_cache(maxsize=512)
+def adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+def loader_options(model: Any, expand: FrozenSet[str]) -> List[Any]:
+    """Loader options that load exactly the expanded relationships of ``model``."""
+    return load_paths(model, expand)
+
+def render(obj: Any, schema: Type[BaseModel], selection: SparseFields, *, many: bool = False) -> ORJSONResponse:
+    model = sparse_model(schema, selection.fields, selection.expand)
+    type_adapter = adapter(List[model] if many else model)
+    value = type_adapter.validate_python(obj, from_attributes=True)
+    return ORJSONResponse(type_adapter.dump_python(value, mode="json"))
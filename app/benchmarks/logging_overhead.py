@@ -0,0 +1,100 @@
+"""
+Cost of logging on the event loop. Times bare logging calls and then
+/oauth/oauth throughput with logging off, with a handler writing directly
+to a file (the old blocking path) and with the queue pipeline from
+core.log. The login part needs a reachable database; run from app/:
+
+    python -m benchmarks.logging_overhead --requests 200 --concurrency 10
+    python -m benchmarks.logging_overhead --offline
+"""
+import argparse
+import asyncio
+import logging
+import queue
+import tempfile
+import time
+from random import randint
+
+import httpx
+
+from core.config import settings
+from core.log import JsonFormatter, LogListener, NonBlockingQueueHandler, dropped_records
+
+MODES = ("off", "direct", "queue")
+
+def use_mode(mode: str, path: str):
+    """Point the root logger at ``path`` the way ``mode`` does; returns a cleanup callable."""
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.setLevel(logging.WARNING if mode == "off" else logging.INFO)
+    output = logging.FileHandler(path)
+    output.setFormatter(JsonFormatter())
+    if mode == "direct":
+        root.addHandler(output)
+        return output.close
+    if mode == "queue":
+        records = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        root.addHandler(NonBlockingQueueHandler(records))
+        listener = LogListener(records, output)
+        listener.start()
+        return lambda: (listener.stop(), output.close())
+    return output.close
+
+def log_calls(calls: int, path: str) -> None:
+    logger = logging.getLogger("api.api_v1.endpoints.login")
+    for mode in MODES:
+        cleanup = use_mode(mode, path)
+        dropped = dropped_records.value
+        started = time.perf_counter()
+        for i in range(calls):
+            logger.info("Login", extra={"user_id": i, "form": {"username": "bench", "password": "secret"}})
+        elapsed = time.perf_counter() - started
+        cleanup()
+        print(
+            f"log call, {mode:<8} {elapsed / calls * 1e6:8.2f} us/call on the calling thread"
+            f"  ({dropped_records.value - dropped:.0f} dropped)"
+        )
+
+async def login_throughput(requests: int, concurrency: int, path: str) -> None:
+    from crud.crud_user import user as crud_user
+    from db.session import SessionLocal, get_engine
+    from main import create_app
+    from schemas.user import UserCreate
+
+    get_engine()
+    email, password = f"bench{randint(10**8, 10**9)}@example.com", "benchmark-password"
+    async with SessionLocal() as db:
+        await crud_user.create(db, obj_in=UserCreate(
+            email=email, password=password, name="bench", interests=[], personality_traits={},
+        ))
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login() -> None:
+            response = await client.post("/api/v1/oauth/oauth", data={"username": email, "password": password})
+            response.raise_for_status()
+
+        await login()  # warm up
+        for mode in MODES:
+            cleanup = use_mode(mode, path)
+            started = time.perf_counter()
+            for offset in range(0, requests, concurrency):
+                await asyncio.gather(*(login() for _ in range(min(concurrency, requests - offset))))
+            elapsed = time.perf_counter() - started
+            cleanup()
+            print(f"login, {mode:<8} {requests / elapsed:8.1f} req/s")
+
+def main(calls: int, requests: int, concurrency: int, offline: bool) -> None:
+    with tempfile.NamedTemporaryFile(suffix=".log") as sink:
+        log_calls(calls, sink.name)
+        if not offline:
+            asyncio.run(login_throughput(requests, concurrency, sink.name))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--offline", action="store_true", help="only time the logging calls")
+    args = parser.parse_args()
+    main(args.calls, args.requests, args.concurrency, args.offline)
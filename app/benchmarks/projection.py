@@ -0,0 +1,64 @@
+"""
+Rows per second reading a user's memories as ORM entities versus slotted
+projection rows. Needs a reachable database; run from app/:
+
+    python -m benchmarks.projection --rows 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import time
+from random import randint
+
+from sqlalchemy import delete, insert
+
+from crud.crud_conversation import conversation as crud_conversation
+from crud.crud_memory import memory as crud_memory
+from crud.crud_user import user as crud_user
+from db.session import SessionLocal, get_engine
+from models.memory import Memory
+from models.user import User
+from schemas.conversation import ConversationCreate
+from schemas.user import UserCreateDiscord
+
+engine = get_engine()
+
+async def measure(name: str, load, rows: int, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        # a fresh session each time so the identity map starts empty, as in a request
+        async with SessionLocal() as db:
+            started = time.perf_counter()
+            loaded = await load(db)
+            best = min(best, time.perf_counter() - started)
+        assert len(loaded) == rows
+    print(f"{name:<10} {rows / best:12,.0f} rows/s  ({best * 1e3:.1f} ms per {rows} rows)")
+
+async def main(rows: int, repeat: int) -> None:
+    async with SessionLocal() as db:
+        user = await crud_user.create_with_discord(db, obj_in=UserCreateDiscord(
+            discord_id=randint(10**17, 10**18), name="bench", interests=[], personality_traits={},
+        ))
+        conversation = await crud_conversation.create_with_messages(
+            db, obj_in=ConversationCreate(user_identifier=user.id, dm_channel_id=0)
+        )
+        await db.execute(insert(Memory), [
+            {"user_id": user.id, "discord_id": user.discord_id, "conversation_id": conversation.id,
+             "content": f"memory {i} " + "x" * 200, "importance": i % 10 + 1}
+            for i in range(rows)
+        ])
+        await db.commit()
+    try:
+        await measure("orm", lambda db: crud_memory.get_by_user(db, user.id, limit=rows), rows, repeat)
+        await measure("projection", lambda db: crud_memory.get_by_user_projected(db, user.id, limit=rows), rows, repeat)
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
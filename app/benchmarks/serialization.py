@@ -0,0 +1,68 @@
+"""
+Serializing a user with a large history: FastAPI's default response_model
+path versus the sparse TypeAdapter + orjson path. Runs offline on
+transient objects; run from app/:
+
+    python -m benchmarks.serialization --conversations 200 --messages 50
+"""
+import argparse
+import json
+import time
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+
+import models
+import schemas
+from api.sparse import SparseFields, render
+
+def build_user(conversations: int, messages: int) -> models.User:
+    user = models.User(
+        id=uuid4(), discord_id=1, name="bench", interests=["music", "climbing"],
+        personality_traits={"openness": 0.8}, hashed_password="hash",
+    )
+    user.pal = None
+    user.conversations = []
+    for _ in range(conversations):
+        conversation = models.Conversation(id=uuid4(), user_id=user.id, discord_id=1, title="chat", topics=["misc"], is_active=False)
+        conversation.messages = [
+            models.Message(id=uuid4(), conversation_id=conversation.id, content="hello there " * 8, is_from_user=i % 2 == 0)
+            for i in range(messages)
+        ]
+        for message in conversation.messages:
+            message.media = None
+        user.conversations.append(conversation)
+    return user
+
+def default_path(user) -> bytes:
+    # what FastAPI does for response_model=schemas.User with the default JSONResponse
+    value = schemas.User.model_validate(user)
+    return json.dumps(jsonable_encoder(value)).encode()
+
+def timed(name: str, fn, repeat: int) -> None:
+    fn()  # warm up caches
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<28} {best * 1e3:9.2f} ms  {len(body):>10,} bytes")
+
+def main(conversations: int, messages: int, repeat: int) -> None:
+    user = build_user(conversations, messages)
+    print(f"user with {conversations} conversations x {messages} messages")
+    timed("default response_model", lambda: default_path(user), repeat)
+    full = SparseFields(expand=frozenset({"pal", "conversations", "conversations.messages"}))
+    timed("sparse, fully expanded", lambda: render(user, schemas.User, full).body, repeat)
+    timed("sparse, conversations only", lambda: render(
+        user, schemas.User, SparseFields(expand=frozenset({"conversations"}))
+    ).body, repeat)
+    timed("sparse, no expansion", lambda: render(user, schemas.User, SparseFields()).body, repeat)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    main(args.conversations, args.messages, args.repeat)
@@ -0,0 +1,79 @@
+"""
+Startup time and first-request latency of the app, cold (no pool prefill,
+no warm-up) against warm (the lifespan's prefill and warm-up). Each mode
+runs in a fresh interpreter so no in-process cache carries over. Needs a
+reachable database; run from app/:
+
+    python -m benchmarks.startup --requests 20
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+MODES = ("cold", "warm")
+
+async def measure(mode: str, requests: int) -> dict:
+    started = time.perf_counter()
+    import httpx
+
+    from core import security
+    from core.config import settings
+    from crud.crud_user import user as crud_user
+    from db.session import SessionLocal
+    from main import create_app
+    from schemas.user import UserCreateDiscord
+    imported = time.perf_counter()
+
+    if mode == "cold":
+        settings.STARTUP_WARMUP = False
+        settings.POSTGRES_POOL_PREFILL = 0
+    app = create_app()
+    created = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with SessionLocal() as db:
+            user, _ = await crud_user.upsert_discord(db, obj_in=UserCreateDiscord(
+                discord_id=424242, name="bench", interests=[], personality_traits={},
+            ))
+        headers = {"Authorization": f"Bearer {security.create_access_token(subject=user.id)}"}
+        transport = httpx.ASGITransport(app=app)
+        latencies = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for _ in range(requests):
+                request_started = time.perf_counter()
+                response = await client.get(f"{settings.API_V1_STR}/users/me")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - request_started)
+    return {
+        "import_ms": (imported - started) * 1000,
+        "create_app_ms": (created - imported) * 1000,
+        "lifespan_ms": (ready - created) * 1000,
+        "first_request_ms": latencies[0] * 1000,
+        "steady_request_ms": sorted(latencies)[len(latencies) // 2] * 1000,
+    }
+
+def main(requests: int) -> None:
+    print(f"{'mode':<6} {'import':>9} {'create_app':>11} {'lifespan':>9} {'1st req':>9} {'median req':>11}  (ms)")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--mode", mode, "--requests", str(requests)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:<6} {result['import_ms']:9.1f} {result['create_app_ms']:11.1f} {result['lifespan_ms']:9.1f} "
+            f"{result['first_request_ms']:9.1f} {result['steady_request_ms']:11.1f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--mode", choices=MODES, help="measure one mode in this process and print JSON")
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(asyncio.run(measure(args.mode, args.requests))))
+    else:
+        main(args.requests)
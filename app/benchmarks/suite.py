@@ -0,0 +1,308 @@
+"""
+Load-test suite for the login router and the CRUD hot paths, at a fixed
+concurrency against a local Postgres. HTTP scenarios go through the app
+in-process (httpx's ASGI transport); the bot-side paths with no route call
+the CRUD layer directly, one session per operation. Each scenario records
+p50/p95/p99 latency and throughput; a run can be saved as a JSON baseline
+and later runs compared against it. Needs a reachable database; run from
+app/:
+
+    python -m benchmarks.suite --out baseline.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.15
+    python -m benchmarks.suite --scenario login --scenario message_tail --requests 500
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+import httpx
+
+import crud
+from core import security
+from core.config import settings
+from crud.crud_user import user as crud_user
+from db.session import SessionLocal, dispose_engine, get_engine
+from main import create_app
+from schemas.conversation import ConversationCreate, MessageCreate
+from schemas.memory import MemoryCreate
+from schemas.user import UserCreate
+from utils.user_data import get_user_context, get_user_discord_data
+
+LOGIN = f"{settings.API_V1_STR}/oauth"
+PASSWORD = "benchmark-password"
+WORDS = (
+    "coffee hiking guitar sister deadline exam garden rain movie pizza "
+    "marathon puppy piano travel tokyo camping birthday promotion recipe chess"
+).split()
+# a latency or throughput change smaller than this is noise, not a regression
+MIN_DELTA_MS = 0.5
+
+@dataclass
+class Fixture:
+    """Rows the scenarios read and write, created once per run under a unique tag."""
+    tag: str
+    client: httpx.AsyncClient
+    rng: random.Random
+    emails: List[str] = field(default_factory=list)
+    discord_ids: List[int] = field(default_factory=list)
+    user_ids: List[UUID] = field(default_factory=list)
+    conversation_ids: List[UUID] = field(default_factory=list)
+    refresh_tokens: List[str] = field(default_factory=list)
+    signups: int = 0
+
+    def pick(self, items: list, i: int):
+        return items[i % len(items)]
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+async def seed(fixture: Fixture, users: int, messages: int, memories: int) -> None:
+    rng = fixture.rng
+    for i in range(users):
+        email = f"bench-{fixture.tag}-{i}@example.com"
+        discord_id = int(fixture.tag) * 1000 + i
+        async with SessionLocal() as db:
+            user = await crud_user.create(db, obj_in=UserCreate(
+                email=email, password=PASSWORD, name=f"bench {i}", interests=rng.sample(WORDS, 3), personality_traits={},
+            ))
+            await crud_user.link_discord_account(db, user_id=user.id, discord_id=discord_id)
+            conversation = await crud.conversation.create_with_messages(
+                db, obj_in=ConversationCreate(user_identifier=discord_id, title="benchmark"),
+            )
+            await crud.conversation.add_messages(db, conversation_id=conversation.id, messages=[
+                MessageCreate(content=sentence(rng), is_from_user=j % 2 == 0) for j in range(messages)
+            ])
+            await crud.memory.create_multi_with_user(db, objs_in=[
+                MemoryCreate(
+                    user_identifier=discord_id, conversation_id=conversation.id,
+                    content=sentence(rng, 8), importance=rng.randint(1, 10),
+                )
+                for _ in range(memories)
+            ])
+        fixture.emails.append(email)
+        fixture.discord_ids.append(discord_id)
+        fixture.user_ids.append(user.id)
+        fixture.conversation_ids.append(conversation.id)
+
+async def issue_refresh_tokens(fixture: Fixture, count: int) -> None:
+    """Refresh tokens are single use, so the refresh scenario consumes one per request."""
+    async with SessionLocal() as db:
+        users = [await crud.user.get(db, user_id) for user_id in fixture.user_ids]
+        for i in range(count):
+            token = security.create_refresh_token(subject=fixture.pick(users, i).id)
+            await crud.token.create(db, obj_in=token, user_obj=fixture.pick(users, i))
+            fixture.refresh_tokens.append(token)
+
+def ok(response: httpx.Response) -> None:
+    response.raise_for_status()
+
+async def login(fixture: Fixture, i: int) -> None:
+    ok(await fixture.client.post(
+        f"{LOGIN}/oauth", data={"username": fixture.pick(fixture.emails, i), "password": PASSWORD},
+    ))
+
+async def signup(fixture: Fixture, i: int) -> None:
+    fixture.signups += 1
+    ok(await fixture.client.post(
+        f"{LOGIN}/signup", data={"username": f"signup-{fixture.tag}-{fixture.signups}@example.com", "password": PASSWORD},
+    ))
+
+async def refresh(fixture: Fixture, i: int) -> None:
+    token = fixture.refresh_tokens.pop()
+    ok(await fixture.client.post(f"{LOGIN}/refresh", headers={"Authorization": f"Bearer {token}"}))
+
+async def message_append(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await crud.conversation.add_message(
+            db, conversation_id=fixture.pick(fixture.conversation_ids, i),
+            message=MessageCreate(content=sentence(fixture.rng), is_from_user=i % 2 == 0),
+        )
+
+async def message_tail(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await crud.conversation.get_recent_messages(db, conversation_id=fixture.pick(fixture.conversation_ids, i))
+
+async def user_discord_data(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await get_user_discord_data(db, fixture.pick(fixture.discord_ids, i))
+
+async def user_context(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await get_user_context(db, fixture.pick(fixture.discord_ids, i))
+
+async def user_context_uncached(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await crud.user.get_user_context_by_discord_id(db, fixture.pick(fixture.discord_ids, i))
+
+async def memory_relevant(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await crud.memory.get_relevant(db, fixture.pick(fixture.user_ids, i), sentence(fixture.rng, 4))
+
+async def memory_by_importance(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await crud.memory.get_by_importance(db, fixture.pick(fixture.user_ids, i), min_importance=5)
+
+async def conversation_rollover(fixture: Fixture, i: int) -> None:
+    async with SessionLocal() as db:
+        await crud.conversation.create_with_messages(
+            db, obj_in=ConversationCreate(user_identifier=fixture.pick(fixture.discord_ids, i), title="rollover"),
+        )
+
+SCENARIOS: Dict[str, Callable[[Fixture, int], Awaitable[None]]] = {
+    "login": login,
+    "signup": signup,
+    "refresh": refresh,
+    "message_append": message_append,
+    "message_tail": message_tail,
+    "user_discord_data": user_discord_data,
+    "user_context": user_context,
+    "user_context_uncached": user_context_uncached,
+    "memory_relevant": memory_relevant,
+    "memory_by_importance": memory_by_importance,
+    "conversation_rollover": conversation_rollover,
+}
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+async def drive(
+    operation: Callable[[Fixture, int], Awaitable[None]], fixture: Fixture, requests: int, concurrency: int
+) -> dict:
+    """Run ``requests`` operations from ``concurrency`` workers that each start the next as soon as one ends."""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    issued = iter(range(requests))
+
+    async def worker() -> None:
+        for i in issued:
+            started = time.perf_counter()
+            try:
+                await operation(fixture, i)
+            except Exception as e:
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    result = {"requests": requests, "errors": errors, "throughput_rps": round(len(ordered) / elapsed, 1)}
+    for p in (50, 95, 99):
+        result[f"p{p}_ms"] = round(percentile(ordered, p) * 1000, 3) if ordered else None
+    return result
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(scenarios: List[str], requests: int, concurrency: int, warmup: int, seed_value: int) -> dict:
+    get_engine()
+    tag = str(int(time.time()))
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        fixture = Fixture(tag=tag, client=client, rng=random.Random(seed_value))
+        await seed(fixture, users=max(concurrency, 10), messages=200, memories=50)
+        if "refresh" in scenarios:
+            await issue_refresh_tokens(fixture, requests + warmup)
+        results = {}
+        for name in scenarios:
+            if warmup:
+                await drive(SCENARIOS[name], fixture, warmup, concurrency)
+            results[name] = await drive(SCENARIOS[name], fixture, requests, concurrency)
+            print(format_row(name, results[name]), file=sys.stderr)
+    await dispose_engine()
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "seed": seed_value,
+            "pool_size": settings.POSTGRES_POOL_SIZE,
+        },
+        "scenarios": results,
+    }
+
+def format_row(name: str, result: dict) -> str:
+    errors = sum(result["errors"].values())
+    latency = " ".join(f"{result[k]:9.2f}" if result[k] is not None else f"{'-':>9}" for k in ("p50_ms", "p95_ms", "p99_ms"))
+    return f"{name:<28} {latency} {result['throughput_rps']:9.1f} req/s  {errors} errors"
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """
+    Regressions of ``current`` against ``baseline``: a latency percentile more
+    than ``threshold`` (a fraction) higher, throughput more than ``threshold``
+    lower, or errors where the baseline had none.
+    """
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if before[key] is None or now[key] is None:
+                continue
+            if now[key] > before[key] * (1 + threshold) and now[key] - before[key] > MIN_DELTA_MS:
+                regressions.append(f"{name}: {key} {before[key]:.2f} -> {now[key]:.2f}")
+        if now["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} req/s")
+        if now["errors"] and not before["errors"]:
+            regressions.append(f"{name}: errors {now['errors']}")
+    for key in ("requests", "concurrency"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs from the baseline ({baseline['meta'].get(key)} vs {current['meta'].get(key)})", file=sys.stderr)
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="repeatable; default all")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--seed", type=int, default=0, help="seed for generated message and memory text")
+    parser.add_argument("--out", help="write this run's results to a JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a saved run; exit 1 on regressions")
+    parser.add_argument("--results", help="compare this saved run instead of running the suite")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative change, default 0.10")
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        print(f"{'scenario':<28} {'p50':>9} {'p95':>9} {'p99':>9} {'rate':>9}  (ms)", file=sys.stderr)
+        current = asyncio.run(run(args.scenario or list(SCENARIOS), args.requests, args.concurrency, args.warmup, args.seed))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Compares the load-then-update path with CRUDBase.update_by_id on
+Conversation.is_analyzed. Needs a reachable database; run from app/:
+
+    python -m benchmarks.update_path --iterations 2000
+"""
+import argparse
+import asyncio
+import time
+from random import randint
+
+from sqlalchemy import delete, event
+
+from crud.crud_conversation import conversation as crud_conversation
+from crud.crud_user import user as crud_user
+from db.session import SessionLocal, get_engine
+from models.user import User
+from schemas.conversation import ConversationCreate
+from schemas.user import UserCreateDiscord
+
+engine = get_engine()
+
+statements = 0
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+async def legacy_set_analyzed(db, conversation_id, is_analyzed):
+    # the previous implementation: get, setattr, commit, refresh
+    conversation = await crud_conversation.get(db, id=conversation_id)
+    conversation.is_analyzed = is_analyzed
+    await db.commit()
+    await db.refresh(conversation)
+    return conversation
+
+async def fetch_free_set_analyzed(db, conversation_id, is_analyzed):
+    return await crud_conversation.update_by_id(db, conversation_id, {"is_analyzed": is_analyzed})
+
+async def run(name, fn, conversation_id, iterations):
+    global statements
+    async with SessionLocal() as db:
+        await fn(db, conversation_id, True)  # warm up
+        statements = 0
+        wall, cpu = time.perf_counter(), time.process_time()
+        for i in range(iterations):
+            await fn(db, conversation_id, i % 2 == 0)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    print(
+        f"{name:<12} {wall / iterations * 1e6:9.1f} us/op wall  {cpu / iterations * 1e6:9.1f} us/op cpu  "
+        f"{statements / iterations:4.1f} statements/op"
+    )
+
+async def main(iterations: int) -> None:
+    async with SessionLocal() as db:
+        user = await crud_user.create_with_discord(db, obj_in=UserCreateDiscord(
+            discord_id=randint(10**17, 10**18), name="bench", interests=[], personality_traits={},
+        ))
+        conversation = await crud_conversation.create_with_messages(
+            db, obj_in=ConversationCreate(user_identifier=user.id, dm_channel_id=0)
+        )
+    try:
+        await run("get+update", legacy_set_analyzed, conversation.id, iterations)
+        await run("update_by_id", fetch_free_set_analyzed, conversation.id, iterations)
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().iterations))
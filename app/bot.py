@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from functools import partial
+
+import discord
+
+from core.config import settings
+from core.log import configure_logging
+from db.session import SessionLocal, dispose_engine, get_engine
+from services.ingestion import GatewayMessage, MessageIngestor, database_writer
+from services.scheduler import KeyedScheduler, MailboxFull, event_scheduler
+
+logger = logging.getLogger(__name__)
+
+class SaypalBot(discord.Client):
+    """
+    Gateway client. Events are processed in order per user (and in parallel
+    across users) by the scheduler; messages are handed to the ingestor and
+    written behind the reply path, never awaited on it.
+    """
+    def __init__(self, ingestor: MessageIngestor, scheduler: KeyedScheduler = event_scheduler, **kwargs):
+        intents = discord.Intents.default()
+        intents.message_content = True
+        super().__init__(intents=intents, **kwargs)
+        self.ingestor = ingestor
+        self.scheduler = scheduler
+
+    async def setup_hook(self) -> None:
+        self.ingestor.start()
+
+    async def close(self) -> None:
+        await super().close()
+        await self.scheduler.stop()
+        await self.ingestor.stop()
+
+    async def on_ready(self) -> None:
+        logger.info("Logged in as %s (%s)", self.user, self.user.id)
+
+    async def on_message(self, message: discord.Message) -> None:
+        if not isinstance(message.channel, discord.DMChannel):
+            return
+        event = GatewayMessage.from_discord(message, bot_user_id=self.user.id)
+        if event is None:
+            return
+        try:
+            self.scheduler.submit(event.user_discord_id, partial(self.handle_message, event))
+        except MailboxFull:
+            logger.warning("Dropping message %d: too many pending events for %d", event.message_id, event.user_discord_id)
+
+    async def handle_message(self, event: GatewayMessage) -> None:
+        await self.ingestor.submit(event)
+
+async def main() -> None:
+    if not settings.DISCORD_TOKEN:
+        raise RuntimeError("DISCORD_TOKEN is not set")
+    get_engine()
+    bot = SaypalBot(MessageIngestor(database_writer(SessionLocal)))
+    try:
+        async with bot:
+            await bot.start(settings.DISCORD_TOKEN)
+    finally:
+        await dispose_engine()
+
+if __name__ == "__main__":
+    configure_logging()
+    asyncio.run(main())
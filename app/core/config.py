@@ -2,14 +2,16 @@ import secrets
 from typing import Any, Dict, List, Optional, Union
 import os
 
-from pydantic import AnyHttpUrl, EmailStr, HttpUrl, PostgresDsn, field_validator
+from pydantic import AnyHttpUrl, EmailStr, HttpUrl, PostgresDsn, field_validator, model_validator
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "saypal"
     API_V1_STR: str = "/api/v1"
+    # JWT signing key; every process must share it, so set SECRET_KEY or SECRET_KEY_FILE in production
     SECRET_KEY: str = secrets.token_urlsafe(32)
+    SECRET_KEY_FILE: Optional[str] = None
     ACCESS_TOKEN_EXPIRE_SECONDS: int = 60 * 30 * 8 # 60 minutes * 8 hours = 8 hours (remove * 8 for 1 hour expiration in prod)
     REFRESH_TOKEN_EXPIRE_SECONDS: int = 60 * 60 * 24 * 30 # 60 minutes * 24 hours * 8 days = 8 days
     JWT_ALGO: str = "HS512"
@@ -21,14 +23,88 @@ class Settings(BaseSettings):
     # "http://localhost:8080", "http://app.qxd.ai", "https://app.qxd.ai", \]'
     #BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost", "http://localhost:4200", "http://localhost:3000", "http://localhost:8080"]
+    # SERVER SETTINGS (serve.py)
+    SERVER_BIND: str = "0.0.0.0"
+    SERVER_PORT: int = 8080
+    SERVER_WORKERS: int = 0 # 0 means one per CPU
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: float = 30.0
+    # connections all workers together may hold; each worker's pool gets an equal share
+    DB_CONNECTION_BUDGET: int = 80
+    HEALTHCHECK_TIMEOUT_SECONDS: float = 1.0
     # GENERAL SETTINGS
     MULTI_MAX: int = 20
+    USER_CONTEXT_CACHE_SIZE: int = 10_000
+    USER_CONTEXT_CACHE_TTL_SECONDS: float = 60 * 5
+    IDENTITY_CACHE_SIZE: int = 100_000
+    IDENTITY_CACHE_TTL_SECONDS: float = 60 * 5
+    IDENTITY_NEGATIVE_TTL_SECONDS: float = 30.0
+    PERSONA_CACHE_SIZE: int = 10_000
+    # send cache invalidations to the other workers over LISTEN/NOTIFY (serve.py turns it on for --workers > 1)
+    CACHE_INVALIDATION_ENABLED: bool = False
+    # run the hot queries and build cached serializers at startup (see db.warmup)
+    STARTUP_WARMUP: bool = True
+    # LOGGING SETTINGS
+    LOG_LEVEL: str = "INFO"
+    # per-logger levels, e.g. '{"sqlalchemy.engine": "INFO", "services.ingestion": "DEBUG"}'
+    LOG_LEVELS: Dict[str, str] = {"sqlalchemy.engine": "WARNING", "uvicorn.access": "WARNING"}
+    LOG_FORMAT: str = "json" # "json" or "text"
+    LOG_QUEUE_SIZE: int = 10_000
+    # METRICS SETTINGS
+    METRICS_MODE: str = "light" # "off", "light" (per-route latency and in-flight) or "full" (adds SQL hooks: DB totals, per-statement and per-request DB histograms)
+    # clients allowed to scrape /metrics; anyone else gets a 404. Empty disables the endpoint
+    METRICS_ALLOWED_NETWORKS: List[str] = ["127.0.0.0/8", "::1/128"]
+    # flag any statement shape run more than QUERY_WATCH_THRESHOLD times in one request (development only)
+    QUERY_WATCH_ENABLED: bool = False
+    QUERY_WATCH_THRESHOLD: int = 5
+    # statements slower than this are logged with their caller and parameter shapes (None disables)
+    SLOW_QUERY_THRESHOLD_MS: Optional[float] = 250.0
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_EXPLAINS_PER_MINUTE: int = 6
+    # HTTP CACHE SETTINGS
+    # per-route Cache-Control overrides, keyed by route name, e.g. '{"read_pal_me": "private, max-age=30"}'
+    HTTP_CACHE_CONTROL: Dict[str, str] = {}
+    # MEMORY SETTINGS
+    MEMORY_ACCESS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    MEMORY_ACCESS_MAX_PENDING: int = 1000
+    MEMORY_EMBEDDER: str = "hashing"
+    MEMORY_EMBEDDING_DIM: int = 256
+    MEMORY_INDEX_DIR: str = "data/memory_index"
+    MEMORY_INDEX_IVF_MIN_VECTORS: int = 50_000
+    MEMORY_INDEX_NPROBE: int = 8
+    MEMORY_INDEX_TRAIN_INTERVAL_SECONDS: float = 60.0
+    MEMORY_DEDUP_THRESHOLD: float = 0.7
+    MEMORY_DEDUP_ON_INSERT: bool = True
+    MEMORY_DEDUP_SCAN_LIMIT: int = 200
+    MEMORY_RETRIEVAL_LIMIT: int = 20
+    MEMORY_BUDGET_PER_USER: int = 500
+    MEMORY_BUDGET_BATCH_SIZE: int = 100
+    MEMORY_BUDGET_INTERVAL_SECONDS: float = 60 * 15
+    MEMORY_EVICTION_MODE: str = "archive" # "archive" keeps evicted rows in memory_archive, "delete" drops them
+    MEMORY_SCORE_HALF_LIFE_DAYS: float = 30.0
+    MEMORY_SCORE_IMPORTANCE_WEIGHT: float = 1.0
+    MEMORY_SCORE_ACCESS_WEIGHT: float = 0.5
+    MEMORY_SCORE_AGE_WEIGHT: float = 0.25
+    # DISCORD SETTINGS
+    DISCORD_TOKEN: Optional[str] = None
+    INGEST_QUEUE_SIZE: int = 10_000
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_FLUSH_INTERVAL_SECONDS: float = 0.25
+    # a failed batch is retried with exponential backoff, then parked in a bounded dead-letter buffer
+    INGEST_MAX_RETRIES: int = 3
+    INGEST_RETRY_BACKOFF_SECONDS: float = 0.5
+    INGEST_DEAD_LETTER_SIZE: int = 10_000
+    EVENT_MAX_CONCURRENCY: int = 64
+    EVENT_MAILBOX_DEPTH: int = 100
     # POSTGRESQL SETTINGS
     POSTGRES_SERVER: str = "localhost"
     POSTGRES_USER: str = "jamesqxd"
     POSTGRES_PASSWORD: Optional[str] = None
     POSTGRES_DB: str  = "saypal"
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 10
+    # connections opened at startup, before the first request
+    POSTGRES_POOL_PREFILL: int = 5
 
     @field_validator("SQLALCHEMY_DATABASE_URI")
     def assemble_db_connection(cls, v: Optional[str], info):
@@ -47,4 +123,13 @@ class Settings(BaseSettings):
         else:
             return f"postgresql+asyncpg://{user}@{host}/{db}"
 
+    @model_validator(mode="after")
+    def read_secret_key_file(self):
+        if self.SECRET_KEY_FILE:
+            with open(self.SECRET_KEY_FILE) as secret_file:
+                self.SECRET_KEY = secret_file.read().strip()
+            if not self.SECRET_KEY:
+                raise ValueError(f"SECRET_KEY_FILE {self.SECRET_KEY_FILE} is empty")
+        return self
+
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from ipaddress import ip_address, ip_network
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+from core.metrics import registry
+
+in_flight = registry.gauge("http_requests_in_flight", "Requests currently being handled")
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route", "status"]
+)
+request_db_statements = registry.histogram(
+    "http_request_db_statements", "SQL statements per request", ["route"], buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100)
+)
+request_db_seconds = registry.histogram("http_request_db_seconds", "Time in SQL per request", ["route"])
+db_statements = registry.counter("db_statements_total", "SQL statements executed")
+db_seconds = registry.counter("db_seconds_total", "Time spent executing SQL statements")
+db_statement_seconds = registry.histogram("db_statement_seconds", "Latency of single SQL statements")
+
+_ALLOWED_NETWORKS = tuple(ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+@dataclass(slots=True)
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+
+# set per request by MetricsMiddleware; SQL hooks run in the request's context and add to it
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def instrument_engine(engine: AsyncEngine, mode: str = settings.METRICS_MODE) -> None:
+    """Time every SQL statement, in ``full`` mode only: light mode adds no per-statement work."""
+    if mode != "full":
+        return
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_statements.inc()
+        db_seconds.inc(elapsed)
+        db_statement_seconds.observe(elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and in-flight requests,
+    and (in ``full`` mode) the SQL statement count and DB time of each request.
+    Outside ``full`` mode no per-request stats are collected at all.
+    Routes are labelled by their path template so label cardinality stays bounded.
+    """
+    def __init__(self, app, mode: str = settings.METRICS_MODE):
+        self.app = app
+        self.full = mode == "full"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats() if self.full else None
+        token = request_stats.set(stats)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            request_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            request_duration.labels(scope["method"], route_path, status).observe(elapsed)
+            if self.full:
+                request_db_statements.labels(route_path).observe(stats.statements)
+                request_db_seconds.labels(route_path).observe(stats.db_seconds)
+
+def metrics_allowed(client_host: Optional[str]) -> bool:
+    """Whether a client at ``client_host`` may scrape /metrics (see METRICS_ALLOWED_NETWORKS)."""
+    if client_host is None:
+        return False
+    try:
+        address = ip_address(client_host)
+    except ValueError:
+        return False
+    return any(address in network for network in _ALLOWED_NETWORKS)
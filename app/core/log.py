@@ -0,0 +1,138 @@
+import atexit
+import hashlib
+import hmac
+import logging
+import queue
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+import orjson
+
+from core.config import settings
+from core.metrics import registry
+
+dropped_records = registry.counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+REDACTED = "[redacted]"
+_SENSITIVE = re.compile(r"pass(word)?|secret|token|authorization|api_?key|cookie|totp", re.IGNORECASE)
+_SENSITIVE_PAIR = re.compile(
+    r"(['\"]?(?:\w*pass(?:word)?|\w*secret|\w*token|authorization|api_?key)['\"]?\s*[:=]\s*)"
+    # an auth scheme belongs to the value, or "Bearer" alone would be redacted and the credential kept
+    r"((?:(?:bearer|basic)\s+)?(?:'[^']*'|\"[^\"]*\"|[^\s,}]+))",
+    re.IGNORECASE,
+)
+# attributes every LogRecord has; anything else on a record came from ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName", "color_message"}
+
+def redact(value: Any) -> Any:
+    """Copy of ``value`` with the values of sensitive-looking keys replaced, recursively."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if isinstance(key, str) and _SENSITIVE.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    if isinstance(value, str):
+        return _SENSITIVE_PAIR.sub(rf"\1{REDACTED}", value)
+    return value
+
+def pseudonymize(value: str) -> str:
+    """
+    A short keyed digest of ``value`` (an email, say): stable within a
+    deployment, so repeated failures can be correlated, without logging
+    the value itself.
+    """
+    return hmac.new(settings.SECRET_KEY.encode(), value.strip().lower().encode(), hashlib.sha256).hexdigest()[:16]
+
+class RedactingFormatter(logging.Formatter):
+    """Plain-text formatter that scrubs ``key=value`` secrets from the rendered line."""
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, ``extra=`` fields and exception."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(redact(entry), default=str).decode()
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Puts records on the queue as they are; formatting (and so redaction)
+    happens on the listener thread. When the queue is full the record is
+    dropped and counted instead of blocking the caller.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+class LogListener(QueueListener):
+    """QueueListener whose stop waits for room in a full queue instead of raising."""
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+_listener: Optional[LogListener] = None
+
+def configure_logging(
+    level: str = settings.LOG_LEVEL,
+    levels: Dict[str, str] = settings.LOG_LEVELS,
+    fmt: str = settings.LOG_FORMAT,
+) -> None:
+    """
+    Route every log record (uvicorn's included) through a bounded in-memory
+    queue to a background thread that formats and writes it to stderr, so
+    logging calls on the event loop never wait on I/O. ``levels`` sets
+    per-logger levels, e.g. ``{"sqlalchemy.engine": "INFO"}``. Idempotent.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(RedactingFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(records))
+    root.setLevel(level)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = LogListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Write out whatever is still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
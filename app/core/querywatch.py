@@ -0,0 +1,157 @@
+import logging
+import re
+import sys
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+repeated_queries = registry.counter(
+    "query_watch_repeated_total", "Scopes that ran one statement shape more than the threshold", ["route"]
+)
+
+APP_ROOT = str(Path(__file__).resolve().parents[1])
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_ROWS = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_SPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=4096)
+def normalize(statement: str) -> str:
+    """
+    The shape of a SQL statement: literals and bound parameters become ``?``,
+    IN lists and multi-row VALUES collapse to one element, whitespace is folded.
+    Statements that differ only in their values have the same shape.
+    """
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?)", shape)
+    shape = _VALUES_ROWS.sub(r"\1", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+def app_stack(limit: int = 8) -> List[traceback.FrameSummary]:
+    """
+    The innermost ``limit`` frames of this codebase that led to the current
+    call. SQLAlchemy's async layer runs the DBAPI call in a child greenlet
+    whose stack ends at ``greenlet_spawn``, so the parent greenlets' frames
+    (where the awaiting coroutines are) are stitched in front of it.
+    """
+    stacks = [traceback.extract_stack(sys._getframe(1))]
+    current = greenlet.getcurrent()
+    while current.parent is not None:
+        current = current.parent
+        if current.gr_frame is not None:
+            stacks.append(traceback.extract_stack(current.gr_frame))
+    frames = [
+        frame
+        for stack in reversed(stacks)
+        for frame in stack
+        if frame.filename.startswith(APP_ROOT) and frame.filename != __file__
+    ]
+    return frames[-limit:]
+
+@dataclass(slots=True)
+class RepeatedQuery:
+    shape: str
+    count: int
+    stack: List[traceback.FrameSummary]
+
+    def format(self) -> str:
+        origin = "".join(traceback.format_list(self.stack)) or "  (no application frames)\n"
+        return f"{self.count}x {self.shape}\n{origin}"
+
+@dataclass(slots=True)
+class QueryWatch:
+    """
+    Counts statements by shape for one scope (a request or a test) and keeps
+    the application stack of the first execution of each shape. A shape run
+    more than ``threshold`` times is almost always a query issued per row.
+    """
+    threshold: int = settings.QUERY_WATCH_THRESHOLD
+    counts: Dict[str, int] = field(default_factory=dict)
+    stacks: Dict[str, List[traceback.FrameSummary]] = field(default_factory=dict)
+
+    def record(self, statement: str) -> None:
+        shape = normalize(statement)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count == 1:
+            self.stacks[shape] = app_stack()
+
+    def repeated(self) -> List[RepeatedQuery]:
+        return [
+            RepeatedQuery(shape, count, self.stacks[shape])
+            for shape, count in sorted(self.counts.items(), key=lambda item: -item[1])
+            if count > self.threshold
+        ]
+
+    def report(self) -> str:
+        return "\n".join(query.format() for query in self.repeated())
+
+# set per scope by watch_queries / QueryWatchMiddleware / the pytest plugin
+query_watch: ContextVar[Optional[QueryWatch]] = ContextVar("query_watch", default=None)
+
+def watch_engine(engine: AsyncEngine) -> None:
+    """Feed statements run on ``engine`` to the active QueryWatch, if any. Safe to call more than once."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _record):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _record)
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    watch = query_watch.get()
+    if watch is not None:
+        watch.record(statement)
+
+@contextmanager
+def watch_queries(threshold: int = settings.QUERY_WATCH_THRESHOLD) -> Iterator[QueryWatch]:
+    """Collect statement shapes run inside the block, e.g. around a script or a test."""
+    watch = QueryWatch(threshold=threshold)
+    token = query_watch.set(watch)
+    try:
+        yield watch
+    finally:
+        query_watch.reset(token)
+
+class QueryWatchMiddleware:
+    """
+    Opt-in ASGI middleware (QUERY_WATCH_ENABLED) that watches each request and
+    logs the repeated statement shapes, with where they came from, of any
+    request that crosses the threshold. Meant for development and staging:
+    capturing a stack per new shape is too costly for production traffic.
+    """
+    def __init__(self, app, threshold: int = settings.QUERY_WATCH_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with watch_queries(self.threshold) as watch:
+            await self.app(scope, receive, send)
+        repeated = watch.repeated()
+        if repeated:
+            route_path = getattr(scope.get("route"), "path", "unmatched")
+            repeated_queries.labels(route_path).inc()
+            logger.warning(
+                "%s %s ran %d statement shape(s) more than %d times:\n%s",
+                scope["method"], route_path, len(repeated), self.threshold, watch.report(),
+            )
@@ -0,0 +1,44 @@
+"""
+pytest plugin that fails any test running one SQL statement shape more than
+a threshold number of times, and prints where the statement came from.
+Enable it with ``pytest -p core.querywatch_plugin`` or
+``pytest_plugins = ["core.querywatch_plugin"]`` in a conftest.py.
+
+Only the test body is watched, not fixture setup. Raise the limit for one
+test with ``@pytest.mark.query_threshold(50)``; engines other than the
+app's own need ``core.querywatch.watch_engine``.
+"""
+import pytest
+
+from core.config import settings
+from core.querywatch import QueryWatch, query_watch, watch_engine
+
+def pytest_addoption(parser):
+    group = parser.getgroup("querywatch", "repeated SQL statement detection")
+    group.addoption(
+        "--query-threshold", type=int, default=settings.QUERY_WATCH_THRESHOLD,
+        help="fail a test that runs one statement shape more than this many times",
+    )
+    group.addoption("--no-query-watch", action="store_true", help="disable repeated statement detection")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "query_threshold(n): allow one statement shape to run up to n times")
+    if not config.getoption("no_query_watch"):
+        from db.session import get_engine
+        watch_engine(get_engine())
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    if item.config.getoption("no_query_watch"):
+        return (yield)
+    marker = item.get_closest_marker("query_threshold")
+    threshold = marker.args[0] if marker else item.config.getoption("query_threshold")
+    watch = QueryWatch(threshold=threshold)
+    token = query_watch.set(watch)
+    try:
+        result = yield
+    finally:
+        query_watch.reset(token)
+    if watch.repeated():
+        pytest.fail(f"statements repeated more than {threshold} times:\n{watch.report()}", pytrace=False)
+    return result
@@ -1,3 +1,4 @@
+import secrets
 from datetime import datetime, timedelta
 from typing import Any, Union
 
@@ -23,7 +24,8 @@ def create_refresh_token(*, subject: Union[str, Any], expires_delta: timedelta =
         expire = datetime.now() + expires_delta
     else:
         expire = datetime.now() + timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE_SECONDS)
-    to_encode = {"exp": expire, "sub": str(subject), "refresh": True}
+    # the jti keeps two refresh tokens for one user issued in the same second distinct
+    to_encode = {"exp": expire, "sub": str(subject), "refresh": True, "jti": secrets.token_urlsafe(8)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGO)
     return encoded_jwt
 
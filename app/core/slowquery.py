@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import random
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from core.config import settings
+from core.metrics import registry
+from core.querywatch import APP_ROOT, app_stack, normalize
+
+logger = logging.getLogger(__name__)
+
+slow_queries = registry.counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_THRESHOLD_MS", ["caller"])
+explains = registry.counter("db_slow_query_explains_total", "EXPLAIN captures for slow statements", ["outcome"])
+
+Sink = Callable[[Dict[str, Any]], None]
+
+def log_sink(record: Dict[str, Any]) -> None:
+    """Default sink: one JSON object per line on the ``core.slowquery`` logger."""
+    logger.warning(orjson.dumps(record, default=str).decode())
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+def parameter_shapes(parameters: Any, executemany: bool) -> Dict[str, Any]:
+    """Types (and sequence lengths) of the bound parameters, never their values."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "params": parameter_shapes(rows[0], False)["params"] if rows else []}
+    if isinstance(parameters, dict):
+        return {"params": {key: _value_shape(value) for key, value in parameters.items()}}
+    return {"params": [_value_shape(value) for value in parameters or ()]}
+
+def _module(filename: str) -> str:
+    return os.path.relpath(filename, APP_ROOT).removesuffix(".py").replace(os.sep, ".")
+
+def calling_function(stack: List[traceback.FrameSummary]) -> str:
+    """The innermost CRUD frame of ``stack``, else the innermost service frame, else the innermost frame."""
+    for package in ("crud.", "services.", ""):
+        for frame in reversed(stack):
+            module = _module(frame.filename)
+            if module.startswith(package):
+                return f"{module}.{frame.name}"
+    return "unknown"
+
+class SlowQueryLog:
+    """
+    Reports statements slower than ``threshold`` seconds to ``sink`` with
+    their parameter shapes, duration and calling CRUD function. A sample of
+    them also get an ``EXPLAIN (FORMAT JSON)`` plan, fetched in a background
+    task on a dedicated single-connection engine. Explains are limited to
+    ``explains_per_minute``, one at a time, and one per statement shape per
+    minute, so they never take a connection or time from the request that
+    was slow.
+    """
+    def __init__(
+        self,
+        threshold: float,
+        *,
+        sample_rate: float = settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+        explains_per_minute: int = settings.SLOW_QUERY_EXPLAINS_PER_MINUTE,
+        sink: Sink = log_sink,
+    ):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.explains_per_minute = explains_per_minute
+        self.sink = sink
+        self._explain_engine: Optional[AsyncEngine] = None
+        self._explain_task: Optional[asyncio.Task] = None
+        self._recent_explains: "deque[float]" = deque()
+        self._explained_shapes: Dict[str, float] = {}
+        self._engines: Set[int] = set()
+
+    def attach(self, engine: AsyncEngine) -> None:
+        if id(engine.sync_engine) in self._engines:
+            return
+        self._engines.add(id(engine.sync_engine))
+        url = engine.url
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine.sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+            if elapsed >= self.threshold:
+                self.record(url, statement, parameters, executemany, elapsed)
+
+    def record(self, url, statement: str, parameters: Any, executemany: bool, elapsed: float) -> None:
+        caller = calling_function(app_stack(limit=16))
+        slow_queries.labels(caller).inc()
+        self.sink({
+            "event": "slow_query",
+            "duration_ms": round(elapsed * 1000, 3),
+            "caller": caller,
+            "statement": statement,
+            **parameter_shapes(parameters, executemany),
+        })
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # a synchronous engine; plans are only captured under asyncio
+        if not executemany and self._should_explain(statement):
+            params = parameters if isinstance(parameters, dict) else tuple(parameters or ())
+            self._explain_task = loop.create_task(self._explain(url, statement, params, caller))
+
+    def _should_explain(self, statement: str) -> bool:
+        if self.explains_per_minute <= 0 or random.random() >= self.sample_rate:
+            return False
+        if self._explain_task is not None and not self._explain_task.done():
+            explains.labels("busy").inc()
+            return False
+        now = time.monotonic()
+        while self._recent_explains and now - self._recent_explains[0] > 60:
+            self._recent_explains.popleft()
+        shape = normalize(statement)
+        if len(self._recent_explains) >= self.explains_per_minute or now - self._explained_shapes.get(shape, -60) < 60:
+            explains.labels("rate_limited").inc()
+            return False
+        self._recent_explains.append(now)
+        self._explained_shapes[shape] = now
+        if len(self._explained_shapes) > 1000:
+            self._explained_shapes = {key: at for key, at in self._explained_shapes.items() if now - at < 60}
+        return True
+
+    async def _explain(self, url, statement: str, parameters: Any, caller: str) -> None:
+        try:
+            if self._explain_engine is None:
+                self._explain_engine = create_async_engine(url, pool_size=1, max_overflow=0)
+            async with self._explain_engine.connect() as conn:
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = result.scalar()
+        except Exception:
+            explains.labels("failed").inc()
+            logger.debug("EXPLAIN failed for slow statement from %s", caller, exc_info=True)
+            return
+        explains.labels("captured").inc()
+        self.sink({"event": "slow_query_plan", "caller": caller, "statement": statement, "plan": plan})
+
+    async def stop(self) -> None:
+        if self._explain_task is not None:
+            await asyncio.gather(self._explain_task, return_exceptions=True)
+            self._explain_task = None
+        if self._explain_engine is not None:
+            await self._explain_engine.dispose()
+            self._explain_engine = None
+
+slow_query_log = SlowQueryLog(threshold=(settings.SLOW_QUERY_THRESHOLD_MS or 0) / 1000)
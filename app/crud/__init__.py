@@ -2,4 +2,5 @@ from .crud_user import user
 from .crud_conversation import conversation
 from .crud_pal import pal
 from .crud_memory import memory
+from .crud_media import media
 from .crud_token import token
\ No newline at end of file
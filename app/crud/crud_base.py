@@ -1,11 +1,17 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from uuid import uuid4
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import Boolean, any_, bindparam, func, literal_column, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from crud.loading import profile_options
+from crud.projection import projection
 from db.base_class import Base
+from schemas.patch import JSONBPatch
+from utils.jsonb import jsonb_patch
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -14,18 +20,45 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
-        print(f"CRUDBase: model: {model}")
 
-    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
-        result = await db.execute(select(self.model).filter(self.model.id == id))
+    async def get(
+        self, db: AsyncSession, id: Any, *, profile: Optional[str] = None, options: Sequence[Any] = ()
+    ) -> Optional[ModelType]:
+        query = select(self.model).filter(self.model.id == id)
+        query = query.options(*profile_options(self.model, profile), *options)
+        result = await db.execute(query)
         return result.scalars().first()
 
+    async def get_many(self, db: AsyncSession, keys: Sequence[Any], *, column: str = "id") -> Dict[Any, ModelType]:
+        """Load rows whose ``column`` is in ``keys`` with one ``= ANY(...)`` query, keyed by that column."""
+        self._check_columns([column])
+        attribute = getattr(self.model, column)
+        keys_param = bindparam("keys", list(keys), type_=ARRAY(self.model.__table__.c[column].type))
+        result = await db.execute(select(self.model).where(attribute == any_(keys_param)))
+        return {getattr(obj, column): obj for obj in result.scalars().all()}
+
     async def get_multi(
-        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100, profile: Optional[str] = None
     ) -> List[ModelType]:
-        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        query = select(self.model).options(*profile_options(self.model, profile)).offset(skip).limit(limit)
+        result = await db.execute(query)
         return result.scalars().all()
 
+    async def project(
+        self,
+        db: AsyncSession,
+        fields: Sequence[str],
+        *,
+        where: Sequence[Any] = (),
+        order_by: Sequence[Any] = (),
+        skip: int = 0,
+        limit: Optional[int] = 100,
+    ) -> List[Any]:
+        """Read only ``fields`` of matching rows as lightweight slotted rows (see crud.projection)."""
+        view = projection(self.model, fields)
+        query = view.select().where(*where).order_by(*order_by).offset(skip).limit(limit)
+        return view.rows(await db.execute(query))
+
     async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data) 
@@ -41,19 +74,135 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        columns = self.model.__mapper__.columns
+        for field, value in update_data.items():
+            if field in columns:
+                setattr(db_obj, field, value)
         db.add(db_obj)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
 
+    def _check_columns(self, fields) -> None:
+        unknown = [field for field in fields if field not in self.model.__mapper__.columns]
+        if unknown:
+            raise ValueError(f"Unknown {self.model.__name__} columns: {', '.join(unknown)}")
+
+    async def update_where(
+        self,
+        db: AsyncSession,
+        *,
+        where: List[Any],
+        values: Dict[str, Any],
+        returning: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        """
+        Update every matching row in one UPDATE ... RETURNING, without loading
+        anything first. Returns the updated ORM objects, or just the
+        ``returning`` columns as lightweight rows when given.
+        """
+        self._check_columns(values)
+        stmt = update(self.model).where(*where).values(values)
+        if returning is None:
+            stmt = stmt.returning(self.model).execution_options(populate_existing=True)
+            rows = (await db.scalars(stmt)).all()
+        else:
+            self._check_columns(returning)
+            stmt = stmt.returning(*(getattr(self.model, field) for field in returning))
+            rows = (await db.execute(stmt)).all()
+        await db.commit()
+        return rows
+
+    async def update_by_id(
+        self,
+        db: AsyncSession,
+        id: Any,
+        values: Dict[str, Any],
+        *,
+        returning: Optional[Sequence[str]] = None,
+    ) -> Optional[Any]:
+        rows = await self.update_where(db, where=[self.model.id == id], values=values, returning=returning)
+        return rows[0] if rows else None
+
+    async def upsert(
+        self,
+        db: AsyncSession,
+        *,
+        values: Dict[str, Any],
+        conflict: Sequence[str],
+        update_fields: Sequence[str] = (),
+    ) -> Tuple[ModelType, bool]:
+        """
+        INSERT ... ON CONFLICT (``conflict``) ... RETURNING, so concurrent
+        callers racing on the same key all get the one row back without an
+        error. On conflict only ``update_fields`` are overwritten (DO UPDATE).
+        With none it is DO NOTHING, which writes no row version and takes no
+        row lock, and a loser reads the winner's row by the conflict key.
+        Returns the row and whether this call inserted it.
+        """
+        self._check_columns(values)
+        self._check_columns(update_fields)
+        stmt = insert(self.model).values(values)
+        if not update_fields:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict)).returning(self.model)
+            existing = select(self.model).where(*(getattr(self.model, field) == values[field] for field in conflict))
+            while True:
+                db_obj = (await db.scalars(stmt)).first()
+                if db_obj is not None:
+                    await db.commit()
+                    return db_obj, True
+                # the conflicting row is committed (ON CONFLICT waited for it), so a new snapshot sees it
+                db_obj = (await db.scalars(existing.execution_options(populate_existing=True))).first()
+                if db_obj is not None:
+                    await db.commit()
+                    return db_obj, False
+                # deleted between the two statements: insert again
+
+        set_ = {field: stmt.excluded[field] for field in update_fields}
+        if "updated_at" in self.model.__mapper__.columns:
+            set_["updated_at"] = func.now()
+        stmt = (
+            stmt.on_conflict_do_update(index_elements=list(conflict), set_=set_)
+            .returning(self.model, literal_column("xmax = 0", Boolean).label("inserted"))
+            .execution_options(populate_existing=True)
+        )
+        db_obj, inserted = (await db.execute(stmt)).one()
+        await db.commit()
+        return db_obj, inserted
+
+    async def patch_json(
+        self, db: AsyncSession, *, where: List[Any], patches: Dict[str, Optional[JSONBPatch]]
+    ) -> Optional[ModelType]:
+        """
+        Apply JSONB patches to the matching row in a single UPDATE ... RETURNING,
+        without loading it first. Returns the updated row, or None if none matched.
+        """
+        values = {}
+        for field, patch in patches.items():
+            if patch is None or patch.is_empty:
+                continue
+            column = self.model.__table__.c.get(field)
+            if column is None or not isinstance(column.type, JSONB):
+                raise ValueError(f"{self.model.__name__}.{field} is not a JSONB column")
+            values[field] = jsonb_patch(column, patch)
+        if not values:
+            result = await db.execute(select(self.model).where(*where))
+            return result.scalars().first()
+        stmt = (
+            update(self.model)
+            .where(*where)
+            .values(values)
+            .returning(self.model)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        db_obj = (await db.scalars(stmt)).first()
+        await db.commit()
+        return db_obj
+
     async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
         obj = await db.get(self.model, id)
         await db.delete(obj)
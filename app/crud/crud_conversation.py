@@ -1,18 +1,20 @@
-from typing import List, Optional, Union
+from typing import List, Optional, Sequence
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, update
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, insert, update, func
 
 from crud.crud_base import CRUDBase
-from models.user import User
+from services.identity import identity_resolver
 from models.conversation import Conversation, Message
 from schemas.conversation import ConversationCreate, ConversationUpdate, MessageCreate
 from db.operations import set_active_conversation
+from services.user_context import user_context_cache
+
+CONVERSATION_SUMMARY_FIELDS = ("id", "dm_channel_id", "title", "topics", "is_active", "updated_at")
 
 class CRUDConversation(CRUDBase[Conversation, ConversationCreate, ConversationUpdate]):
     async def create_with_messages(self, db: AsyncSession, *, obj_in: ConversationCreate) -> Conversation:
-        user_id, discord_id = await self.get_user_info(db, obj_in.user_identifier)
+        user_id, discord_id = await identity_resolver.resolve(db, obj_in.user_identifier)
 
         await db.execute(
             update(Conversation)
@@ -37,69 +39,103 @@ class CRUDConversation(CRUDBase[Conversation, ConversationCreate, ConversationUp
         await set_active_conversation(db, user_id, db_obj.id)
         return db_obj
 
-    async def get_user_info(self, db: AsyncSession, user_identifier: Union[UUID, int]) -> tuple[UUID, Optional[int]]:
-        if isinstance(user_identifier, UUID):
-            stmt = select(User.id, User.discord_id).where(User.id == user_identifier)
-        else:
-            stmt = select(User.id, User.discord_id).where(User.discord_id == user_identifier)
-        
-        result = await db.execute(stmt)
-        user_info = result.first()
-        
-        if user_info is None:
-            raise ValueError(f"No user found with identifier {user_identifier}")
-        
-        return user_info.id, user_info.discord_id
-
     async def get_with_messages(self, db: AsyncSession, id: UUID) -> Optional[Conversation]:
-        query = select(Conversation).options(selectinload(Conversation.messages)).where(Conversation.id == id)
-        result = await db.execute(query)
-        return result.scalars().first()
+        return await self.get(db, id, profile="conversation_page")
 
     async def get_active_by_user(self, db: AsyncSession, user_id: UUID) -> List[Conversation]:
         query = select(Conversation).where(and_(Conversation.user_id == user_id, Conversation.is_active == True))
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_recent_by_user(self, db: AsyncSession, user_id: UUID, limit: int = 5) -> List[Conversation]:
+        query = (
+            select(Conversation)
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.updated_at.desc())
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return result.scalars().all()
+
     async def get_by_discord_id(self, db: AsyncSession, discord_id: int) -> List[Conversation]:
         query = select(Conversation).where(Conversation.discord_id == discord_id)
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_recent_by_discord_id(
+        self, db: AsyncSession, discord_id: int, fields: Sequence[str] = CONVERSATION_SUMMARY_FIELDS, limit: int = 10
+    ) -> List:
+        return await self.project(
+            db, fields, where=[Conversation.discord_id == discord_id], order_by=[Conversation.updated_at.desc()], limit=limit
+        )
+
+    async def get_collection_version(self, db: AsyncSession, user_id: UUID):
+        """(count, latest updated_at) of the user's conversations; changes whenever the list does."""
+        result = await db.execute(
+            select(func.count(Conversation.id), func.max(Conversation.updated_at)).where(Conversation.user_id == user_id)
+        )
+        return result.one()
+
     async def add_message(self, db: AsyncSession, *, conversation_id: UUID, message: MessageCreate) -> Message:
         db_message = Message(
             conversation_id=conversation_id,
             content=message.content,
-            is_from_user=message.is_from_user
+            is_from_user=message.is_from_user,
+            discord_message_id=message.discord_message_id
         )
         db.add(db_message)
         await db.commit()
         await db.refresh(db_message)
         return db_message
 
+    async def add_messages(
+        self, db: AsyncSession, *, conversation_id: UUID, messages: Sequence[MessageCreate]
+    ) -> List[Message]:
+        """Insert ``messages`` into a conversation with one multi-row INSERT ... RETURNING."""
+        if not messages:
+            return []
+        rows = [
+            {
+                "conversation_id": conversation_id,
+                "content": message.content,
+                "is_from_user": message.is_from_user,
+                "discord_message_id": message.discord_message_id,
+            }
+            for message in messages
+        ]
+        db_messages = (await db.scalars(insert(Message).returning(Message, sort_by_parameter_order=True), rows)).all()
+        await db.commit()
+        return db_messages
+
     async def get_messages(self, db: AsyncSession, *, conversation_id: UUID, skip: int = 0, limit: int = 100) -> List[Message]:
         query = select(Message).where(Message.conversation_id == conversation_id).offset(skip).limit(limit)
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_recent_messages(self, db: AsyncSession, *, conversation_id: UUID, limit: int = 20) -> List[Message]:
+        """The last ``limit`` messages of a conversation, newest first."""
+        query = (
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.desc())
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return result.scalars().all()
+
     async def update_conversation(self, db: AsyncSession, *, db_obj: Conversation, obj_in: ConversationUpdate) -> Conversation:
         update_data = obj_in.model_dump(exclude_unset=True)
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        db_obj = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        user_context_cache.bump(db_obj.user_id)
+        return db_obj
 
     async def set_analyzed(self, db: AsyncSession, *, conversation_id: UUID, is_analyzed: bool) -> Conversation:
-        conversation = await self.get(db, id=conversation_id)
-        if conversation:
-            conversation.is_analyzed = is_analyzed
-            await db.commit()
-            await db.refresh(conversation)
-        return conversation
+        return await self.update_by_id(db, conversation_id, {"is_analyzed": is_analyzed})
 
     async def set_active(self, db: AsyncSession, *, conversation_id: UUID, is_active: bool) -> Conversation:
-        conversation = await self.get(db, id=conversation_id)
+        conversation = await self.update_by_id(db, conversation_id, {"is_active": is_active})
         if conversation:
-            conversation.is_active = is_active
-            await db.commit()
-            await db.refresh(conversation)
+            user_context_cache.bump(conversation.user_id)
         return conversation
 
 conversation = CRUDConversation(Conversation)
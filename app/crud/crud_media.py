@@ -0,0 +1,22 @@
+from typing import Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from crud.crud_base import CRUDBase
+from models.media import Media
+from schemas.conversation import MediaCreate
+
+class CRUDMedia(CRUDBase[Media, MediaCreate, MediaCreate]):
+    async def get_by_url(self, db: AsyncSession, url: str) -> Optional[Media]:
+        result = await db.execute(select(Media).where(Media.url == url))
+        return result.scalars().first()
+
+    async def upsert_by_url(
+        self, db: AsyncSession, *, obj_in: MediaCreate, update_fields: Sequence[str] = ()
+    ) -> Media:
+        """Get or create the media row for a URL in one statement; safe to race."""
+        values = {**obj_in.model_dump(), "url": str(obj_in.url)}
+        db_obj, _ = await self.upsert(db, values=values, conflict=["url"], update_fields=update_fields)
+        return db_obj
+
+media = CRUDMedia(Media)
@@ -1,68 +1,142 @@
-from typing import List, Optional, Union
+from typing import Iterable, List, Optional, Sequence
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from datetime import datetime
+from sqlalchemy import select, and_, insert, update, func
 
+from core.config import settings
 from crud.crud_base import CRUDBase
-from models.user import User
+from services.identity import identity_resolver
 from models.memory import Memory
 from schemas.memory import MemoryCreate, MemoryUpdate
+from services.memory_access import memory_access
+from services.memory_consolidation import find_duplicate, memory_signatures
+from services.memory_index import memory_index
+from services.user_context import user_context_cache
+from utils.minhash import band_keys
+
+MEMORY_SUMMARY_FIELDS = ("id", "conversation_id", "content", "importance", "created_at")
 
 class CRUDMemory(CRUDBase[Memory, MemoryCreate, MemoryUpdate]):
     async def create_with_user(self, db: AsyncSession, *, obj_in: MemoryCreate) -> Memory:
-        user_id, discord_id = await self.get_user_info(db, obj_in.user_identifier)
+        user_id, discord_id = await identity_resolver.resolve(db, obj_in.user_identifier)
+        [sig] = await memory_signatures([obj_in.content])
+        if settings.MEMORY_DEDUP_ON_INSERT:
+            duplicate_id = await find_duplicate(db, user_id, sig)
+            if duplicate_id is not None:
+                # fold the new memory into the existing near-duplicate
+                result = await db.execute(
+                    update(Memory)
+                    .where(Memory.id == duplicate_id)
+                    .values(importance=func.greatest(Memory.importance, obj_in.importance))
+                    .returning(Memory)
+                )
+                db_obj = result.scalars().one()
+                await db.commit()
+                user_context_cache.bump(user_id)
+                return db_obj
         db_obj = Memory(
             user_id=user_id,
             discord_id=discord_id,
             conversation_id=obj_in.conversation_id,
             content=obj_in.content,
-            importance=obj_in.importance
+            importance=obj_in.importance,
+            lsh_bands=band_keys(sig),
         )
         db.add(db_obj)
         await db.commit()
         await db.refresh(db_obj)
+        await memory_index.add_memories([db_obj])
+        user_context_cache.bump(user_id)
         return db_obj
-    
-    async def get_user_info(self, db: AsyncSession, user_identifier: Union[UUID, int]) -> tuple[UUID, Optional[int]]:
-        if isinstance(user_identifier, UUID):
-            stmt = select(User.id, User.discord_id).where(User.id == user_identifier)
-        else:
-            stmt = select(User.id, User.discord_id).where(User.discord_id == user_identifier)
-        
-        result = await db.execute(stmt)
-        user_info = result.first()
-        
-        if user_info is None:
-            raise ValueError(f"No user found with identifier {user_identifier}")
-        
-        return user_info.id, user_info.discord_id
+
+    async def create_multi_with_user(self, db: AsyncSession, *, objs_in: List[MemoryCreate]) -> List[Memory]:
+        users = {}
+        for obj_in in objs_in:
+            if obj_in.user_identifier not in users:
+                users[obj_in.user_identifier] = await identity_resolver.resolve(db, obj_in.user_identifier)
+        sigs = await memory_signatures([obj_in.content for obj_in in objs_in])
+        rows = [
+            {
+                "user_id": users[obj_in.user_identifier][0],
+                "discord_id": users[obj_in.user_identifier][1],
+                "conversation_id": obj_in.conversation_id,
+                "content": obj_in.content,
+                "importance": obj_in.importance,
+                "lsh_bands": band_keys(sig),
+            }
+            for obj_in, sig in zip(objs_in, sigs)
+        ]
+        if not rows:
+            return []
+        result = await db.scalars(insert(Memory).returning(Memory), rows)
+        db_objs = result.all()
+        await db.commit()
+        await memory_index.add_memories(db_objs)
+        for user_id, _ in users.values():
+            user_context_cache.bump(user_id)
+        return db_objs
 
     async def get_by_user(self, db: AsyncSession, user_id: UUID, skip: int = 0, limit: int = 100) -> List[Memory]:
         query = select(Memory).where(Memory.user_id == user_id).offset(skip).limit(limit)
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_by_user_projected(
+        self, db: AsyncSession, user_id: UUID, fields: Sequence[str] = MEMORY_SUMMARY_FIELDS,
+        skip: int = 0, limit: int = 100,
+    ) -> List:
+        return await self.project(db, fields, where=[Memory.user_id == user_id], skip=skip, limit=limit)
+
     async def get_by_conversation(self, db: AsyncSession, conversation_id: UUID) -> List[Memory]:
         query = select(Memory).where(Memory.conversation_id == conversation_id)
         result = await db.execute(query)
         return result.scalars().all()
 
-    async def get_by_importance(self, db: AsyncSession, user_id: UUID, min_importance: int) -> List[Memory]:
-        query = select(Memory).where(and_(Memory.user_id == user_id, Memory.importance >= min_importance))
+    async def get_by_importance(
+        self, db: AsyncSession, user_id: UUID, min_importance: int, limit: int = settings.MEMORY_RETRIEVAL_LIMIT
+    ) -> List[Memory]:
+        query = (
+            select(Memory)
+            .where(and_(Memory.user_id == user_id, Memory.importance >= min_importance))
+            .order_by(Memory.importance.desc())
+            .limit(limit)
+        )
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_relevant(self, db: AsyncSession, user_id: UUID, query: str, limit: int = 10) -> List[Memory]:
+        hits = await memory_index.search(user_id, query, k=limit)
+        if not hits:
+            return []
+        result = await db.execute(select(Memory).where(Memory.id.in_([memory_id for memory_id, _ in hits])))
+        by_id = {memory.id: memory for memory in result.scalars().all()}
+        memories = [by_id[memory_id] for memory_id, _ in hits if memory_id in by_id]
+        self.access_memories(memory.id for memory in memories)
+        return memories
+
     async def update_memory(self, db: AsyncSession, *, db_obj: Memory, obj_in: MemoryUpdate) -> Memory:
         update_data = obj_in.model_dump(exclude_unset=True)
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        if "content" in update_data:
+            [sig] = await memory_signatures([update_data["content"]])
+            update_data["lsh_bands"] = band_keys(sig)
+        db_obj = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        if "content" in update_data:
+            await memory_index.add_memories([db_obj])
+        user_context_cache.bump(db_obj.user_id)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: UUID) -> Memory:
+        obj = await super().remove(db, id=id)
+        if obj:
+            await memory_index.remove(obj.user_id, [obj.id])
+            user_context_cache.bump(obj.user_id)
+        return obj
+
+    def access_memory(self, memory_id: UUID) -> None:
+        # buffered; written back in bulk by the access tracker
+        memory_access.record(memory_id)
 
-    async def access_memory(self, db: AsyncSession, memory_id: UUID) -> Optional[Memory]:
-        memory = await self.get(db, id=memory_id)
-        if memory:
-            memory.last_accessed_at = datetime.utcnow()
-            await db.commit()
-            await db.refresh(memory)
-        return memory
+    def access_memories(self, memory_ids: Iterable[UUID]) -> None:
+        memory_access.record_many(memory_ids)
 
 memory = CRUDMemory(Memory)
@@ -1,16 +1,18 @@
-from typing import Optional, Union
+from typing import Optional, Sequence
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from crud.crud_base import CRUDBase
-from models.user import User
+from services.identity import identity_resolver
 from models.pal import Pal
-from schemas.pal import PalCreate, PalUpdate
+from schemas.pal import PalCreate, PalUpdate, PalPatch
+from services.persona import persona_cache
+from services.user_context import user_context_cache
 
 class CRUDPal(CRUDBase[Pal, PalCreate, PalUpdate]):
     async def create_with_user(self, db: AsyncSession, *, obj_in: PalCreate) -> Pal:
-        user_id, discord_id = await self.get_user_info(db, obj_in.user_identifier)
+        user_id, discord_id = await identity_resolver.resolve(db, obj_in.user_identifier)
 
         db_obj = Pal(
             user_id=user_id,
@@ -25,21 +27,26 @@ class CRUDPal(CRUDBase[Pal, PalCreate, PalUpdate]):
         db.add(db_obj)
         await db.commit()
         await db.refresh(db_obj)
+        user_context_cache.bump(user_id)
+        persona_cache.invalidate(user_id)
         return db_obj
     
-    async def get_user_info(self, db: AsyncSession, user_identifier: Union[UUID, int]) -> tuple[UUID, Optional[int]]:
-        if isinstance(user_identifier, UUID):
-            stmt = select(User.id, User.discord_id).where(User.id == user_identifier)
-        else:
-            stmt = select(User.id, User.discord_id).where(User.discord_id == user_identifier)
-        
-        result = await db.execute(stmt)
-        user_info = result.first()
-        
-        if user_info is None:
-            raise ValueError(f"No user found with identifier {user_identifier}")
-        
-        return user_info.id, user_info.discord_id
+    async def upsert_by_user(
+        self, db: AsyncSession, *, obj_in: PalCreate, update_fields: Sequence[str] = ()
+    ) -> Pal:
+        """Get or create the user's pal in one statement; safe to race."""
+        user_id, discord_id = await identity_resolver.resolve(db, obj_in.user_identifier)
+        values = obj_in.model_dump(exclude={"user_identifier"})
+        db_obj, inserted = await self.upsert(
+            db,
+            values={**values, "user_id": user_id, "discord_id": discord_id},
+            conflict=["user_id"],
+            update_fields=update_fields,
+        )
+        if inserted or update_fields:
+            user_context_cache.bump(user_id)
+            persona_cache.invalidate(user_id)
+        return db_obj
 
     async def get_by_user_id(self, db: AsyncSession, user_id: UUID) -> Optional[Pal]:
         query = select(Pal).where(Pal.user_id == user_id)
@@ -47,12 +54,40 @@ class CRUDPal(CRUDBase[Pal, PalCreate, PalUpdate]):
         return result.scalars().first()
 
     async def get_by_discord_id(self, db: AsyncSession, discord_id: int) -> Optional[Pal]:
-        query = select(Pal).join(Pal.user).where(Pal.user.discord_id == discord_id)
-        result = await db.execute(query)
-        return result.scalars().first()
+        try:
+            user_id, _ = await identity_resolver.resolve(db, discord_id)
+        except ValueError:
+            return None
+        return await self.get_by_user_id(db, user_id)
+
+    async def get_version(self, db: AsyncSession, user_id: UUID):
+        """(id, updated_at) of the user's pal without loading it, or None."""
+        result = await db.execute(select(Pal.id, Pal.updated_at).where(Pal.user_id == user_id))
+        return result.first()
 
     async def update_pal(self, db: AsyncSession, *, db_obj: Pal, obj_in: PalUpdate) -> Pal:
         update_data = obj_in.dict(exclude_unset=True)
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        db_obj = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        user_context_cache.bump(db_obj.user_id)
+        persona_cache.invalidate(db_obj.user_id)
+        return db_obj
+
+    async def patch_by_user_id(self, db: AsyncSession, user_id: UUID, patch: PalPatch) -> Optional[Pal]:
+        db_obj = await self.patch_json(
+            db,
+            where=[Pal.user_id == user_id],
+            patches={"personality": patch.personality, "preferences": patch.preferences},
+        )
+        if db_obj is not None:
+            user_context_cache.bump(user_id)
+            persona_cache.invalidate(user_id)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: UUID) -> Pal:
+        obj = await super().remove(db, id=id)
+        if obj:
+            user_context_cache.bump(obj.user_id)
+            persona_cache.invalidate(obj.user_id)
+        return obj
 
 pal = CRUDPal(Pal)
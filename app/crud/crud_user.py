@@ -1,13 +1,137 @@
-from typing import Any, Dict, Optional, Union
+from datetime import datetime
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Union
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, func, literal, case, true, and_, any_, bindparam, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, aggregate_order_by
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.elements import ColumnElement
 
+from core.config import settings
 from core.security import get_password_hash, verify_password
 from crud.crud_base import CRUDBase
+from crud.loading import profile_options
 from models.user import User
+from models.pal import Pal
+from models.conversation import Conversation, Message
+from models.memory import Memory
+from schemas.patch import JSONBPatch
 from schemas.user import UserCreate, UserUpdate, UserCreateDiscord
+from services.identity import identity_resolver
+from services.persona import persona_cache
+from services.user_context import UserContextBatch, UserContextSnapshot, user_context_cache
+
+SNAPSHOT_USER_COLUMNS = (
+    User.id, User.discord_id, User.name, User.birthday, User.occupation,
+    User.relationship_status, User.interests, User.personality_traits, User.active_conversation_id,
+)
+SNAPSHOT_PAL_COLUMNS = (
+    Pal.id, Pal.name, Pal.personality, Pal.relationship_status, Pal.avatar_url, Pal.bio, Pal.preferences, Pal.updated_at,
+)
+SNAPSHOT_CONVERSATION_COLUMNS = (
+    Conversation.id, Conversation.dm_channel_id, Conversation.title, Conversation.topics,
+    Conversation.is_active, Conversation.created_at, Conversation.updated_at,
+)
+SNAPSHOT_MEMORY_COLUMNS = (
+    Memory.id, Memory.conversation_id, Memory.content, Memory.importance, Memory.created_at, Memory.last_accessed_at,
+)
+
+def _json_object(columns) -> ColumnElement:
+    return func.jsonb_build_object(
+        *chain.from_iterable((literal(column.key, literal_execute=True), column) for column in columns),
+        type_=JSONB,
+    )
+
+def _json_rows(columns, *, where, order_by, limit: int, name: str):
+    """
+    Top ``limit`` rows (ordered descending by ``order_by``) as a LATERAL
+    subquery yielding one ordered jsonb array per outer row.
+    """
+    rows = (
+        select(*columns)
+        .where(where)
+        .order_by(*(column.desc() for column in order_by))
+        .limit(limit)
+        .correlate(User)
+        .subquery(f"{name}_rows")
+    )
+    items = func.jsonb_agg(
+        aggregate_order_by(_json_object(rows.c), *(rows.c[column.key].desc() for column in order_by)),
+        type_=JSONB,
+    )
+    return (
+        select(func.coalesce(items, func.jsonb_build_array(type_=JSONB), type_=JSONB).label("data"))
+        .select_from(rows)
+        .lateral(name)
+    )
+
+def user_context_query(
+    *where: ColumnElement, recent_conversations_limit: int, min_importance: int, memories_limit: int
+):
+    active = aliased(Conversation, name="active_conversation")
+    recent = _json_rows(
+        SNAPSHOT_CONVERSATION_COLUMNS,
+        where=Conversation.user_id == User.id,
+        order_by=(Conversation.updated_at,),
+        limit=recent_conversations_limit,
+        name="recent_conversations",
+    )
+    memories = _json_rows(
+        SNAPSHOT_MEMORY_COLUMNS,
+        where=and_(Memory.user_id == User.id, Memory.importance >= min_importance),
+        order_by=(Memory.importance, Memory.created_at),
+        limit=memories_limit,
+        name="important_memories",
+    )
+    active_columns = [getattr(active, column.key) for column in SNAPSHOT_CONVERSATION_COLUMNS]
+    return (
+        select(
+            *SNAPSHOT_USER_COLUMNS,
+            case((Pal.id.is_(None), None), else_=_json_object(SNAPSHOT_PAL_COLUMNS)).label("pal"),
+            case((active.id.is_(None), None), else_=_json_object(active_columns)).label("active_conversation"),
+            recent.c.data.label("recent_conversations"),
+            memories.c.data.label("important_memories"),
+        )
+        .select_from(User)
+        .outerjoin(Pal, Pal.user_id == User.id)
+        .outerjoin(active, active.id == User.active_conversation_id)
+        .outerjoin(recent, true())
+        .outerjoin(memories, true())
+        .where(*where)
+    )
+
+def _json_decoders(columns) -> Dict[str, Callable[[str], Any]]:
+    """Converters back from JSON for the columns jsonb_build_object renders as strings."""
+    decoders = {}
+    for column in columns:
+        python_type = column.type.python_type
+        if python_type is UUID:
+            decoders[column.key] = UUID
+        elif python_type is datetime:
+            decoders[column.key] = datetime.fromisoformat
+    return decoders
+
+_PAL_DECODERS = _json_decoders(SNAPSHOT_PAL_COLUMNS)
+_CONVERSATION_DECODERS = _json_decoders(SNAPSHOT_CONVERSATION_COLUMNS)
+_MEMORY_DECODERS = _json_decoders(SNAPSHOT_MEMORY_COLUMNS)
+
+def _decode(obj: Optional[Dict[str, Any]], decoders: Dict[str, Callable[[str], Any]]) -> Optional[Dict[str, Any]]:
+    if obj is None:
+        return None
+    for key, decode in decoders.items():
+        if obj.get(key) is not None:
+            obj[key] = decode(obj[key])
+    return obj
+
+def snapshot_from_row(row) -> UserContextSnapshot:
+    return UserContextSnapshot(
+        user={column.key: row._mapping[column.key] for column in SNAPSHOT_USER_COLUMNS},
+        pal=_decode(row.pal, _PAL_DECODERS),
+        active_conversation=_decode(row.active_conversation, _CONVERSATION_DECODERS),
+        recent_conversations=[_decode(item, _CONVERSATION_DECODERS) for item in row.recent_conversations],
+        important_memories=[_decode(item, _MEMORY_DECODERS) for item in row.important_memories],
+    )
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
@@ -15,30 +139,86 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         result = await db.execute(query)
         return result.scalars().first()
 
-    async def get_by_discord_id(self, db: AsyncSession, *, discord_id: int) -> Optional[User]:
-        query = select(User).where(User.discord_id == discord_id)
+    async def get_by_discord_id(
+        self, db: AsyncSession, *, discord_id: int, profile: Optional[str] = None
+    ) -> Optional[User]:
+        query = select(User).options(*profile_options(User, profile)).where(User.discord_id == discord_id)
         result = await db.execute(query)
         return result.scalars().first()
     
-    async def get_user_data_by_discord_id(self, db: AsyncSession, discord_id: int, recent_conversations_limit: int = 5):
-        query = (
-            select(User)
-            .options(
-                selectinload(User.pal),
-                selectinload(User.active_conversation),
-                selectinload(User.conversations.limit(recent_conversations_limit))
-            )
-            .where(User.discord_id == discord_id)
+    async def get_user_data_by_discord_id(self, db: AsyncSession, discord_id: int) -> Optional[User]:
+        return await self.get_by_discord_id(db, discord_id=discord_id, profile="bot_context")
+
+    async def get_user_context_by_discord_id(
+        self,
+        db: AsyncSession,
+        discord_id: int,
+        recent_conversations_limit: int = 5,
+        min_importance: int = 7,
+        memories_limit: int = settings.MEMORY_RETRIEVAL_LIMIT,
+    ) -> Optional[UserContextSnapshot]:
+        query = user_context_query(
+            User.discord_id == discord_id,
+            recent_conversations_limit=recent_conversations_limit,
+            min_importance=min_importance,
+            memories_limit=memories_limit,
         )
-        result = await db.execute(query)
-        return result.scalars().first()
+        row = (await db.execute(query)).first()
+        return snapshot_from_row(row) if row else None
+
+    async def get_user_contexts_by_discord_ids(
+        self,
+        db: AsyncSession,
+        discord_ids: Iterable[int],
+        recent_conversations_limit: int = 5,
+        min_importance: int = 7,
+        memories_limit: int = settings.MEMORY_RETRIEVAL_LIMIT,
+    ) -> UserContextBatch:
+        """
+        Snapshots for many Discord users in a single query regardless of batch
+        size; ids with no user are returned in ``missing``.
+        """
+        discord_ids = list(dict.fromkeys(discord_ids))
+        batch = UserContextBatch()
+        if not discord_ids:
+            return batch
+        query = user_context_query(
+            User.discord_id == any_(bindparam("discord_ids", discord_ids, type_=ARRAY(BigInteger))),
+            recent_conversations_limit=recent_conversations_limit,
+            min_importance=min_importance,
+            memories_limit=memories_limit,
+        )
+        for row in (await db.execute(query)).all():
+            batch.found[row.discord_id] = snapshot_from_row(row)
+        batch.missing = [discord_id for discord_id in discord_ids if discord_id not in batch.found]
+        return batch
+
+    async def get_version(self, db: AsyncSession, user_id: UUID, expand: Iterable[str] = ()) -> Optional[tuple]:
+        """
+        Everything a /users/me body with ``expand`` depends on, as one row of
+        scalars (updated_at, counts, latest timestamps) from a single query.
+        """
+        columns = [User.updated_at]
+        expand = set(expand)
+        if "pal" in expand:
+            columns.append(select(Pal.updated_at).where(Pal.user_id == User.id).scalar_subquery())
+        if "conversations" in expand:
+            owned = Conversation.user_id == User.id
+            columns.append(select(func.count(Conversation.id)).where(owned).scalar_subquery())
+            columns.append(select(func.max(Conversation.updated_at)).where(owned).scalar_subquery())
+        if "conversations.messages" in expand:
+            for aggregate in (func.count(Message.id), func.max(Message.created_at)):
+                columns.append(
+                    select(aggregate).join(Conversation).where(Conversation.user_id == User.id).scalar_subquery()
+                )
+        result = await db.execute(select(*columns).where(User.id == user_id))
+        row = result.first()
+        return tuple(row) if row is not None else None
 
     async def set_active_conversation(self, db: AsyncSession, user_id: UUID, conversation_id: UUID):
-        user = await self.get(db, id=user_id)
+        user = await self.update_by_id(db, user_id, {"active_conversation_id": conversation_id})
         if user:
-            user.active_conversation_id = conversation_id
-            await db.commit()
-            await db.refresh(user)
+            user_context_cache.bump(user.id)
         return user
 
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
@@ -71,6 +251,20 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(db_obj)
         await db.commit()
         await db.refresh(db_obj)
+        identity_resolver.invalidate(discord_id=db_obj.discord_id)
+        return db_obj
+
+    async def upsert_discord(
+        self, db: AsyncSession, *, obj_in: UserCreateDiscord, update_fields: Sequence[str] = ()
+    ) -> User:
+        """Get or create the user for a Discord id in one statement; safe to race."""
+        db_obj, inserted = await self.upsert(
+            db, values=obj_in.model_dump(), conflict=["discord_id"], update_fields=update_fields
+        )
+        if inserted:
+            identity_resolver.invalidate(discord_id=db_obj.discord_id)
+        elif update_fields:
+            user_context_cache.bump(db_obj.id)
         return db_obj
 
     async def update(
@@ -84,25 +278,58 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        db_obj = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        if "discord_id" in update_data:
+            identity_resolver.invalidate(user_id=db_obj.id, discord_id=db_obj.discord_id)
+        user_context_cache.bump(db_obj.id)
+        return db_obj
+
+    async def patch_personality_traits(self, db: AsyncSession, user_id: UUID, patch: JSONBPatch) -> Optional[User]:
+        db_obj = await self.patch_json(db, where=[User.id == user_id], patches={"personality_traits": patch})
+        if db_obj is not None:
+            user_context_cache.bump(user_id)
+        return db_obj
 
     async def authenticate(self, db: AsyncSession, *, email: str, password: str) -> Optional[User]:
         user = await self.get_by_email(db, email=email)
-        if not user:
+        if not user or not user.hashed_password:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not verify_password(plain_password=password, hashed_password=user.hashed_password):
             return None
         return user
 
+    def is_active(self, user: User) -> bool:
+        # there is no deactivation flag on users yet
+        return True
+
     async def authenticate_discord(self, db: AsyncSession, *, discord_id: int) -> Optional[User]:
         return await self.get_by_discord_id(db, discord_id=discord_id)
 
     async def link_discord_account(self, db: AsyncSession, *, user_id: UUID, discord_id: int) -> User:
-        user = await self.get(db, id=user_id)
-        if user:
-            user.discord_id = discord_id
-            await db.commit()
-            await db.refresh(user)
+        # the previous discord_id comes back from the pre-update row, so no separate read is needed
+        previous = select(User.id, User.discord_id).where(User.id == user_id).with_for_update().subquery("previous")
+        stmt = (
+            update(User)
+            .where(User.id == previous.c.id)
+            .values(discord_id=discord_id)
+            .returning(User, previous.c.discord_id)
+            .execution_options(populate_existing=True)
+        )
+        row = (await db.execute(stmt)).first()
+        await db.commit()
+        if row is None:
+            return None
+        user, previous_discord_id = row
+        identity_resolver.invalidate(user_id=user.id, discord_id=previous_discord_id)
+        identity_resolver.invalidate(discord_id=discord_id)
+        user_context_cache.bump(user.id)
         return user
 
+    async def remove(self, db: AsyncSession, *, id: UUID) -> User:
+        obj = await super().remove(db, id=id)
+        identity_resolver.invalidate(user_id=id, discord_id=obj.discord_id if obj else None)
+        user_context_cache.bump(id)
+        persona_cache.invalidate(id)
+        return obj
+
 user = CRUDUser(User)
@@ -1,22 +1,19 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, and_, join
-from sqlalchemy.orm import selectinload
 from uuid import UUID
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 
+from crud.loading import profile_options
 from models.conversation import Conversation, Message
 from models.user import User
 from schemas.conversation import ConversationCreate, ConversationUpdate, MessageCreate
+from services.identity import identity_resolver
+from services.user_context import user_context_cache
 
 async def create_conversation(db: AsyncSession, conversation: ConversationCreate, discord_id: int) -> Conversation:
-    user_query = select(User.id).where(User.discord_id == discord_id)
-    user_result = await db.execute(user_query)
-    user_id = user_result.scalar_one_or_none()
-    
-    if not user_id:
-        raise ValueError(f"No user found with discord_id: {discord_id}")
+    user_id, _ = await identity_resolver.resolve(db, discord_id)
 
     await db.execute(
         update(Conversation)
@@ -28,10 +25,11 @@ async def create_conversation(db: AsyncSession, conversation: ConversationCreate
     db.add(db_conversation)
     await db.commit()
     await db.refresh(db_conversation)
+    user_context_cache.bump(user_id)
     return db_conversation
 
 async def get_conversation(db: AsyncSession, conversation_id: UUID) -> Optional[Conversation]:
-    query = select(Conversation).options(selectinload(Conversation.messages)).where(Conversation.id == conversation_id)
+    query = select(Conversation).options(*profile_options(Conversation, "conversation_page")).where(Conversation.id == conversation_id)
     result = await db.execute(query)
     return result.scalar_one_or_none()
 
@@ -58,6 +56,7 @@ async def update_conversation(db: AsyncSession, conversation_id: UUID, conversat
     
     await db.commit()
     await db.refresh(db_conversation)
+    user_context_cache.bump(db_conversation.user_id)
     return db_conversation
 
 async def delete_conversation(db: AsyncSession, conversation_id: UUID) -> bool:
@@ -67,6 +66,7 @@ async def delete_conversation(db: AsyncSession, conversation_id: UUID) -> bool:
     
     await db.delete(db_conversation)
     await db.commit()
+    user_context_cache.bump(db_conversation.user_id)
     return True
 
 async def add_message_to_conversation(db: AsyncSession, conversation_id: UUID, message: MessageCreate) -> Message:
@@ -5,16 +5,24 @@ from typing import List, Optional
 
 from models.memory import Memory
 from schemas.memory import MemoryCreate, MemoryUpdate
+from services.memory_consolidation import memory_signatures
+from services.memory_index import memory_index
+from services.user_context import user_context_cache
+from utils.minhash import band_keys
 
 async def create_memory(db: AsyncSession, memory: MemoryCreate, user_id: UUID) -> Memory:
+    [sig] = await memory_signatures([memory.content])
     db_memory = Memory(
         user_id=user_id,
         content=memory.content,
-        importance=memory.importance
+        importance=memory.importance,
+        lsh_bands=band_keys(sig),
     )
     db.add(db_memory)
     await db.commit()
     await db.refresh(db_memory)
+    await memory_index.add_memories([db_memory])
+    user_context_cache.bump(user_id)
     return db_memory
 
 # async def create_memory(memory_create: MemoryCreate):
@@ -60,11 +68,17 @@ async def update_memory(db: AsyncSession, memory_id: UUID, memory_update: Memory
         return None
     
     update_data = memory_update.model_dump(exclude_unset=True)
+    if "content" in update_data:
+        [sig] = await memory_signatures([update_data["content"]])
+        update_data["lsh_bands"] = band_keys(sig)
     for field, value in update_data.items():
         setattr(db_memory, field, value)
     
     await db.commit()
     await db.refresh(db_memory)
+    if "content" in update_data:
+        await memory_index.add_memories([db_memory])
+    user_context_cache.bump(db_memory.user_id)
     return db_memory
 
 async def delete_memory(db: AsyncSession, memory_id: UUID) -> bool:
@@ -74,4 +88,6 @@ async def delete_memory(db: AsyncSession, memory_id: UUID) -> bool:
     
     await db.delete(db_memory)
     await db.commit()
+    await memory_index.remove(db_memory.user_id, [db_memory.id])
+    user_context_cache.bump(db_memory.user_id)
     return True
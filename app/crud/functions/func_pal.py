@@ -3,13 +3,19 @@ from sqlalchemy import select
 from uuid import UUID
 from typing import Optional
 
+from crud.crud_pal import pal as pal_crud
 from models.user import Pal
+from schemas.pal import PalPatch
+from services.persona import persona_cache
+from services.user_context import user_context_cache
 
 async def create_pal(db: AsyncSession, user_id: UUID, pal_data: dict) -> Pal:
     db_pal = Pal(user_id=user_id, **pal_data)
     db.add(db_pal)
     await db.commit()
     await db.refresh(db_pal)
+    user_context_cache.bump(user_id)
+    persona_cache.invalidate(user_id)
     return db_pal
 
 async def get_pal(db: AsyncSession, user_id: UUID) -> Optional[Pal]:
@@ -27,8 +33,13 @@ async def update_pal(db: AsyncSession, user_id: UUID, pal_update: dict) -> Optio
     
     await db.commit()
     await db.refresh(db_pal)
+    user_context_cache.bump(user_id)
+    persona_cache.invalidate(user_id)
     return db_pal
 
+async def patch_pal(db: AsyncSession, user_id: UUID, pal_patch: PalPatch) -> Optional[Pal]:
+    return await pal_crud.patch_by_user_id(db, user_id, pal_patch)
+
 async def delete_pal(db: AsyncSession, user_id: UUID) -> bool:
     db_pal = await get_pal(db, user_id)
     if db_pal is None:
@@ -36,4 +47,6 @@ async def delete_pal(db: AsyncSession, user_id: UUID) -> bool:
     
     await db.delete(db_pal)
     await db.commit()
+    user_context_cache.bump(user_id)
+    persona_cache.invalidate(user_id)
     return True
\ No newline at end of file
@@ -6,6 +6,9 @@ from typing import List, Optional
 
 from models.user import User
 from schemas.user import UserCreate, UserUpdate
+from services.identity import identity_resolver
+from services.persona import persona_cache
+from services.user_context import user_context_cache
 
 async def create_user(db: AsyncSession, user: UserCreate) -> User:
     db_user = User(
@@ -20,6 +23,7 @@ async def create_user(db: AsyncSession, user: UserCreate) -> User:
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    identity_resolver.invalidate(discord_id=db_user.discord_id)
     return db_user
 
 async def get_user(db: AsyncSession, user_id: UUID) -> Optional[User]:
@@ -43,11 +47,16 @@ async def update_user(db: AsyncSession, user_id: UUID, user_update: UserUpdate)
         return None
     
     update_data = user_update.model_dump(exclude_unset=True)
+    if "discord_id" in update_data:
+        identity_resolver.invalidate(user_id=user_id, discord_id=db_user.discord_id)
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
     await db.commit()
     await db.refresh(db_user)
+    if "discord_id" in update_data:
+        identity_resolver.invalidate(discord_id=db_user.discord_id)
+    user_context_cache.bump(user_id)
     return db_user
 
 async def delete_user(db: AsyncSession, user_id: UUID) -> bool:
@@ -57,4 +66,7 @@ async def delete_user(db: AsyncSession, user_id: UUID) -> bool:
     
     await db.delete(db_user)
     await db.commit()
+    identity_resolver.invalidate(user_id=user_id, discord_id=db_user.discord_id)
+    user_context_cache.bump(user_id)
+    persona_cache.invalidate(user_id)
     return True
\ No newline at end of file
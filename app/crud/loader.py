@@ -0,0 +1,145 @@
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.metrics import registry
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchFn = Callable[[List[K]], Awaitable[Dict[K, V]]]
+
+loader_requests = registry.counter("loader_requests_total", "Keys requested through a batching loader", ["loader"])
+loader_queries = registry.counter("loader_queries_total", "Batch queries issued by a loader", ["loader"])
+loader_coalesced = registry.counter(
+    "loader_coalesced_total", "Loads served without a query of their own", ["loader", "reason"]
+)
+
+class Loader(Generic[K, V]):
+    """
+    Dataloader-style coalescing. Keys requested during one event-loop tick
+    are fetched together by a single ``batch_fn`` call; repeated keys in the
+    tick share one result. With ``singleflight`` a key that is already being
+    fetched joins that fetch instead of starting another. Nothing is cached
+    once a fetch completes. Missing keys resolve to None. Batches hold
+    ``lock``, if given, while they run.
+    """
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        *,
+        name: str,
+        max_batch: int = 1000,
+        singleflight: bool = True,
+        lock: Optional[asyncio.Lock] = None,
+    ):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch = max_batch
+        self.singleflight = singleflight
+        self.lock = lock
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._inflight: Dict[K, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        self._tasks: set = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        loader_requests.labels(self.name).inc()
+        future = self._pending.get(key)
+        if future is not None:
+            loader_coalesced.labels(self.name, "batch").inc()
+        elif self.singleflight and (future := self._inflight.get(key)) is not None:
+            loader_coalesced.labels(self.name, "singleflight").inc()
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        # shielded: one cancelled caller must not cancel the result others share
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        self._dispatch_scheduled = False
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch]}
+            self._inflight.update(batch)
+            task = asyncio.create_task(self._fetch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: Dict[K, asyncio.Future]) -> None:
+        loader_queries.labels(self.name).inc()
+        try:
+            if self.lock is None:
+                results = await self.batch_fn(list(batch))
+            else:
+                async with self.lock:
+                    results = await self.batch_fn(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+                    future.exception()  # the awaiting callers re-raise it; don't warn for orphans
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+        finally:
+            for key, future in batch.items():
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+def crud_loader(
+    crud: Any,
+    *,
+    db: Optional[AsyncSession] = None,
+    session_factory: Optional[Callable[[], AsyncSession]] = None,
+    column: str = "id",
+    name: Optional[str] = None,
+    singleflight: bool = True,
+    lock: Optional[asyncio.Lock] = None,
+) -> Loader:
+    """
+    A ``Loader`` over ``crud.get_many``. Pass ``db`` for a per-request loader,
+    or ``session_factory`` for a shared loader that opens a session per batch.
+    An AsyncSession runs one statement at a time, so batches on ``db`` are
+    serialized by ``lock``: share one lock between every loader on the same
+    session (Loaders does), and don't query the session yourself while a
+    load is pending.
+    """
+    if (db is None) == (session_factory is None):
+        raise ValueError("pass exactly one of db or session_factory")
+    if db is not None:
+        batch_fn = partial(crud.get_many, db, column=column)
+        lock = lock or asyncio.Lock()
+    else:
+        async def batch_fn(keys):
+            async with session_factory() as session:
+                return await crud.get_many(session, keys, column=column)
+    return Loader(
+        batch_fn, name=name or f"{crud.model.__tablename__}.{column}", singleflight=singleflight, lock=lock
+    )
+
+class Loaders:
+    """
+    The loaders for one request (or, with a session factory, one process).
+    Loaders on one ``db`` share a lock, so their batches never overlap on it.
+    """
+    __slots__ = ("user", "pal", "conversation")
+
+    def __init__(self, *, db: Optional[AsyncSession] = None, session_factory: Optional[Callable[[], AsyncSession]] = None):
+        # imported here: the crud package imports this module's neighbours
+        import crud
+
+        source = dict(db=db, session_factory=session_factory, lock=asyncio.Lock() if db is not None else None)
+        self.user = crud_loader(crud.user, **source)
+        self.pal = crud_loader(crud.pal, **source, column="user_id", name="pal.user_id")
+        self.conversation = crud_loader(crud.conversation, **source)
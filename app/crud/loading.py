@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+from db.base_class import Base
+from models.conversation import Conversation
+from models.user import User
+
+def load_paths(model: Type[Base], paths: Iterable[str]) -> List[Any]:
+    """
+    Loader options for dotted relationship ``paths`` of ``model``. Scalar
+    relationships are joined into the parent query; collections get one
+    ``SELECT ... IN`` each, so the query count never depends on row count.
+    Unknown names end their path.
+    """
+    paths = set(paths)
+    options = []
+    for path in sorted(paths):
+        if any(other.startswith(f"{path}.") for other in paths):
+            continue  # a longer path already loads this prefix
+        current, option = model, None
+        for name in path.split("."):
+            relationship = sa_inspect(current).relationships.get(name)
+            if relationship is None:
+                break
+            attribute = getattr(current, name)
+            loader = selectinload if relationship.uselist else joinedload
+            option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+            current = relationship.mapper.class_
+        if option is not None:
+            options.append(option)
+    return options
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """The relationships one caller needs loaded on ``model``, as dotted paths."""
+    model: Type[Base]
+    paths: Tuple[str, ...]
+
+    def options(self) -> List[Any]:
+        return load_paths(self.model, self.paths)
+
+# every relationship is lazy="raise", so anything a caller touches must be listed here
+PROFILES: Dict[str, LoadProfile] = {
+    # the bot's per-message path: persona plus the running conversation
+    "bot_context": LoadProfile(User, ("pal", "active_conversation.messages.media")),
+    # one conversation rendered with its history
+    "conversation_page": LoadProfile(Conversation, ("messages.media",)),
+    # the account page: persona and conversation list, no messages
+    "user_profile": LoadProfile(User, ("pal", "conversations")),
+}
+
+@lru_cache(maxsize=None)
+def _profile_options(name: str) -> Tuple[Any, ...]:
+    return tuple(PROFILES[name].options())
+
+def profile_options(model: Type[Base], profile: Optional[str]) -> Tuple[Any, ...]:
+    """Loader options for the named profile, checked against the model being queried."""
+    if profile is None:
+        return ()
+    loaded = PROFILES.get(profile)
+    if loaded is None:
+        raise ValueError(f"Unknown load profile: {profile}")
+    if loaded.model is not model:
+        raise ValueError(f"Load profile {profile} is for {loaded.model.__name__}, not {model.__name__}")
+    return _profile_options(profile)
@@ -0,0 +1,41 @@
+from dataclasses import make_dataclass
+from functools import lru_cache
+from typing import Any, List, Sequence, Tuple, Type
+
+from sqlalchemy import Select, select
+
+from db.base_class import Base
+
+class Projection:
+    """
+    A fixed set of a model's columns, read through a Core select into a
+    frozen slotted dataclass per row. Rows carry no session state, skip the
+    identity map entirely and can be fed to pydantic schemas declared with
+    ``from_attributes=True``.
+    """
+    __slots__ = ("model", "fields", "columns", "row_type")
+
+    def __init__(self, model: Type[Base], fields: Tuple[str, ...]):
+        table_columns = model.__table__.c
+        unknown = [field for field in fields if field not in table_columns]
+        if unknown:
+            raise ValueError(f"Unknown {model.__name__} columns: {', '.join(unknown)}")
+        self.model = model
+        self.fields = fields
+        self.columns = [table_columns[field] for field in fields]
+        self.row_type = make_dataclass(f"{model.__name__}Row", fields, frozen=True, slots=True)
+
+    def select(self) -> Select:
+        return select(*self.columns)
+
+    def rows(self, result) -> List[Any]:
+        row_type = self.row_type
+        return [row_type(*row) for row in result]
+
+@lru_cache(maxsize=None)
+def _projection(model: Type[Base], fields: Tuple[str, ...]) -> Projection:
+    return Projection(model, fields)
+
+def projection(model: Type[Base], fields: Sequence[str]) -> Projection:
+    """The shared ``Projection`` for ``model`` and ``fields``; built once per combination."""
+    return _projection(model, tuple(fields))
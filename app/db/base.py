@@ -4,5 +4,6 @@ from db.base_class import Base
 from models.user import User
 from models.token import Token
 from models.conversation import Conversation, Message
-from models.memory import Memory
-from models.pal import Pal
\ No newline at end of file
+from models.memory import Memory, MemoryArchive
+from models.pal import Pal
+from models.media import Media
\ No newline at end of file
@@ -0,0 +1,31 @@
+import hashlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+def lock_key(name: str) -> int:
+    """A stable signed 64-bit advisory lock key for ``name``."""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little", signed=True)
+
+@asynccontextmanager
+async def advisory_lock(engine: AsyncEngine, name: str) -> AsyncIterator[Optional[AsyncConnection]]:
+    """
+    Try to take the session-level advisory lock ``name`` without waiting.
+    Yields the connection holding it, or None if another connection does.
+    Only one connection across all processes can hold it, so work done
+    under it runs in one worker at a time; a worker that dies releases it
+    with its connection. Bind the block's sessions to the yielded
+    connection so the work does not need a second one from the pool.
+    """
+    key = lock_key(name)
+    async with engine.connect() as conn:
+        acquired = (await conn.execute(select(func.pg_try_advisory_lock(key)))).scalar_one()
+        await conn.commit()
+        try:
+            yield conn if acquired else None
+        finally:
+            if acquired:
+                await conn.execute(select(func.pg_advisory_unlock(key)))
+                await conn.commit()
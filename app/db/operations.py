@@ -2,8 +2,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import update
 from uuid import UUID
 from models.user import User
+from services.user_context import user_context_cache
 
 async def set_active_conversation(db: AsyncSession, user_id: UUID, conversation_id: UUID):
     stmt = update(User).where(User.id == user_id).values(active_conversation_id=conversation_id)
     await db.execute(stmt)
-    await db.commit()
\ No newline at end of file
+    await db.commit()
+    user_context_cache.bump(user_id)
\ No newline at end of file
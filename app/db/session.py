@@ -1,6 +1,46 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import asyncio
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
 from core.config import settings
+from core.instrumentation import instrument_engine
+from core.querywatch import watch_engine
+from core.slowquery import slow_query_log
+
+# bound to the engine by get_engine(); call that (or run the app lifespan) before opening sessions
+SessionLocal = async_sessionmaker(class_=AsyncSession, expire_on_commit=False)
+
+_engine: Optional[AsyncEngine] = None
+
+def get_engine() -> AsyncEngine:
+    """The app's engine, created and bound to SessionLocal on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            settings.SQLALCHEMY_DATABASE_URI,
+            echo=False,
+            pool_size=settings.POSTGRES_POOL_SIZE,
+            max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+        )
+        instrument_engine(_engine)
+        if settings.SLOW_QUERY_THRESHOLD_MS is not None:
+            slow_query_log.attach(_engine)
+        if settings.QUERY_WATCH_ENABLED:
+            watch_engine(_engine)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+async def prefill_pool(engine: AsyncEngine, size: int) -> None:
+    """Open ``size`` connections at once and return them to the pool, so early requests skip connection setup."""
+    if size <= 0:
+        return
+    connections = await asyncio.gather(*(engine.connect().start() for _ in range(size)))
+    await asyncio.gather(*(connection.close() for connection in connections))
 
-engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=False)
-SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
\ No newline at end of file
+async def dispose_engine() -> None:
+    """Close every pooled connection; the next get_engine() starts a fresh engine."""
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
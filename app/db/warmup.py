@@ -0,0 +1,66 @@
+import logging
+import time
+from typing import Callable, List
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import configure_mappers
+
+import crud
+import schemas
+from api.sparse import SparseFields, adapter, sparse_model
+from crud.crud_conversation import CONVERSATION_SUMMARY_FIELDS
+from crud.crud_memory import MEMORY_SUMMARY_FIELDS
+from crud.loading import PROFILES, profile_options
+from crud.projection import projection
+from models.conversation import Conversation
+from models.memory import Memory
+
+logger = logging.getLogger(__name__)
+
+_NO_ID = UUID(int=0)
+_NO_DISCORD_ID = 0
+
+def warm_caches() -> None:
+    """Configure mappers and build the cached serializers, projections and loader options requests use."""
+    configure_mappers()
+    for name, profile in PROFILES.items():
+        profile_options(profile.model, name)
+    projection(Conversation, CONVERSATION_SUMMARY_FIELDS)
+    projection(Memory, MEMORY_SUMMARY_FIELDS)
+    default = SparseFields()
+    for schema in (schemas.User, schemas.Pal):
+        adapter(sparse_model(schema, default.fields, default.expand))
+    adapter(List[schemas.ConversationSummary])
+
+async def warm_statements(session_factory: Callable[[], AsyncSession]) -> None:
+    """
+    Run the hot read paths once with keys that match nothing, so their SQL is
+    compiled into the engine's statement cache and prepared on a connection
+    before real traffic arrives. Failures are logged, not raised.
+    """
+    async with session_factory() as db:
+        for name, warm in (
+            ("user by id", lambda: crud.user.get(db, _NO_ID)),
+            ("user by email", lambda: crud.user.get_by_email(db, email="warmup@invalid")),
+            ("bot context", lambda: crud.user.get_user_data_by_discord_id(db, _NO_DISCORD_ID)),
+            ("user context", lambda: crud.user.get_user_context_by_discord_id(db, _NO_DISCORD_ID)),
+            ("user version", lambda: crud.user.get_version(db, _NO_ID)),
+            ("pal by user", lambda: crud.pal.get_by_user_id(db, _NO_ID)),
+            ("pal version", lambda: crud.pal.get_version(db, _NO_ID)),
+            ("conversation page", lambda: crud.conversation.get_with_messages(db, _NO_ID)),
+            ("conversation list", lambda: crud.conversation.get_collection_version(db, _NO_ID)),
+            ("memories", lambda: crud.memory.get_by_user_projected(db, _NO_ID)),
+        ):
+            try:
+                await warm()
+            except Exception:
+                logger.warning("Warm-up query %r failed", name, exc_info=True)
+                await db.rollback()
+
+async def warm_up(session_factory: Callable[[], AsyncSession]) -> float:
+    """Warm caches and statements; returns the seconds it took."""
+    started = time.perf_counter()
+    warm_caches()
+    await warm_statements(session_factory)
+    return time.perf_counter() - started
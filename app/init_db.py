@@ -1,9 +1,13 @@
 import asyncio
+import logging
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
 from core.config import settings
+from core.log import configure_logging
 from db.base import Base
 
+logger = logging.getLogger(__name__)
+
 async def drop_all_tables_cascade(engine):
     async with engine.connect() as conn:
         # Fetch all table names
@@ -20,7 +24,7 @@ async def drop_all_tables_cascade(engine):
 
 
 async def init_db():
-    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=True)
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=False)
     
     async with engine.begin() as conn:
         await drop_all_tables_cascade(engine)
@@ -29,7 +33,8 @@ async def init_db():
     
     await engine.dispose()
 
-    print("Database tables created successfully!")
+    logger.info("Database tables created")
 
 if __name__ == "__main__":
+    configure_logging()
     asyncio.run(init_db())
\ No newline at end of file
@@ -1,28 +1,122 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 import uvicorn
-# temporary fix for ImportError #
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# temporary fix for ImportError #
-from app.api.api_v1.api import api_router
-from app.core.config import settings
-
-app = FastAPI(
-    title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
-)
-
-if settings.BACKEND_CORS_ORIGINS:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+from api.api_v1.api import api_router
+from core.config import settings
+from core.instrumentation import MetricsMiddleware, in_flight, metrics_allowed
+from core.log import configure_logging
+from core.metrics import registry
+from core.querywatch import QueryWatchMiddleware
+from core.slowquery import slow_query_log
+from db.session import SessionLocal, dispose_engine, get_engine, prefill_pool
+from db.warmup import warm_up
+from services.cache_invalidation import cache_invalidation
+from services.memory_access import memory_access
+from services.memory_budget import memory_compactor
+from services.memory_index import memory_index
+
+logger = logging.getLogger(__name__)
+
+startup_seconds = registry.gauge("app_startup_seconds", "Time from lifespan start until the app accepted requests")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    engine = get_engine()
+    await prefill_pool(engine, min(settings.POSTGRES_POOL_PREFILL, settings.POSTGRES_POOL_SIZE))
+    warm_seconds = await warm_up(SessionLocal) if settings.STARTUP_WARMUP else 0.0
+    if settings.CACHE_INVALIDATION_ENABLED:
+        cache_invalidation.start()
+    memory_access.start(SessionLocal)
+    memory_compactor.start(SessionLocal, engine)
+    memory_index.start()
+    elapsed = time.perf_counter() - started
+    startup_seconds.set(elapsed)
+    app.state.started_at = time.time()
+    app.state.ready = True
+    logger.info(
+        "Started in %.0f ms", elapsed * 1000,
+        extra={"pool_prefill": settings.POSTGRES_POOL_PREFILL, "warmup_ms": round(warm_seconds * 1000, 1)},
+    )
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await memory_index.stop()
+        await memory_compactor.stop()
+        await memory_access.stop()
+        await cache_invalidation.stop()
+        await slow_query_log.stop()
+        await dispose_engine()
+
+def create_app() -> FastAPI:
+    configure_logging()
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
     )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
+    if settings.BACKEND_CORS_ORIGINS:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+
+    if settings.QUERY_WATCH_ENABLED:
+        app.add_middleware(QueryWatchMiddleware)
+
+    if settings.METRICS_MODE != "off":
+        app.add_middleware(MetricsMiddleware)
+
+    if settings.METRICS_MODE != "off" and settings.METRICS_ALLOWED_NETWORKS:
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics(request: Request) -> PlainTextResponse:
+            # behind a proxy the client is the X-Forwarded-For address uvicorn trusts
+            if not metrics_allowed(request.client.host if request.client else None):
+                return PlainTextResponse("Not Found", status_code=404)
+            return PlainTextResponse(registry.exposition(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/healthz", include_in_schema=False)
+    async def healthz(request: Request) -> ORJSONResponse:
+        """
+        Health of the worker that answers: 503 until startup finishes, while
+        shutting down, or when the database does not answer a ``SELECT 1`` in
+        time. The pid tells workers apart behind a shared port.
+        """
+        ready = getattr(request.app.state, "ready", False)
+        body = {"status": "unavailable", "pid": os.getpid(), "ready": ready, "in_flight": in_flight.value}
+        if not ready:
+            return ORJSONResponse(body, status_code=503)
+
+        engine = get_engine()
+        try:
+            async with asyncio.timeout(settings.HEALTHCHECK_TIMEOUT_SECONDS):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            body["database"] = "ok"
+        except Exception:
+            body["database"] = "unavailable"
+        body["uptime_seconds"] = round(time.time() - request.app.state.started_at, 1)
+        body["pool"] = {"size": engine.pool.size(), "checked_out": engine.pool.checkedout()}
+        if body["database"] == "ok":
+            body["status"] = "ok"
+        return ORJSONResponse(body, status_code=200 if body["status"] == "ok" else 503)
+
+    return app
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8080, reload=True)
+    uvicorn.run("main:create_app", factory=True, host="0.0.0.0", port=8080, reload=True)
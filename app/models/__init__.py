@@ -1,10 +1,8 @@
-from typing import TYPE_CHECKING
+from .user import User
+from .conversation import Conversation, Message
+from .pal import Pal
+from .token import Token
+from .memory import Memory, MemoryArchive
+from .media import Media
 
-if TYPE_CHECKING:
-    from .user import User
-    from .conversation import Conversation, Message
-    from .pal import Pal
-    from .token import Token
-    from .memory import Memory
-
-__all__ = ["User", "Conversation", "Message", "Pal", "Token", "Memory"]
\ No newline at end of file
+__all__ = ["User", "Conversation", "Message", "Pal", "Token", "Memory", "MemoryArchive", "Media"]
@@ -21,20 +21,21 @@ class Conversation(Base):
     is_analyzed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
-    user: Mapped["User"] = relationship("User", back_populates="conversations", foreign_keys=[user_id])
-    messages: Mapped[List["Message"]] = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
-    memories: Mapped[List["Memory"]] = relationship("Memory", back_populates="conversation", cascade="all, delete-orphan")
+    user: Mapped["User"] = relationship("User", back_populates="conversations", foreign_keys=[user_id], lazy="raise")
+    messages: Mapped[List["Message"]] = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", lazy="raise")
+    memories: Mapped[List["Memory"]] = relationship("Memory", back_populates="conversation", cascade="all, delete-orphan", lazy="raise")
 
 class Message(Base):
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid4)
     conversation_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("conversation.id"), nullable=False)
     content: Mapped[str] = mapped_column(String, nullable=False)
     is_from_user: Mapped[bool] = mapped_column(nullable=False)
+    discord_message_id: Mapped[Optional[int]] = mapped_column(BigInteger, unique=True, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
-    conversation: Mapped["Conversation"] = relationship("Conversation", back_populates="messages")
+    conversation: Mapped["Conversation"] = relationship("Conversation", back_populates="messages", lazy="raise")
     media_id: Mapped[Optional[UUIDType]] = mapped_column(UUID(as_uuid=True), ForeignKey("media.id"), nullable=True)
-    media: Mapped[Optional["Media"]] = relationship("Media")
+    media: Mapped[Optional["Media"]] = relationship("Media", lazy="raise")
 
 from models.user import User
 from models.memory import Memory
@@ -10,8 +10,17 @@ from schemas.conversation import MediaType
 from db.base_class import Base
 
 class Media(Base):
+    # url is unique so CRUDMedia.upsert_by_url can race safely. A database
+    # created before the constraint may hold duplicate urls; point messages
+    # at the oldest copy and drop the rest before adding it:
+    #
+    #   CREATE TEMP TABLE media_dupe AS
+    #     SELECT id, first_value(id) OVER (PARTITION BY url ORDER BY created_at, id) AS keep FROM media;
+    #   UPDATE message SET media_id = d.keep FROM media_dupe d WHERE message.media_id = d.id AND d.id <> d.keep;
+    #   DELETE FROM media USING media_dupe d WHERE media.id = d.id AND d.id <> d.keep;
+    #   ALTER TABLE media ADD CONSTRAINT media_url_key UNIQUE (url);
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid4)
-    url: Mapped[str] = mapped_column(String, nullable=False)
+    url: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     type: Mapped[MediaType] = mapped_column(Enum(MediaType), nullable=False)
     title: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
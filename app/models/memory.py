@@ -1,10 +1,10 @@
 from datetime import datetime
-from sqlalchemy import event, String, DateTime, ForeignKey, Integer, BigInteger, CheckConstraint
+from sqlalchemy import String, DateTime, ForeignKey, Integer, BigInteger, CheckConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from uuid import uuid4
-from typing import Optional
+from typing import List, Optional
 
 from db.base_class import Base
 
@@ -17,16 +17,33 @@ class Memory(Base):
     importance: Mapped[int] = mapped_column(Integer, CheckConstraint('importance BETWEEN 1 AND 10'), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     last_accessed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # MinHash LSH band keys of content (utils.minhash.band_keys), probed by find_duplicate.
+    # Existing databases: ALTER TABLE memory ADD COLUMN lsh_bands bigint[];
+    #   CREATE INDEX ix_memory_lsh_bands ON memory USING gin (lsh_bands);
+    # the consolidation job fills in rows where it is NULL.
+    lsh_bands: Mapped[Optional[List[int]]] = mapped_column(ARRAY(BigInteger), nullable=True)
+
+    __table_args__ = (
+        Index("ix_memory_user_id_importance", "user_id", importance.desc()),
+        Index("ix_memory_lsh_bands", "lsh_bands", postgresql_using="gin"),
+        {'extend_existing': True},
+    )
 
     #user: Mapped["User"] = relationship("User", back_populates="memories")
-    conversation: Mapped["Conversation"] = relationship("Conversation", back_populates="memories")
+    conversation: Mapped["Conversation"] = relationship("Conversation", back_populates="memories", lazy="raise")
 
-    def access(self):
-        self.last_accessed_at = datetime.now()
+class MemoryArchive(Base):
+    __tablename__ = "memory_archive"
 
-@event.listens_for(Memory, 'load')
-def receive_load(target, context):
-    target.access()
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    user_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    discord_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    conversation_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    content: Mapped[str] = mapped_column(String, nullable=False)
+    importance: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_accessed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 from models.user import User
 from models.conversation import Conversation
\ No newline at end of file
@@ -26,6 +26,6 @@ class Pal(Base):
         nullable=False,
     )
 
-    user: Mapped["User"] = relationship("User", back_populates="pal")
+    user: Mapped["User"] = relationship("User", back_populates="pal", lazy="raise")
 
 from models.user import User
\ No newline at end of file
@@ -9,4 +9,4 @@ from models.user import User
 class Token(Base):
     token: Mapped[str] = mapped_column(primary_key=True, index=True)
     authenticates_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("user.id"))
-    authenticates: Mapped["User"] = relationship(back_populates="refresh_tokens")
\ No newline at end of file
+    authenticates: Mapped["User"] = relationship(back_populates="refresh_tokens", lazy="raise")
\ No newline at end of file
@@ -29,12 +29,12 @@ class User(Base):
     last_login: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     refresh_tokens: Mapped[list["Token"]] = relationship(
-        foreign_keys="[Token.authenticates_id]", back_populates="authenticates", lazy="dynamic"
+        foreign_keys="[Token.authenticates_id]", back_populates="authenticates", lazy="raise"
     )
-    conversations: Mapped[List["Conversation"]] = relationship("Conversation", back_populates="user", cascade="all, delete-orphan", order_by="desc(Conversation.updated_at)", foreign_keys="[Conversation.user_id]")
+    conversations: Mapped[List["Conversation"]] = relationship("Conversation", back_populates="user", cascade="all, delete-orphan", order_by="desc(Conversation.updated_at)", foreign_keys="[Conversation.user_id]", lazy="raise")
     active_conversation_id: Mapped[Optional[UUID]] = mapped_column(ForeignKey("conversation.id", ondelete="SET NULL"), nullable=True)
-    active_conversation: Mapped[Optional["Conversation"]] = relationship("Conversation", foreign_keys=[active_conversation_id], post_update=True)
-    pal: Mapped["Pal"] = relationship("Pal", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    active_conversation: Mapped[Optional["Conversation"]] = relationship("Conversation", foreign_keys=[active_conversation_id], post_update=True, lazy="raise")
+    pal: Mapped["Pal"] = relationship("Pal", back_populates="user", uselist=False, cascade="all, delete-orphan", lazy="raise")
 
 
 from models.conversation import Conversation
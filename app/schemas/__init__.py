@@ -9,18 +9,22 @@ from .conversation import (
     ConversationCreate,
     ConversationUpdate,
     Conversation,
+    ConversationSummary,
     MessageCreate,
     Message,
 )
+from .patch import JSONBPatch
 from .pal import (
     PalCreate,
     PalUpdate,
+    PalPatch,
     Pal,
 )
 from .memory import (
     MemoryCreate,
     MemoryUpdate,
     Memory,
+    MemorySummary,
 )
 from .token import (
     RefreshTokenCreate,
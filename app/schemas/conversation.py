@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict, HttpUrl
 from typing import List, Optional, Union
+from datetime import datetime
 from uuid import UUID
 import enum
 
@@ -29,6 +30,7 @@ class MessageBase(BaseModel):
     content: str
     is_from_user: bool
     media_id: Optional[UUID] = None
+    discord_message_id: Optional[int] = None
 
 class MessageCreate(MessageBase):
     pass
@@ -64,3 +66,10 @@ class Conversation(ConversationBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ConversationSummary(ConversationBase):
+    """Read model matching crud.crud_conversation.CONVERSATION_SUMMARY_FIELDS projections."""
+    id: UUID
+    is_active: bool
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
 from uuid import UUID
 from typing import Union, Optional
 
@@ -21,3 +22,11 @@ class Memory(MemoryBase):
     discord_id: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True, exclude_unset=True)
+
+
+class MemorySummary(MemoryBase):
+    """Read model matching crud.crud_memory.MEMORY_SUMMARY_FIELDS projections."""
+    id: UUID
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -2,6 +2,8 @@ from pydantic import BaseModel, ConfigDict
 from typing import Dict, Any, Optional, Union
 from uuid import UUID
 
+from .patch import JSONBPatch
+
 class PalBase(BaseModel):
     name: str
     personality: Dict[str, Any]
@@ -21,6 +23,10 @@ class PalUpdate(BaseModel):
     bio: Optional[str] = None
     preferences: Optional[Dict[str, Any]] = None    
 
+class PalPatch(BaseModel):
+    personality: Optional[JSONBPatch] = None
+    preferences: Optional[JSONBPatch] = None
+
 class Pal(PalBase):
     id: UUID
     user_id: UUID
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, model_validator
+from typing import Any, Dict, List
+
+class JSONBPatch(BaseModel):
+    """
+    In-place edit of a JSONB object column: ``remove`` top-level keys, then
+    ``merge`` keys in, then add ``increment`` deltas to numeric values
+    (missing keys count as 0). A key may appear in only one of the three.
+    """
+    merge: Dict[str, Any] = {}
+    remove: List[str] = []
+    increment: Dict[str, float] = {}
+
+    @model_validator(mode="after")
+    def check_disjoint_keys(self):
+        keys = [*self.merge, *self.remove, *self.increment]
+        if len(keys) != len(set(keys)):
+            raise ValueError("a key may only be merged, removed or incremented once per patch")
+        return self
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.merge or self.remove or self.increment)
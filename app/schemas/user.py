@@ -55,7 +55,7 @@ class User(UserInDBBase):
     pal: Optional[Pal] = None
     # memories: List[Memory] = []
 
-    @field_validator("hashed_password")
+    @field_validator("hashed_password", mode="before")
     def evaluate_hashed_password(cls, hashed_password):
         return bool(hashed_password)
 
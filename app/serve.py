@@ -0,0 +1,94 @@
+"""
+Production entry point: several uvicorn worker processes on uvloop and
+httptools, sharing one JWT signing key and splitting one database
+connection budget. With more than one worker, cache invalidations are
+passed between workers over Postgres LISTEN/NOTIFY. Run from app/:
+
+    SECRET_KEY_FILE=/run/secrets/jwt python serve.py --workers 4
+"""
+import argparse
+import logging
+import os
+import secrets
+from dataclasses import dataclass
+
+import uvicorn
+
+from core.config import settings
+from core.log import configure_logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class WorkerPool:
+    pool_size: int
+    max_overflow: int
+    prefill: int
+
+def worker_pool(budget: int, workers: int) -> WorkerPool:
+    """
+    Each worker's share of ``budget`` connections. The slow-query EXPLAIN
+    engine may hold one more connection per worker, and with several
+    workers each keeps a cache invalidation listener open, so those
+    connections are taken out of the share. Overflow is off, so all workers
+    together never exceed the budget.
+    """
+    reserved = 1 if settings.SLOW_QUERY_THRESHOLD_MS is not None else 0
+    if workers > 1:
+        reserved += 1
+    share = budget // workers - reserved
+    if share < 1:
+        raise ValueError(f"A budget of {budget} connections is too small for {workers} workers")
+    return WorkerPool(pool_size=share, max_overflow=0, prefill=min(settings.POSTGRES_POOL_PREFILL, share))
+
+def share_secret_key() -> None:
+    """
+    Make sure every worker signs with the same key. Workers are separate
+    processes that each build their own Settings, so without SECRET_KEY or
+    SECRET_KEY_FILE each would pick its own random default; instead one key
+    is generated here and handed to all of them through the environment.
+    """
+    if settings.SECRET_KEY_FILE or os.environ.get("SECRET_KEY"):
+        return
+    logger.warning("SECRET_KEY is not set; using a random key, so tokens will not survive a restart")
+    os.environ["SECRET_KEY"] = secrets.token_urlsafe(32)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=settings.SERVER_BIND)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--connection-budget", type=int, default=settings.DB_CONNECTION_BUDGET)
+    args = parser.parse_args()
+
+    configure_logging()
+    pool = worker_pool(args.connection_budget, args.workers)
+    # workers are spawned, not forked; they read these when they build their Settings
+    share_secret_key()
+    os.environ.update(
+        POSTGRES_POOL_SIZE=str(pool.pool_size),
+        POSTGRES_MAX_OVERFLOW=str(pool.max_overflow),
+        POSTGRES_POOL_PREFILL=str(pool.prefill),
+    )
+    if args.workers > 1:
+        # each worker caches users, personas and identities; writes in one must reach the others
+        os.environ["CACHE_INVALIDATION_ENABLED"] = "true"
+    logger.info(
+        "Starting %d workers on %s:%d", args.workers, args.host, args.port,
+        extra={"pool_size": pool.pool_size, "connection_budget": args.connection_budget},
+    )
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop",
+        http="httptools",
+        log_config=None,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+import orjson
+from sqlalchemy.engine import make_url
+
+from core.config import settings
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+invalidations = registry.counter(
+    "cache_invalidations_total", "Cache invalidations exchanged with other workers", ["direction"],
+)
+
+CHANNEL = "cache_invalidation"
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD_BYTES = 7000
+
+def listener_dsn() -> str:
+    """The app's database URL in the form asyncpg accepts."""
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI)).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+class CacheInvalidationBus:
+    """
+    Carries cache invalidations between worker processes over Postgres
+    LISTEN/NOTIFY. Caches ``register`` a handler per kind and call
+    ``publish`` from their invalidation methods; the bus sends the keys to
+    every other worker, which hands them to the same kind's handler. Keys
+    must be JSON values.
+
+    Notifications sent while a worker is not listening are lost, so on
+    every (re)connect all registered caches are cleared. ``publish`` is a
+    no-op until ``start``, so single-process runs pay nothing.
+    """
+    def __init__(self, retry_interval: float = 1.0):
+        self.retry_interval = retry_interval
+        self._handlers: Dict[str, Tuple[Callable[[Any], None], Callable[[], None]]] = {}
+        self._pending: Dict[str, List[Any]] = {}
+        self._applying = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, invalidate: Callable[[Any], None], clear: Callable[[], None]) -> None:
+        self._handlers[kind] = (invalidate, clear)
+
+    def publish(self, kind: str, key: Any) -> None:
+        # keys applied from another worker are not sent back out
+        if self._wakeup is None or self._applying:
+            return
+        self._pending.setdefault(kind, []).append(key)
+        self._wakeup.set()
+
+    def start(self, dsn: Optional[str] = None) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._connected = asyncio.Event()
+        self._task = asyncio.create_task(self._run(dsn or listener_dsn()))
+
+    async def wait_connected(self) -> None:
+        await self._connected.wait()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+        self._connected = None
+        self._pending.clear()
+
+    def _clear_all(self) -> None:
+        for _, clear in self._handlers.values():
+            clear()
+
+    def _receive(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        if pid == connection.get_server_pid():
+            return
+        try:
+            message = orjson.loads(payload)
+            invalidate, _ = self._handlers[message["kind"]]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            logger.warning("Ignoring malformed cache invalidation from backend %d", pid)
+            return
+        self._applying = True
+        try:
+            for key in message["keys"]:
+                invalidate(key)
+        finally:
+            self._applying = False
+        invalidations.labels("received").inc(len(message["keys"]))
+
+    def _payloads(self, pending: Dict[str, List[Any]]) -> List[bytes]:
+        payloads = []
+        for kind, keys in pending.items():
+            chunk: List[Any] = []
+            size = 0
+            for key in keys:
+                encoded = len(orjson.dumps(key)) + 1
+                if chunk and size + encoded > MAX_PAYLOAD_BYTES:
+                    payloads.append(orjson.dumps({"kind": kind, "keys": chunk}))
+                    chunk, size = [], 0
+                chunk.append(key)
+                size += encoded
+            if chunk:
+                payloads.append(orjson.dumps({"kind": kind, "keys": chunk}))
+        return payloads
+
+    async def _run(self, dsn: str) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(CHANNEL, self._receive)
+                # anything sent while we were not listening was missed
+                self._clear_all()
+                self._connected.set()
+                while True:
+                    await self._wakeup.wait()
+                    self._wakeup.clear()
+                    pending, self._pending = self._pending, {}
+                    try:
+                        for payload in self._payloads(pending):
+                            await connection.execute("SELECT pg_notify($1, $2)", CHANNEL, payload.decode())
+                    except BaseException:
+                        # put the keys back so they are sent after reconnecting
+                        for kind, keys in pending.items():
+                            self._pending.setdefault(kind, [])[:0] = keys
+                        raise
+                    invalidations.labels("sent").inc(sum(len(keys) for keys in pending.values()))
+            except Exception:
+                logger.exception("Cache invalidation listener lost its connection; retrying")
+                self._connected.clear()
+                if self._pending:
+                    self._wakeup.set()
+            finally:
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(self.retry_interval)
+
+cache_invalidation = CacheInvalidationBus()
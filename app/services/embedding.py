@@ -0,0 +1,52 @@
+import hashlib
+import re
+from typing import Iterator, Protocol, Sequence
+
+import numpy as np
+
+from core.config import settings
+
+_WORD = re.compile(r"\w+")
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 array of L2-normalised vectors."""
+        ...
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder. Runs locally with no model, network
+    or GPU; similar wording lands on similar vectors.
+    """
+    name = "hashing-v1"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> Iterator[str]:
+        words = _WORD.findall(text.lower())
+        for word in words:
+            yield f"w:{word}"
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield f"c:{padded[i:i + 3]}"
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+def get_embedder(name: str = settings.MEMORY_EMBEDDER) -> Embedder:
+    if name == "hashing":
+        return HashingEmbedder(dim=settings.MEMORY_EMBEDDING_DIM)
+    raise ValueError(f"Unknown embedder: {name}")
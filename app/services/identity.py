@@ -0,0 +1,148 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import BigInteger, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.metrics import registry
+from models.user import User
+from services.cache_invalidation import cache_invalidation
+
+identity_lookups = registry.counter("identity_lookups_total", "Identity resolver lookups", ["result"])
+
+UserIdentifier = Union[UUID, int]
+
+class IdentityResolver:
+    """
+    Resolves a user identifier (``User.id`` or Discord id) to
+    ``(User.id, User.discord_id)``. Hits come from a bounded LRU whose
+    entries expire after ``ttl``; ids with no user are remembered for a
+    short ``negative_ttl`` so repeated misses stay cheap. Call ``invalidate``
+    whenever the mapping of a user changes; it is sent to the other workers
+    through ``cache_invalidation``, and the TTL bounds staleness if a
+    message is lost.
+    """
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[UserIdentifier, Tuple[Tuple[UUID, Optional[int]], float]]" = OrderedDict()
+        self._negative: "OrderedDict[UserIdentifier, float]" = OrderedDict()
+
+    def _lookup(self, identifier: UserIdentifier) -> Optional[Tuple[UUID, Optional[int]]]:
+        stored = self._entries.get(identifier)
+        if stored is None:
+            return None
+        entry, expires = stored
+        if expires < time.monotonic():
+            del self._entries[identifier]
+            identity_lookups.labels("expired").inc()
+            return None
+        self._entries.move_to_end(identifier)
+        identity_lookups.labels("hit").inc()
+        return entry
+
+    def _is_known_missing(self, identifier: UserIdentifier) -> bool:
+        expires = self._negative.get(identifier)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._negative[identifier]
+            return False
+        identity_lookups.labels("negative_hit").inc()
+        return True
+
+    def _store(self, user_id: UUID, discord_id: Optional[int]) -> None:
+        entry = (user_id, discord_id)
+        keys = (user_id,) if discord_id is None else (user_id, discord_id)
+        expires = time.monotonic() + self.ttl
+        for key in keys:
+            self._entries[key] = (entry, expires)
+            self._entries.move_to_end(key)
+            self._negative.pop(key, None)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _store_missing(self, identifier: UserIdentifier) -> None:
+        self._negative[identifier] = time.monotonic() + self.negative_ttl
+        self._negative.move_to_end(identifier)
+        while len(self._negative) > self.max_entries:
+            self._negative.popitem(last=False)
+
+    async def resolve(self, db: AsyncSession, user_identifier: UserIdentifier) -> Tuple[UUID, Optional[int]]:
+        entry = self._lookup(user_identifier)
+        if entry is not None:
+            return entry
+        if self._is_known_missing(user_identifier):
+            raise ValueError(f"No user found with identifier {user_identifier}")
+
+        identity_lookups.labels("miss").inc()
+        if isinstance(user_identifier, UUID):
+            stmt = select(User.id, User.discord_id).where(User.id == user_identifier)
+        else:
+            stmt = select(User.id, User.discord_id).where(User.discord_id == user_identifier)
+        user_info = (await db.execute(stmt)).first()
+        if user_info is None:
+            self._store_missing(user_identifier)
+            raise ValueError(f"No user found with identifier {user_identifier}")
+
+        self._store(user_info.id, user_info.discord_id)
+        return user_info.id, user_info.discord_id
+
+    async def resolve_many(self, db: AsyncSession, discord_ids: Iterable[int]) -> Dict[int, UUID]:
+        """Map Discord ids to user ids with at most one query; unknown ids are omitted."""
+        resolved: Dict[int, UUID] = {}
+        to_load = []
+        for discord_id in dict.fromkeys(discord_ids):
+            entry = self._lookup(discord_id)
+            if entry is not None:
+                resolved[discord_id] = entry[0]
+            elif not self._is_known_missing(discord_id):
+                to_load.append(discord_id)
+        if not to_load:
+            return resolved
+
+        identity_lookups.labels("miss").inc(len(to_load))
+        stmt = select(User.id, User.discord_id).where(
+            User.discord_id == any_(bindparam("discord_ids", to_load, type_=ARRAY(BigInteger)))
+        )
+        for row in (await db.execute(stmt)).all():
+            self._store(row.id, row.discord_id)
+            resolved[row.discord_id] = row.id
+        for discord_id in to_load:
+            if discord_id not in resolved:
+                self._store_missing(discord_id)
+        return resolved
+
+    def invalidate(self, user_id: Optional[UUID] = None, discord_id: Optional[int] = None) -> None:
+        for key in (user_id, discord_id):
+            if key is None:
+                continue
+            stored = self._entries.pop(key, None)
+            self._negative.pop(key, None)
+            if stored is not None:
+                # drop the entry's other key too
+                for other in stored[0]:
+                    if other is not None:
+                        self._entries.pop(other, None)
+        if user_id is not None or discord_id is not None:
+            cache_invalidation.publish("identity", [None if user_id is None else str(user_id), discord_id])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._negative.clear()
+
+identity_resolver = IdentityResolver(
+    max_entries=settings.IDENTITY_CACHE_SIZE,
+    ttl=settings.IDENTITY_CACHE_TTL_SECONDS,
+    negative_ttl=settings.IDENTITY_NEGATIVE_TTL_SECONDS,
+)
+cache_invalidation.register(
+    "identity",
+    lambda key: identity_resolver.invalidate(None if key[0] is None else UUID(key[0]), key[1]),
+    identity_resolver.clear,
+)
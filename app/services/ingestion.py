@@ -0,0 +1,251 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.metrics import registry
+from models.conversation import Message
+from models.user import User
+from schemas.conversation import ConversationCreate
+from services.identity import identity_resolver
+from services.user_context import user_context_cache
+
+logger = logging.getLogger(__name__)
+
+queue_depth = registry.gauge("ingest_queue_depth", "Gateway messages waiting to be written")
+batch_size_hist = registry.histogram(
+    "ingest_batch_size", "Messages per multi-row insert", buckets=(1, 5, 10, 50, 100, 250, 500, 1000)
+)
+enqueue_wait = registry.histogram("ingest_enqueue_wait_seconds", "Time a producer waited on a full queue")
+ingested = registry.counter("ingest_messages_total", "Gateway messages by outcome", ["outcome"])
+dead_letter_depth = registry.gauge("ingest_dead_letter_depth", "Gateway messages waiting in the dead-letter buffer")
+
+@dataclass(frozen=True, slots=True)
+class GatewayMessage:
+    """
+    The parts of a Discord gateway message the pipeline stores. ``user_discord_id``
+    is the user whose conversation the message belongs to (the author for
+    user messages, the DM recipient for the bot's own replies).
+    """
+    message_id: int
+    user_discord_id: int
+    channel_id: int
+    content: str
+    is_from_user: bool = True
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_discord(cls, message, *, bot_user_id: int) -> Optional["GatewayMessage"]:
+        is_from_user = message.author.id != bot_user_id
+        if is_from_user:
+            user_discord_id = message.author.id
+        else:
+            recipient = getattr(message.channel, "recipient", None)
+            if recipient is None:
+                return None
+            user_discord_id = recipient.id
+        return cls(
+            message_id=message.id,
+            user_discord_id=user_discord_id,
+            channel_id=message.channel.id,
+            content=message.content,
+            is_from_user=is_from_user,
+            created_at=message.created_at,
+        )
+
+@dataclass(frozen=True, slots=True)
+class WriteResult:
+    """What a writer did with a batch; events neither inserted nor skipped were duplicates."""
+    inserted: int
+    skipped: int = 0
+
+Writer = Callable[[List[GatewayMessage]], Awaitable[WriteResult]]
+
+async def _active_conversations(db: AsyncSession, user_ids: List[UUID]) -> Dict[UUID, Optional[UUID]]:
+    result = await db.execute(select(User.id, User.active_conversation_id).where(User.id.in_(user_ids)))
+    return {row.id: row.active_conversation_id for row in result.all()}
+
+def database_writer(session_factory: Callable[[], AsyncSession]) -> Writer:
+    """Writes a batch as one INSERT ... ON CONFLICT (discord_message_id) DO NOTHING."""
+    async def write(events: List[GatewayMessage]) -> WriteResult:
+        # imported here: crud imports services, so a module-level import would be circular
+        import crud
+
+        async with session_factory() as db:
+            users = await identity_resolver.resolve_many(db, {event.user_discord_id for event in events})
+            conversations = await _active_conversations(db, list(set(users.values())))
+            rows = []
+            for event in events:
+                user_id = users.get(event.user_discord_id)
+                if user_id is None:
+                    continue
+                if conversations.get(user_id) is None:
+                    conversation = await crud.conversation.create_with_messages(
+                        db, obj_in=ConversationCreate(user_identifier=user_id, dm_channel_id=event.channel_id)
+                    )
+                    conversations[user_id] = conversation.id
+                rows.append({
+                    "conversation_id": conversations[user_id],
+                    "content": event.content,
+                    "is_from_user": event.is_from_user,
+                    "discord_message_id": event.message_id,
+                    "created_at": event.created_at or datetime.now(timezone.utc),
+                })
+            if not rows:
+                return WriteResult(inserted=0, skipped=len(events))
+            stmt = (
+                insert(Message)
+                .on_conflict_do_nothing(index_elements=[Message.discord_message_id])
+                .returning(Message.id)
+            )
+            inserted = len((await db.execute(stmt, rows)).all())
+            await db.commit()
+            for user_id in {users[event.user_discord_id] for event in events if event.user_discord_id in users}:
+                user_context_cache.bump(user_id)
+            return WriteResult(inserted=inserted, skipped=len(events) - len(rows))
+    return write
+
+class MessageIngestor:
+    """
+    Write-behind pipeline for gateway messages. Producers ``submit`` onto a
+    bounded asyncio queue (waiting when it is full); a single worker drains
+    it into batches of up to ``batch_size`` or whatever arrived within
+    ``flush_interval`` and hands each batch to ``writer``. Redelivered
+    events are dropped in-batch and by the unique discord_message_id.
+    A batch the writer fails on is retried ``max_retries`` times with
+    exponential backoff (the queue backs up meanwhile), then kept in the
+    bounded ``dead_letters`` buffer until ``requeue_dead_letters``.
+    """
+    def __init__(
+        self,
+        writer: Writer,
+        *,
+        max_queue: int = settings.INGEST_QUEUE_SIZE,
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        flush_interval: float = settings.INGEST_FLUSH_INTERVAL_SECONDS,
+        max_retries: int = settings.INGEST_MAX_RETRIES,
+        retry_backoff: float = settings.INGEST_RETRY_BACKOFF_SECONDS,
+        dead_letter_size: int = settings.INGEST_DEAD_LETTER_SIZE,
+    ):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letters: Deque[GatewayMessage] = deque(maxlen=dead_letter_size)
+        self._queue: "asyncio.Queue[GatewayMessage]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def submit(self, event: GatewayMessage) -> None:
+        if self._queue.full():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await self._queue.put(event)
+            enqueue_wait.observe(loop.time() - started)
+        else:
+            self._queue.put_nowait(event)
+        queue_depth.set(self._queue.qsize())
+
+    def try_submit(self, event: GatewayMessage) -> bool:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            ingested.labels("rejected").inc()
+            return False
+        queue_depth.set(self._queue.qsize())
+        return True
+
+    async def requeue_dead_letters(self) -> int:
+        """Submit the dead-lettered events again, e.g. once the database is back."""
+        count = len(self.dead_letters)
+        for _ in range(count):
+            await self.submit(self.dead_letters.popleft())
+        dead_letter_depth.set(len(self.dead_letters))
+        return count
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker after writing everything already queued."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._task
+        self._task = None
+
+    async def _collect(self) -> List[GatewayMessage]:
+        loop = asyncio.get_running_loop()
+        try:
+            batch = [await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)]
+        except asyncio.TimeoutError:
+            return []
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: List[GatewayMessage]) -> None:
+        queue_depth.set(self._queue.qsize())
+        unique: Dict[int, GatewayMessage] = {}
+        for event in batch:
+            unique.setdefault(event.message_id, event)
+        events = list(unique.values())
+        if not events:
+            return
+        batch_size_hist.observe(len(events))
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await self.writer(events)
+                break
+            except Exception:
+                if attempt == self.max_retries:
+                    self._dead_letter(events)
+                    return
+                delay = self.retry_backoff * 2 ** attempt
+                ingested.labels("retried").inc(len(events))
+                logger.warning(
+                    "Failed to write %d gateway messages, retrying in %.1fs", len(events), delay, exc_info=True
+                )
+                await asyncio.sleep(delay)
+        ingested.labels("inserted").inc(result.inserted)
+        ingested.labels("unknown_user").inc(result.skipped)
+        ingested.labels("duplicate").inc(len(events) - result.inserted - result.skipped)
+        ingested.labels("redelivered").inc(len(batch) - len(events))
+
+    def _dead_letter(self, events: List[GatewayMessage]) -> None:
+        overflow = max(0, len(self.dead_letters) + len(events) - self.dead_letters.maxlen)
+        self.dead_letters.extend(events)
+        ingested.labels("dead_letter").inc(len(events))
+        ingested.labels("failed").inc(overflow)
+        dead_letter_depth.set(len(self.dead_letters))
+        logger.exception(
+            "Failed to write %d gateway messages after %d retries; dead-lettered them (%d oldest dropped)",
+            len(events), self.max_retries, overflow,
+        )
+
+    async def _run(self) -> None:
+        while not (self._closing and self._queue.empty()):
+            batch = await self._collect()
+            if batch:
+                await self._flush(batch)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.metrics import registry
+from db.locks import lock_key
+
+logger = logging.getLogger(__name__)
+
+flush_batch_size = registry.histogram(
+    "memory_access_flush_batch_size",
+    "Number of memories touched per bulk last_accessed_at update",
+    buckets=(1, 5, 10, 50, 100, 500, 1000, 5000),
+)
+flush_lag = registry.histogram(
+    "memory_access_flush_lag_seconds",
+    "Age of the oldest buffered memory access when it was flushed",
+)
+pending_accesses = registry.gauge("memory_access_pending", "Memory accesses waiting to be flushed")
+flush_failures = registry.counter("memory_access_flush_failures_total", "Failed memory access flushes")
+
+# one statement for the whole batch; never moves last_accessed_at backwards
+BULK_TOUCH = text("""
+    UPDATE memory
+    SET last_accessed_at = v.accessed_at
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:accessed_at AS timestamptz[])) AS v(id, accessed_at)
+    WHERE memory.id = v.id
+      AND (memory.last_accessed_at IS NULL OR memory.last_accessed_at < v.accessed_at)
+""")
+# flushes from all workers take this transaction lock, so only one process writes at a time
+FLUSH_LOCK = select(func.pg_advisory_xact_lock(lock_key("memory_access")))
+
+class MemoryAccessTracker:
+    """
+    Buffers memory accesses in process and writes them back as a single
+    bulk UPDATE, so reading memories never dirties the session. Each worker
+    flushes its own buffer, but flushes are serialized across workers by an
+    advisory lock so their updates never interleave on the same rows.
+    """
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[UUID, datetime] = {}
+        self._oldest: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._session_factory: Optional[Callable[[], AsyncSession]] = None
+
+    def record(self, memory_id: UUID, accessed_at: Optional[datetime] = None) -> None:
+        accessed_at = accessed_at or datetime.now(timezone.utc)
+        previous = self._pending.get(memory_id)
+        if previous is None or previous < accessed_at:
+            self._pending[memory_id] = accessed_at
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        pending_accesses.set(len(self._pending))
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    def record_many(self, memory_ids: Iterable[UUID], accessed_at: Optional[datetime] = None) -> None:
+        accessed_at = accessed_at or datetime.now(timezone.utc)
+        for memory_id in memory_ids:
+            self.record(memory_id, accessed_at)
+
+    async def flush(self, db: AsyncSession) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        oldest, self._oldest = self._oldest, None
+        try:
+            await db.execute(FLUSH_LOCK)
+            await db.execute(BULK_TOUCH, {"ids": list(batch.keys()), "accessed_at": list(batch.values())})
+            await db.commit()
+        except BaseException:
+            # put the batch back so the accesses are retried on the next flush, even if cancelled
+            for memory_id, accessed_at in batch.items():
+                self.record(memory_id, accessed_at)
+            self._oldest = oldest
+            raise
+        finally:
+            pending_accesses.set(len(self._pending))
+        flush_batch_size.observe(len(batch))
+        if oldest is not None:
+            flush_lag.observe(time.monotonic() - oldest)
+        return len(batch)
+
+    def start(self, session_factory: Callable[[], AsyncSession]) -> None:
+        if self._task is not None:
+            return
+        self._session_factory = session_factory
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher after it writes everything recorded so far."""
+        if self._task is None:
+            return
+        # never cancel a flush in flight: its batch is no longer in _pending
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            closing = self._closing
+            try:
+                async with self._session_factory() as db:
+                    await self.flush(db)
+            except Exception:
+                flush_failures.inc()
+                logger.exception("Failed to flush memory accesses")
+            if closing:
+                return
+
+memory_access = MemoryAccessTracker(
+    flush_interval=settings.MEMORY_ACCESS_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.MEMORY_ACCESS_MAX_PENDING,
+)
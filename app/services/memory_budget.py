@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, extract, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from core.config import settings
+from core.metrics import registry
+from db.locks import advisory_lock
+from models.memory import Memory, MemoryArchive
+from services.memory_index import memory_index
+from services.user_context import user_context_cache
+
+logger = logging.getLogger(__name__)
+
+evicted_memories = registry.counter("memory_budget_evicted_total", "Memories evicted by the budget compactor", ["mode"])
+compaction_duration = registry.histogram("memory_budget_pass_seconds", "Duration of one budget compaction pass")
+
+_ARCHIVED_COLUMNS = [
+    "id", "user_id", "discord_id", "conversation_id", "content", "importance", "created_at", "last_accessed_at",
+]
+
+def memory_score() -> ColumnElement:
+    """
+    Retention score; higher is kept. Importance dominates, with decaying
+    bonuses for being recently accessed and for being recently created.
+    """
+    half_life = settings.MEMORY_SCORE_HALF_LIFE_DAYS * 86400.0
+    since_access = extract("epoch", func.now() - func.coalesce(Memory.last_accessed_at, Memory.created_at))
+    age = extract("epoch", func.now() - Memory.created_at)
+    return (
+        settings.MEMORY_SCORE_IMPORTANCE_WEIGHT * Memory.importance / 10.0
+        + settings.MEMORY_SCORE_ACCESS_WEIGHT / (1 + since_access / half_life)
+        + settings.MEMORY_SCORE_AGE_WEIGHT / (1 + age / half_life)
+    )
+
+@dataclass
+class BudgetReport:
+    users: int = 0
+    evicted: int = 0
+
+async def enforce_budget(db: AsyncSession, user_ids: List[UUID], budget: int, mode: str) -> int:
+    ranked = (
+        select(
+            Memory.id,
+            func.row_number().over(partition_by=Memory.user_id, order_by=memory_score().desc()).label("rank"),
+        )
+        .where(Memory.user_id.in_(user_ids))
+        .subquery()
+    )
+    victims = select(ranked.c.id).where(ranked.c.rank > budget)
+    if mode == "archive":
+        # move rows in one statement: DELETE ... RETURNING feeds INSERT ... SELECT
+        moved = (
+            delete(Memory.__table__)
+            .where(Memory.__table__.c.id.in_(victims))
+            .returning(*(Memory.__table__.c[name] for name in _ARCHIVED_COLUMNS))
+            .cte("moved")
+        )
+        stmt = (
+            insert(MemoryArchive.__table__)
+            .from_select(_ARCHIVED_COLUMNS, select(*(moved.c[name] for name in _ARCHIVED_COLUMNS)))
+            .returning(MemoryArchive.__table__.c.id, MemoryArchive.__table__.c.user_id)
+        )
+    elif mode == "delete":
+        stmt = (
+            delete(Memory.__table__)
+            .where(Memory.__table__.c.id.in_(victims))
+            .returning(Memory.__table__.c.id, Memory.__table__.c.user_id)
+        )
+    else:
+        raise ValueError(f"Unknown eviction mode: {mode}")
+
+    rows = (await db.execute(stmt)).all()
+    await db.commit()
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row.user_id, []).append(row.id)
+    for user_id, memory_ids in by_user.items():
+        await memory_index.remove(user_id, memory_ids)
+        user_context_cache.bump(user_id)
+    evicted_memories.labels(mode).inc(len(rows))
+    return len(rows)
+
+async def compact(
+    session_factory: Callable[[], AsyncSession],
+    budget: Optional[int] = None,
+    mode: Optional[str] = None,
+    batch_size: Optional[int] = None,
+) -> BudgetReport:
+    budget = budget or settings.MEMORY_BUDGET_PER_USER
+    mode = mode or settings.MEMORY_EVICTION_MODE
+    batch_size = batch_size or settings.MEMORY_BUDGET_BATCH_SIZE
+    report = BudgetReport()
+    last_user_id = None
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    while True:
+        async with session_factory() as db:
+            query = (
+                select(Memory.user_id)
+                .group_by(Memory.user_id)
+                .having(func.count() > literal(budget))
+                .order_by(Memory.user_id)
+                .limit(batch_size)
+            )
+            if last_user_id is not None:
+                query = query.where(Memory.user_id > last_user_id)
+            user_ids = (await db.execute(query)).scalars().all()
+            if user_ids:
+                report.users += len(user_ids)
+                report.evicted += await enforce_budget(db, user_ids, budget, mode)
+        if len(user_ids) < batch_size:
+            break
+        last_user_id = user_ids[-1]
+    compaction_duration.observe(loop.time() - started)
+    return report
+
+class MemoryCompactor:
+    """
+    Runs budget compaction in the background every MEMORY_BUDGET_INTERVAL_SECONDS.
+    Every worker runs the timer, but a pass only runs in the worker that
+    takes the ``memory_budget`` advisory lock; the others skip that round.
+    """
+    LOCK = "memory_budget"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, session_factory: Callable[[], AsyncSession], engine: AsyncEngine) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(session_factory, engine))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self, session_factory: Callable[[], AsyncSession], engine: AsyncEngine) -> Optional[BudgetReport]:
+        """One compaction pass, or None if another worker is running one."""
+        async with advisory_lock(engine, self.LOCK) as conn:
+            if conn is None:
+                return None
+            return await compact(lambda: session_factory(bind=conn))
+
+    async def _run(self, session_factory: Callable[[], AsyncSession], engine: AsyncEngine) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                report = await self.run_once(session_factory, engine)
+                if report is not None and report.evicted:
+                    logger.info("Memory budget: evicted %d memories across %d users", report.evicted, report.users)
+            except Exception:
+                logger.exception("Memory budget compaction failed")
+
+memory_compactor = MemoryCompactor(interval=settings.MEMORY_BUDGET_INTERVAL_SECONDS)
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.memory import Memory
+from services.memory_index import memory_index
+from services.user_context import user_context_cache
+from utils.minhash import band_keys, find_clusters, signatures, similarity
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ConsolidationReport:
+    users: int = 0
+    memories_before: int = 0
+    memories_after: int = 0
+    clusters: int = 0
+
+    @property
+    def shrink_ratio(self) -> float:
+        if not self.memories_before:
+            return 0.0
+        return 1 - self.memories_after / self.memories_before
+
+def _latest(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [value for value in values if value is not None]
+    return max(present) if present else None
+
+async def memory_signatures(contents: Sequence[str]) -> np.ndarray:
+    """MinHash signatures of ``contents``, computed off the event loop."""
+    return await asyncio.to_thread(signatures, list(contents))
+
+async def consolidate_user(db: AsyncSession, user_id: UUID) -> ConsolidationReport:
+    result = await db.execute(
+        select(
+            Memory.id, Memory.content, Memory.importance, Memory.last_accessed_at, Memory.created_at, Memory.lsh_bands,
+        )
+        .where(Memory.user_id == user_id)
+        # the first member of a cluster is its representative
+        .order_by(Memory.importance.desc(), Memory.created_at)
+    )
+    rows = result.all()
+    report = ConsolidationReport(users=1, memories_before=len(rows), memories_after=len(rows))
+    sigs = await memory_signatures([row.content for row in rows])
+    clusters = await asyncio.to_thread(find_clusters, sigs, settings.MEMORY_DEDUP_THRESHOLD)
+
+    survivors, removed = [], []
+    for cluster in clusters:
+        members = [rows[i] for i in cluster]
+        keep = max(members, key=lambda row: (row.importance, row.last_accessed_at or row.created_at))
+        survivors.append({
+            "id": keep.id,
+            "importance": max(row.importance for row in members),
+            "last_accessed_at": _latest(*(row.last_accessed_at for row in members)),
+        })
+        removed.extend(row.id for row in members if row.id != keep.id)
+    # rows written before lsh_bands existed are invisible to find_duplicate until filled in
+    removed_ids = set(removed)
+    backfill = [
+        {"id": row.id, "lsh_bands": band_keys(sig)}
+        for row, sig in zip(rows, sigs)
+        if row.lsh_bands is None and row.id not in removed_ids
+    ]
+    if backfill:
+        await db.execute(update(Memory), backfill)
+    if not clusters:
+        await db.commit()
+        return report
+
+    await db.execute(update(Memory), survivors)
+    await db.execute(delete(Memory).where(Memory.id.in_(removed)))
+    await db.commit()
+    await memory_index.remove(user_id, removed)
+    user_context_cache.bump(user_id)
+
+    report.clusters = len(clusters)
+    report.memories_after -= len(removed)
+    return report
+
+async def consolidate_all(
+    session_factory: Callable[[], AsyncSession], batch_size: int = 100
+) -> ConsolidationReport:
+    report = ConsolidationReport()
+    last_user_id = None
+    while True:
+        async with session_factory() as db:
+            query = (
+                select(Memory.user_id)
+                .group_by(Memory.user_id)
+                .having(or_(func.count() > 1, func.bool_or(Memory.lsh_bands.is_(None))))
+                .order_by(Memory.user_id)
+                .limit(batch_size)
+            )
+            if last_user_id is not None:
+                query = query.where(Memory.user_id > last_user_id)
+            user_ids = (await db.execute(query)).scalars().all()
+            for user_id in user_ids:
+                user_report = await consolidate_user(db, user_id)
+                report.users += 1
+                report.memories_before += user_report.memories_before
+                report.memories_after += user_report.memories_after
+                report.clusters += user_report.clusters
+        if len(user_ids) < batch_size:
+            break
+        last_user_id = user_ids[-1]
+    logger.info(
+        "Memory consolidation: %d users, %d -> %d memories (shrink %.1f%%), %d clusters",
+        report.users, report.memories_before, report.memories_after, report.shrink_ratio * 100, report.clusters,
+    )
+    return report
+
+async def find_duplicate(db: AsyncSession, user_id: UUID, sig: np.ndarray) -> Optional[UUID]:
+    """
+    Inline near-duplicate check for a new memory with MinHash signature
+    ``sig``. Only the user's memories sharing an LSH band bucket with it are
+    fetched, through the GIN index on lsh_bands, and at most
+    MEMORY_DEDUP_SCAN_LIMIT of those are compared.
+    """
+    result = await db.execute(
+        select(Memory.id, Memory.content)
+        .where(Memory.user_id == user_id, Memory.lsh_bands.overlap(band_keys(sig)))
+        .order_by(Memory.created_at.desc())
+        .limit(settings.MEMORY_DEDUP_SCAN_LIMIT)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    candidates = await memory_signatures([row.content for row in rows])
+    best_id, best_score = None, settings.MEMORY_DEDUP_THRESHOLD
+    for row, candidate in zip(rows, candidates):
+        score = similarity(sig, candidate)
+        if score >= best_score:
+            best_id, best_score = row.id, score
+    return best_id
@@ -0,0 +1,368 @@
+import asyncio
+import fcntl
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from core.config import settings
+from services.embedding import Embedder, get_embedder
+
+logger = logging.getLogger(__name__)
+
+def _kmeans(data: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    # spherical k-means; vectors are unit length so the inner product is cosine
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids /= norms
+    return centroids
+
+def _assign(data: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    out = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk):
+        out[start:start + chunk] = np.argmax(data[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[part], scores[part]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+class MemoryIndex:
+    """
+    Embedding index for one user's memories.
+
+    Vectors live in an append-only float32 file that is memory-mapped for
+    search; ``ids.bin`` maps each row to its memory id and deletes are
+    recorded as row numbers in ``tombstones.bin``. Once trained, an IVF
+    layer (``ivf.npz``) restricts each search to the closest inverted lists.
+
+    Several processes may share the files. Writers append under an exclusive
+    ``flock`` on ``lock`` and take the row count from the file sizes, never
+    from memory, and every operation first catches up on whatever other
+    processes appended. A thread lock guards the in-memory state.
+    """
+    VECTORS = "vectors.f32"
+    IDS = "ids.bin"
+    TOMBSTONES = "tombstones.bin"
+    IVF = "ivf.npz"
+    META = "meta.json"
+    LOCK = "lock"
+
+    def __init__(self, path: Path, dim: int, embedder_name: str):
+        self.path = path
+        self.dim = dim
+        path.mkdir(parents=True, exist_ok=True)
+        self._mutex = threading.Lock()
+        self._rows = 0
+        self._ids: List[UUID] = []
+        self._row_of: Dict[UUID, int] = {}
+        self._alive = np.ones(0, dtype=bool)
+        self._tombstone_bytes = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._mapped_rows = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._list_order = np.empty(0, dtype=np.int64)
+        self._list_bounds = np.empty(0, dtype=np.int64)
+        self._listed_rows = 0
+        self._ivf_version: Optional[Tuple[int, int]] = None
+        with self._mutex, self._flock(fcntl.LOCK_EX):
+            self._check_meta(embedder_name)
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    @contextmanager
+    def _flock(self, operation: int) -> Iterator[None]:
+        with open(self.path / self.LOCK, "ab") as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _size(self, name: str) -> int:
+        try:
+            return (self.path / name).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _truncate(self, name: str, size: int) -> None:
+        if self._size(name) > size:
+            os.truncate(self.path / name, size)
+
+    def _check_meta(self, embedder_name: str) -> None:
+        meta_file = self.path / self.META
+        meta = {"dim": self.dim, "embedder": embedder_name}
+        if meta_file.exists():
+            stored = json.loads(meta_file.read_text())
+            if stored != meta:
+                raise ValueError(f"Index at {self.path} was built with {stored}, not {meta}")
+        else:
+            meta_file.write_text(json.dumps(meta))
+
+    def _sync(self) -> None:
+        """Catch up on rows, tombstones and IVF files written by other processes. Needs the flock."""
+        # a torn append leaves one file longer than the other; only whole rows in both count
+        rows = min(self._size(self.IDS) // 16, self._size(self.VECTORS) // (4 * self.dim))
+        if rows > self._rows:
+            with open(self.path / self.IDS, "rb") as f:
+                f.seek(self._rows * 16)
+                raw = f.read((rows - self._rows) * 16)
+            self._append_rows([UUID(bytes=raw[i:i + 16]) for i in range(0, len(raw), 16)])
+
+        size = self._size(self.TOMBSTONES)
+        if size >= self._tombstone_bytes + 8:
+            with open(self.path / self.TOMBSTONES, "rb") as f:
+                f.seek(self._tombstone_bytes)
+                raw = f.read((size - self._tombstone_bytes) // 8 * 8)
+            self._tombstone_bytes += len(raw)
+            self._kill(np.frombuffer(raw, dtype=np.int64))
+
+        try:
+            stat = (self.path / self.IVF).stat()
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = None
+        if version != self._ivf_version:
+            self._ivf_version = version
+            self._load_ivf()
+
+    def _append_rows(self, memory_ids: Sequence[UUID]) -> None:
+        first = self._rows
+        self._rows += len(memory_ids)
+        self._alive = np.concatenate([self._alive, np.ones(len(memory_ids), dtype=bool)])
+        for offset, memory_id in enumerate(memory_ids):
+            previous = self._row_of.get(memory_id)
+            if previous is not None:
+                self._alive[previous] = False
+            self._row_of[memory_id] = first + offset
+            self._ids.append(memory_id)
+        if self._centroids is not None:
+            self._assignments = np.concatenate([self._assignments, _assign(self._map()[first:], self._centroids)])
+            if self._rows - self._listed_rows > max(50_000, self._rows // 10):
+                self._build_lists()
+
+    def _kill(self, rows: Iterable[int]) -> None:
+        for row in rows:
+            if row < self._rows and self._alive[row]:
+                self._alive[row] = False
+                if self._row_of.get(self._ids[row]) == row:
+                    del self._row_of[self._ids[row]]
+
+    def _map(self) -> np.ndarray:
+        if self._vectors is None or self._mapped_rows != self._rows:
+            if self._rows == 0:
+                self._vectors = np.empty((0, self.dim), dtype=np.float32)
+            else:
+                self._vectors = np.memmap(self.path / self.VECTORS, dtype=np.float32, mode="r", shape=(self._rows, self.dim))
+            self._mapped_rows = self._rows
+        return self._vectors
+
+    def add(self, memory_ids: Sequence[UUID], vectors: np.ndarray) -> None:
+        if not len(memory_ids):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(memory_ids), self.dim)
+        with self._mutex, self._flock(fcntl.LOCK_EX):
+            self._sync()
+            # cut back a torn append so the new rows line up in both files
+            self._truncate(self.VECTORS, self._rows * self.dim * 4)
+            self._truncate(self.IDS, self._rows * 16)
+            with open(self.path / self.VECTORS, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.path / self.IDS, "ab") as f:
+                f.write(b"".join(memory_id.bytes for memory_id in memory_ids))
+            self._append_rows(list(memory_ids))
+
+    def delete(self, memory_ids: Iterable[UUID]) -> int:
+        with self._mutex, self._flock(fcntl.LOCK_EX):
+            self._sync()
+            rows = [self._row_of[memory_id] for memory_id in memory_ids if memory_id in self._row_of]
+            if rows:
+                self._truncate(self.TOMBSTONES, self._tombstone_bytes)
+                raw = np.asarray(rows, dtype=np.int64).tobytes()
+                with open(self.path / self.TOMBSTONES, "ab") as f:
+                    f.write(raw)
+                self._tombstone_bytes += len(raw)
+                self._kill(rows)
+        return len(rows)
+
+    def needs_training(self) -> bool:
+        return self._centroids is None and len(self) >= settings.MEMORY_INDEX_IVF_MIN_VECTORS
+
+    def train_ivf(self, nlist: Optional[int] = None, iterations: int = 10) -> None:
+        """Cluster the live vectors into inverted lists. Slow; runs without the locks held."""
+        with self._mutex, self._flock(fcntl.LOCK_SH):
+            self._sync()
+            vectors = self._map()
+            alive_rows = np.flatnonzero(self._alive)
+        if len(alive_rows) == 0:
+            return
+        nlist = min(nlist or max(16, int(math.sqrt(len(alive_rows)))), len(alive_rows))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(alive_rows, min(len(alive_rows), nlist * 32), replace=False))
+        centroids = _kmeans(np.asarray(vectors[sample_rows]), nlist, iterations)
+        assignments = _assign(vectors, centroids)
+        with self._mutex, self._flock(fcntl.LOCK_EX):
+            staged = self.path / f"{self.IVF}.tmp"
+            with open(staged, "wb") as f:
+                np.savez(f, centroids=centroids, assignments=assignments)
+            os.replace(staged, self.path / self.IVF)
+            self._sync()
+
+    def _load_ivf(self) -> None:
+        file = self.path / self.IVF
+        if not file.exists():
+            return
+        with np.load(file) as data:
+            centroids, assignments = data["centroids"], data["assignments"][:self._rows]
+        if centroids.shape[1] != self.dim:
+            return
+        self._centroids = centroids
+        tail = self._map()[len(assignments):]
+        self._assignments = np.concatenate([assignments, _assign(tail, centroids)]) if len(tail) else assignments
+        self._build_lists()
+
+    def _build_lists(self) -> None:
+        self._list_order = np.argsort(self._assignments, kind="stable")
+        self._list_bounds = np.searchsorted(self._assignments[self._list_order], np.arange(len(self._centroids) + 1))
+        self._listed_rows = len(self._assignments)
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[UUID, float]]:
+        with self._mutex, self._flock(fcntl.LOCK_SH):
+            self._sync()
+            if not len(self) or k <= 0:
+                return []
+            query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+            vectors = self._map()
+            nprobe = nprobe or settings.MEMORY_INDEX_NPROBE
+            if self._centroids is None or nprobe >= len(self._centroids):
+                rows = np.flatnonzero(self._alive)
+                scores = vectors @ query
+                scores = scores[rows]
+            else:
+                probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+                candidates = [self._list_order[self._list_bounds[i]:self._list_bounds[i + 1]] for i in probe]
+                candidates.append(np.arange(self._listed_rows, self._rows))
+                rows = np.sort(np.concatenate(candidates))
+                rows = rows[self._alive[rows]]
+                scores = vectors[rows] @ query
+            rows, scores = _top_k(rows, scores, k)
+            return [(self._ids[row], float(score)) for row, score in zip(rows, scores)]
+
+class MemoryIndexStore:
+    """
+    Per-user memory indexes under one directory, with a bounded set kept
+    open. The async methods run embedding and file I/O in a worker thread.
+    IVF training is left to a background task (``start``) that trains open
+    indexes once they reach MEMORY_INDEX_IVF_MIN_VECTORS.
+    """
+    def __init__(
+        self,
+        root: str,
+        embedder: Embedder,
+        max_open: int = 256,
+        train_interval: float = settings.MEMORY_INDEX_TRAIN_INTERVAL_SECONDS,
+    ):
+        self.root = Path(root)
+        self.embedder = embedder
+        self.max_open = max_open
+        self.train_interval = train_interval
+        self._open: "OrderedDict[UUID, MemoryIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def index(self, user_id: UUID) -> MemoryIndex:
+        with self._lock:
+            index = self._open.get(user_id)
+            if index is not None:
+                self._open.move_to_end(user_id)
+                return index
+        index = MemoryIndex(self.root / str(user_id), self.embedder.dim, self.embedder.name)
+        with self._lock:
+            index = self._open.setdefault(user_id, index)
+            if len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return index
+
+    def _add(self, by_user: Dict[UUID, List[Tuple[UUID, str]]]) -> None:
+        for user_id, batch in by_user.items():
+            vectors = self.embedder.embed([content for _, content in batch])
+            self.index(user_id).add([memory_id for memory_id, _ in batch], vectors)
+
+    async def add_memories(self, memories: Iterable) -> None:
+        by_user: Dict[UUID, List[Tuple[UUID, str]]] = {}
+        for memory in memories:
+            by_user.setdefault(memory.user_id, []).append((memory.id, memory.content))
+        if by_user:
+            await asyncio.to_thread(self._add, by_user)
+
+    async def remove(self, user_id: UUID, memory_ids: Iterable[UUID]) -> int:
+        memory_ids = list(memory_ids)
+        return await asyncio.to_thread(lambda: self.index(user_id).delete(memory_ids))
+
+    def _search(self, user_id: UUID, text: str, k: int) -> List[Tuple[UUID, float]]:
+        return self.index(user_id).search(self.embedder.embed([text])[0], k)
+
+    async def search(self, user_id: UUID, text: str, k: int = 10) -> List[Tuple[UUID, float]]:
+        return await asyncio.to_thread(self._search, user_id, text, k)
+
+    def train_pending(self) -> int:
+        """Train every open index that has grown past the IVF threshold; returns how many."""
+        with self._lock:
+            indexes = list(self._open.values())
+        trained = 0
+        for index in indexes:
+            if index.needs_training():
+                index.train_ivf()
+                trained += 1
+        return trained
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.train_interval)
+            try:
+                trained = await asyncio.to_thread(self.train_pending)
+                if trained:
+                    logger.info("Trained IVF lists for %d memory indexes", trained)
+            except Exception:
+                logger.exception("Memory index training failed")
+
+memory_index = MemoryIndexStore(settings.MEMORY_INDEX_DIR, get_embedder())
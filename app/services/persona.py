@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Union
+from uuid import UUID
+
+from core.config import settings
+from core.metrics import registry
+from models.pal import Pal
+from services.cache_invalidation import cache_invalidation
+
+persona_requests = registry.counter("persona_cache_requests_total", "Pal persona cache lookups", ["result"])
+
+PalLike = Union[Pal, Mapping[str, Any]]
+
+@dataclass(frozen=True, slots=True)
+class Persona:
+    """A pal rendered once into the text the bot prompts with."""
+    pal_id: UUID
+    name: str
+    relationship_status: str
+    prompt: str
+    updated_at: datetime
+
+def _field(pal: PalLike, name: str) -> Any:
+    return pal.get(name) if isinstance(pal, Mapping) else getattr(pal, name)
+
+def _updated_at(pal: PalLike) -> datetime:
+    value = _field(pal, "updated_at")
+    # snapshot pals come out of jsonb with ISO timestamps
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def _traits(values: Optional[Dict[str, Any]]) -> str:
+    return ", ".join(f"{key}: {value}" for key, value in (values or {}).items())
+
+def compile_persona(pal: PalLike) -> Persona:
+    name = _field(pal, "name")
+    relationship_status = _field(pal, "relationship_status")
+    lines = [f"You are {name}."]
+    if _field(pal, "bio"):
+        lines.append(_field(pal, "bio"))
+    lines.append(f"Your relationship with the user: {relationship_status}.")
+    if _field(pal, "personality"):
+        lines.append(f"Personality: {_traits(_field(pal, 'personality'))}.")
+    if _field(pal, "preferences"):
+        lines.append(f"Preferences: {_traits(_field(pal, 'preferences'))}.")
+    pal_id = _field(pal, "id")
+    return Persona(
+        pal_id=UUID(pal_id) if isinstance(pal_id, str) else pal_id,
+        name=name,
+        relationship_status=relationship_status,
+        prompt="\n".join(lines),
+        updated_at=_updated_at(pal),
+    )
+
+class PersonaCache:
+    """
+    Compiled personas keyed by user id. An entry is reused while the pal's
+    ``updated_at`` matches the one it was compiled from; writes to a pal
+    call ``invalidate`` so a persona compiled from a pal read before the
+    write is not stored over it. Invalidation stamps are kept for the
+    ``max_entries`` most recent users; pruning one raises a floor below
+    which stores are refused, so it can only cost a recompile.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[UUID, Persona]" = OrderedDict()
+        self._invalidated: "OrderedDict[UUID, int]" = OrderedDict()
+        self._floor = 0
+        self._version = 0
+
+    def persona_for(self, user_id: UUID, pal: PalLike, version: Optional[int] = None) -> Persona:
+        """
+        Return the persona for an already loaded pal, compiling only if it
+        changed. ``version`` is this cache's ``version()`` read before the pal
+        was loaded; when given, a persona compiled from a pal that a write has
+        since overtaken is returned but not stored.
+        """
+        persona = self._entries.get(user_id)
+        if persona is not None and persona.updated_at == _updated_at(pal):
+            self._entries.move_to_end(user_id)
+            persona_requests.labels("hit").inc()
+            return persona
+        persona_requests.labels("miss" if persona is None else "stale").inc()
+        persona = compile_persona(pal)
+        self._put(user_id, persona, self._version if version is None else version)
+        return persona
+
+    def version(self) -> int:
+        return self._version
+
+    def _put(self, user_id: UUID, persona: Persona, version: int) -> None:
+        if version < self._floor or self._invalidated.get(user_id, 0) > version:
+            return
+        self._entries[user_id] = persona
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[UUID]) -> None:
+        if user_id is not None:
+            self._version += 1
+            self._invalidated[user_id] = self._version
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self.max_entries:
+                _, pruned = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, pruned)
+            self._entries.pop(user_id, None)
+            cache_invalidation.publish("persona", str(user_id))
+
+    def clear(self) -> None:
+        # personas compiled from pals read before now must not be stored
+        self._version += 1
+        self._floor = self._version
+        self._entries.clear()
+
+persona_cache = PersonaCache(max_entries=settings.PERSONA_CACHE_SIZE)
+cache_invalidation.register("persona", lambda key: persona_cache.invalidate(UUID(key)), persona_cache.clear)
@@ -0,0 +1,121 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from core.config import settings
+from core.metrics import registry
+from services.cache_invalidation import cache_invalidation
+from services.persona import Persona
+
+cache_requests = registry.counter("user_context_cache_requests_total", "User context cache lookups", ["result"])
+
+@dataclass(frozen=True, slots=True)
+class UserContextSnapshot:
+    """
+    Everything the bot needs about a user for one turn, assembled by a single
+    query. Nested entities are plain dicts with ids and timestamps decoded
+    back to ``UUID`` and ``datetime``; treat as read-only, the same instance
+    is shared by every cache hit. ``persona`` is the pal compiled into the
+    bot's prompt text, filled in by ``utils.user_data.get_user_context``.
+    """
+    user: Dict[str, Any]
+    pal: Optional[Dict[str, Any]]
+    active_conversation: Optional[Dict[str, Any]]
+    recent_conversations: List[Dict[str, Any]]
+    important_memories: List[Dict[str, Any]]
+    persona: Optional[Persona] = None
+
+    @property
+    def user_id(self) -> UUID:
+        return self.user["id"]
+
+@dataclass(slots=True)
+class UserContextBatch:
+    found: Dict[int, UserContextSnapshot] = field(default_factory=dict)
+    missing: List[int] = field(default_factory=list)
+
+class UserContextCache:
+    """
+    Snapshot cache keyed by Discord id (plus query shape). Writes call
+    ``bump``, which drops the user's entries and stamps the user with the
+    next value of a global version counter; ``put`` takes the version read
+    before the snapshot query and discards snapshots a bump has overtaken.
+
+    Stamps are kept for the ``max_entries`` most recently bumped users. When
+    an older stamp is pruned its version becomes the floor, and puts from
+    loads that started before the floor are discarded too, so pruning can
+    only cost a miss, never serve a stale snapshot. Bumps are sent to the
+    other workers through ``cache_invalidation``.
+    """
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, UserContextSnapshot]]" = OrderedDict()
+        self._keys: Dict[UUID, Set[Hashable]] = {}
+        self._versions: "OrderedDict[UUID, int]" = OrderedDict()
+        self._floor = 0
+        self._version = 0
+
+    def version(self) -> int:
+        return self._version
+
+    def bump(self, user_id: Optional[UUID]) -> None:
+        if user_id is None:
+            return
+        self._version += 1
+        self._versions[user_id] = self._version
+        self._versions.move_to_end(user_id)
+        while len(self._versions) > self.max_entries:
+            _, pruned = self._versions.popitem(last=False)
+            self._floor = max(self._floor, pruned)
+        for key in self._keys.pop(user_id, ()):
+            self._entries.pop(key, None)
+        cache_invalidation.publish("user_context", str(user_id))
+
+    def get(self, key: Hashable) -> Optional[UserContextSnapshot]:
+        entry = self._entries.get(key)
+        if entry is None:
+            cache_requests.labels("miss").inc()
+            return None
+        _, stored_at, snapshot = entry
+        if time.monotonic() - stored_at > self.ttl:
+            self._discard(key, snapshot.user_id)
+            cache_requests.labels("stale").inc()
+            return None
+        self._entries.move_to_end(key)
+        cache_requests.labels("hit").inc()
+        return snapshot
+
+    def put(self, key: Hashable, snapshot: UserContextSnapshot, version: int) -> None:
+        # version must be read before the snapshot query so a concurrent write invalidates it
+        if version < self._floor or self._versions.get(snapshot.user_id, 0) > version:
+            return
+        self._entries[key] = (version, time.monotonic(), snapshot)
+        self._entries.move_to_end(key)
+        self._keys.setdefault(snapshot.user_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            evicted, (_, _, old) = self._entries.popitem(last=False)
+            self._discard(evicted, old.user_id)
+
+    def _discard(self, key: Hashable, user_id: UUID) -> None:
+        self._entries.pop(key, None)
+        keys = self._keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[user_id]
+
+    def clear(self) -> None:
+        # loads already under way must not refill the cache
+        self._version += 1
+        self._floor = self._version
+        self._entries.clear()
+        self._keys.clear()
+
+user_context_cache = UserContextCache(
+    max_entries=settings.USER_CONTEXT_CACHE_SIZE,
+    ttl=settings.USER_CONTEXT_CACHE_TTL_SECONDS,
+)
+cache_invalidation.register("user_context", lambda key: user_context_cache.bump(UUID(key)), user_context_cache.clear)
@@ -3,10 +3,8 @@ from datetime import datetime, timedelta
 
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.config import settings
 from crud.crud_user import user as crud_user
 from crud.crud_conversation import conversation as crud_conversation
 from crud.crud_pal import pal as crud_pal
@@ -17,9 +15,7 @@ from schemas.pal import PalCreate
 from schemas.memory import MemoryCreate
 from models.user import User
 from models.conversation import Conversation
-
-engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+from db.session import SessionLocal, dispose_engine, get_engine
 
 async def create_test_users(db: AsyncSession):
     user_data = [
@@ -71,8 +67,7 @@ async def create_test_conversations(db: AsyncSession, users):
             MessageCreate(content="Tell me about machine learning.", is_from_user=True),
             MessageCreate(content="Machine learning is a subset of artificial intelligence...", is_from_user=False)
         ]
-        for msg in messages:
-            await crud_conversation.add_message(db, conversation_id=db_conv.id, message=msg)
+        await crud_conversation.add_messages(db, conversation_id=db_conv.id, messages=messages)
 
 async def create_test_pals(db: AsyncSession, users):
     for user in users:
@@ -122,7 +117,8 @@ async def create_test_memories(db: AsyncSession, users, conversations):
             print("No conversations found, skipping memory creation.")
 
 async def main():
-    async with AsyncSessionLocal() as session:
+    get_engine()
+    async with SessionLocal() as session:
         # Operations from main_1
         user_ids = await create_test_users(session)
         
@@ -144,6 +140,7 @@ async def main():
             print(f"User's conversations: {[conv.id for conv in user.conversations]}")
         
         await create_test_memories(session, users, conversations)
+    await dispose_engine()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Shared fixtures. Tests that take ``engine``, ``db``, ``user`` or ``client``
+run against the database configured in core.config and are skipped when it
+cannot be reached; everything else runs offline. Every test body is watched
+by core.querywatch_plugin.
+"""
+from random import randint
+
+import asyncpg
+import httpx
+import pytest
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from core import security
+from crud.crud_conversation import conversation as crud_conversation
+from crud.crud_pal import pal as crud_pal
+from crud.crud_user import user as crud_user
+from db.base import Base
+from db.session import SessionLocal, dispose_engine, get_engine
+from main import create_app
+from models.conversation import Conversation, Message
+from models.memory import Memory
+from models.pal import Pal
+from models.token import Token
+from models.user import User
+from schemas.conversation import ConversationCreate
+from schemas.pal import PalCreate
+from schemas.user import UserCreateDiscord
+from services.memory_index import memory_index
+
+pytest_plugins = ["core.querywatch_plugin", "pytester"]
+
+@pytest.fixture(scope="session", autouse=True)
+def memory_index_root(tmp_path_factory):
+    """Keep the memory indexes tests write out of MEMORY_INDEX_DIR."""
+    root, memory_index.root = memory_index.root, tmp_path_factory.mktemp("memory_index")
+    yield memory_index.root
+    memory_index.root = root
+
+@pytest.fixture(scope="session")
+async def engine():
+    engine = get_engine()
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    except (OSError, SQLAlchemyError, asyncpg.PostgresError) as exc:
+        pytest.skip(f"database unreachable: {exc}")
+    yield engine
+    await dispose_engine()
+
+@pytest.fixture
+async def db(engine):
+    async with SessionLocal() as session:
+        yield session
+
+async def delete_user(user_id) -> None:
+    # pal, message and memory foreign keys have no ON DELETE CASCADE
+    conversations = select(Conversation.id).where(Conversation.user_id == user_id).scalar_subquery()
+    async with SessionLocal() as db:
+        await db.execute(update(User).where(User.id == user_id).values(active_conversation_id=None))
+        await db.execute(delete(Message).where(Message.conversation_id.in_(conversations)))
+        await db.execute(delete(Memory).where(Memory.user_id == user_id))
+        await db.execute(delete(Conversation).where(Conversation.user_id == user_id))
+        await db.execute(delete(Pal).where(Pal.user_id == user_id))
+        await db.execute(delete(Token).where(Token.authenticates_id == user_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+@pytest.fixture
+async def user(db):
+    """A Discord user with a pal and three conversations, deleted afterwards."""
+    user = await crud_user.create_with_discord(db, obj_in=UserCreateDiscord(
+        discord_id=randint(10**17, 10**18), name="test", interests=[], personality_traits={},
+    ))
+    try:
+        await crud_pal.create_with_user(db, obj_in=PalCreate(user_identifier=user.id, name="pal", personality={"kind": 0.9}))
+        for _ in range(3):
+            await crud_conversation.create_with_messages(db, obj_in=ConversationCreate(user_identifier=user.id))
+        yield user
+    finally:
+        await delete_user(user.id)
+
+@pytest.fixture
+async def client(user):
+    """An API client authenticated as ``user``. The ASGI transport skips the lifespan."""
+    token = security.create_access_token(subject=user.id)
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        yield client
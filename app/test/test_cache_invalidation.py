@@ -0,0 +1,92 @@
+import asyncio
+from uuid import uuid4
+
+from core.config import settings
+from db.locks import advisory_lock
+from db.session import SessionLocal
+from serve import worker_pool
+from services.cache_invalidation import CacheInvalidationBus, listener_dsn
+from services.identity import IdentityResolver
+from services.memory_budget import BudgetReport, MemoryCompactor
+from services.user_context import UserContextCache, UserContextSnapshot
+
+class Recorder:
+    def __init__(self, bus: CacheInvalidationBus):
+        self.bus = bus
+        self.keys = []
+        self.clears = 0
+        bus.register("test", self.invalidate, self.clear)
+
+    def invalidate(self, key) -> None:
+        self.keys.append(key)
+        # a real cache publishes from its invalidation method too
+        self.bus.publish("test", key)
+
+    def clear(self) -> None:
+        self.clears += 1
+
+async def eventually(condition, timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+async def test_invalidations_reach_other_workers(engine):
+    first, second = CacheInvalidationBus(), CacheInvalidationBus()
+    sent, received = Recorder(first), Recorder(second)
+    for bus in (first, second):
+        bus.start(listener_dsn())
+        await bus.wait_connected()
+    try:
+        assert (sent.clears, received.clears) == (1, 1)
+        keys = [str(uuid4()) for _ in range(400)]  # more than one NOTIFY payload
+        for key in keys:
+            first.publish("test", key)
+        await eventually(lambda: len(received.keys) == len(keys))
+        await asyncio.sleep(0.1)
+        assert received.keys == keys
+        assert sent.keys == []  # not echoed back to the sender
+        assert not second._pending  # applied keys are not sent on again
+    finally:
+        await first.stop()
+        await second.stop()
+
+def test_publish_is_a_noop_until_started():
+    bus = CacheInvalidationBus()
+    bus.publish("test", "key")
+    assert not bus._pending
+
+def test_identity_entries_expire():
+    user_id = uuid4()
+    resolver = IdentityResolver(max_entries=10, ttl=60, negative_ttl=1)
+    resolver._store(user_id, 42)
+    assert resolver._lookup(42) == resolver._lookup(user_id) == (user_id, 42)
+    resolver.ttl = -1
+    resolver._store(user_id, 42)
+    assert resolver._lookup(42) is None
+    assert resolver._lookup(user_id) is None
+
+def test_clear_refuses_loads_already_under_way():
+    cache = UserContextCache(max_entries=10, ttl=60)
+    snapshot = UserContextSnapshot(
+        user={"id": uuid4()}, pal=None, active_conversation=None, recent_conversations=[], important_memories=[],
+    )
+    version = cache.version()
+    cache.clear()
+    cache.put("key", snapshot, version)
+    assert cache.get("key") is None
+    cache.put("key", snapshot, cache.version())
+    assert cache.get("key") is snapshot
+
+async def test_background_jobs_run_in_one_worker(engine):
+    async with advisory_lock(engine, MemoryCompactor.LOCK) as held:
+        assert held is not None
+        async with advisory_lock(engine, MemoryCompactor.LOCK) as other:
+            assert other is None
+        assert await MemoryCompactor(interval=60).run_once(None, engine) is None
+    # a pass runs on the connection that holds the lock
+    assert isinstance(await MemoryCompactor(interval=60).run_once(SessionLocal, engine), BudgetReport)
+
+def test_worker_pool_reserves_the_listener(monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+    assert worker_pool(40, 1).pool_size == 40
+    assert worker_pool(40, 4).pool_size == 9
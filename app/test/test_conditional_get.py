@@ -0,0 +1,44 @@
+import pytest
+
+from core.config import settings
+from core.querywatch import watch_queries
+from crud.crud_conversation import conversation as crud_conversation
+from schemas.conversation import ConversationCreate
+
+PATHS = ["/users/me", "/users/me?expand=pal,conversations", "/pals/me", "/conversations/"]
+
+async def get(client, path, **headers):
+    """The response and the number of statements it took."""
+    with watch_queries() as watch:
+        response = await client.get(f"{settings.API_V1_STR}{path}", headers=headers)
+    return response, sum(watch.counts.values())
+
+@pytest.mark.parametrize("path", PATHS)
+async def test_revalidation_skips_body_and_queries(client, path):
+    plain, plain_statements = await get(client, path)
+    assert plain.status_code == 200
+    etag = plain.headers["etag"]
+    assert plain.headers["cache-control"]
+
+    revalidated, revalidated_statements = await get(client, path, **{"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    assert revalidated_statements <= plain_statements
+    if "expand" in path or path == "/pals/me":
+        assert revalidated_statements < plain_statements
+
+async def test_representations_have_their_own_tags(client):
+    whole, _ = await get(client, "/users/me")
+    sparse, _ = await get(client, "/users/me?fields=id,name")
+    assert whole.headers["etag"] != sparse.headers["etag"]
+    response, _ = await get(client, "/users/me?fields=id,name", **{"If-None-Match": whole.headers["etag"]})
+    assert response.status_code == 200
+
+async def test_changes_invalidate_the_tag(client, db, user):
+    first, _ = await get(client, "/conversations/")
+    await crud_conversation.create_with_messages(db, obj_in=ConversationCreate(user_identifier=user.id))
+    second, _ = await get(client, "/conversations/", **{"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert len(second.json()) == len(first.json()) + 1
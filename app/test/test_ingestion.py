@@ -0,0 +1,88 @@
+from random import randint
+from typing import List
+
+import pytest
+
+from db.session import SessionLocal
+from services.ingestion import GatewayMessage, MessageIngestor, WriteResult, database_writer, ingested
+
+OUTCOMES = ("inserted", "duplicate", "redelivered", "unknown_user", "retried", "dead_letter", "failed")
+
+def event(message_id: int, user_discord_id: int = 1) -> GatewayMessage:
+    return GatewayMessage(message_id=message_id, user_discord_id=user_discord_id, channel_id=10, content=f"m{message_id}")
+
+def outcomes() -> dict:
+    return {outcome: ingested.labels(outcome).value for outcome in OUTCOMES}
+
+def counted(before: dict) -> dict:
+    return {outcome: value - before[outcome] for outcome, value in outcomes().items() if value != before[outcome]}
+
+class FakeWriter:
+    """Stores each message id once, skips user 0, and fails the first ``failures`` calls."""
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+        self.stored: set = set()
+
+    async def __call__(self, events: List[GatewayMessage]) -> WriteResult:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("database unavailable")
+        known = [event for event in events if event.user_discord_id != 0]
+        new = {event.message_id for event in known} - self.stored
+        self.stored |= new
+        return WriteResult(inserted=len(new), skipped=len(events) - len(known))
+
+def ingestor(writer, **kwargs) -> MessageIngestor:
+    return MessageIngestor(writer, batch_size=100, flush_interval=0.01, retry_backoff=0.001, **kwargs)
+
+async def test_outcomes_are_counted_once():
+    writer = FakeWriter()
+    writer.stored.add(2)  # already written by an earlier batch
+    pipeline = ingestor(writer)
+    before = outcomes()
+    await pipeline._flush([event(1), event(1), event(2), event(3), event(4, user_discord_id=0)])
+    assert counted(before) == {"inserted": 2, "duplicate": 1, "redelivered": 1, "unknown_user": 1}
+    assert writer.stored == {1, 2, 3}
+
+async def test_failed_batch_is_retried():
+    writer = FakeWriter(failures=2)
+    pipeline = ingestor(writer, max_retries=3)
+    before = outcomes()
+    await pipeline._flush([event(1), event(2)])
+    assert writer.calls == 3
+    assert writer.stored == {1, 2}
+    assert counted(before) == {"retried": 4, "inserted": 2}
+    assert not pipeline.dead_letters
+
+async def test_exhausted_batch_is_dead_lettered_and_requeued():
+    writer = FakeWriter(failures=3)
+    pipeline = ingestor(writer, max_retries=2, dead_letter_size=2)
+    before = outcomes()
+    await pipeline._flush([event(1), event(2), event(3)])
+    assert writer.stored == set()
+    assert [dead.message_id for dead in pipeline.dead_letters] == [2, 3]
+    assert counted(before) == {"retried": 6, "dead_letter": 3, "failed": 1}
+
+    pipeline.start()
+    assert await pipeline.requeue_dead_letters() == 2
+    await pipeline.stop()
+    assert writer.stored == {2, 3}
+    assert not pipeline.dead_letters
+
+@pytest.mark.parametrize("count", [1, 250])
+async def test_worker_writes_everything_queued_before_stop(count):
+    writer = FakeWriter()
+    pipeline = ingestor(writer)
+    pipeline.start()
+    for message_id in range(count):
+        await pipeline.submit(event(message_id))
+    await pipeline.stop()
+    assert writer.stored == set(range(count))
+
+async def test_database_writer_reports_duplicates_and_unknown_users(user):
+    write = database_writer(SessionLocal)
+    first = randint(10**17, 10**18)
+    events = [event(first + n, user_discord_id=user.discord_id) for n in range(3)]
+    assert await write(events + [event(first + 3, user_discord_id=0)]) == WriteResult(inserted=3, skipped=1)
+    assert await write(events[1:] + [event(first + 4, user_discord_id=user.discord_id)]) == WriteResult(inserted=1)
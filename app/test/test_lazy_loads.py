@@ -0,0 +1,77 @@
+"""
+Guards against hidden per-row relationship loads: every mapped relationship
+is lazy="raise", every load profile names real relationships, default
+renderings never touch a relationship, and no endpoint runs a statement per
+row (the query-watch plugin fails any test that does).
+"""
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import configure_mappers, make_transient_to_detached
+
+import models
+import schemas
+from api.sparse import SparseFields, render
+from core.config import settings
+from crud.crud_conversation import conversation as crud_conversation
+from crud.loading import PROFILES
+from db.base_class import Base
+from schemas.conversation import ConversationCreate, MessageCreate
+
+def test_relationships_raise():
+    configure_mappers()
+    lazy = [
+        f"{mapper.class_.__name__}.{relationship.key} (lazy={relationship.lazy!r})"
+        for mapper in Base.registry.mappers
+        for relationship in mapper.relationships
+        if relationship.lazy != "raise"
+    ]
+    assert lazy == []
+
+@pytest.mark.parametrize("name", sorted(PROFILES))
+def test_profile_paths_exist(name):
+    profile = PROFILES[name]
+    for path in profile.paths:
+        current = profile.model
+        for part in path.split("."):
+            relationship = sa_inspect(current).relationships.get(part)
+            assert relationship is not None, f"{current.__name__} has no relationship {part!r} ({path})"
+            current = relationship.mapper.class_
+
+def detached(obj):
+    # a detached object with every column set behaves like one loaded without
+    # eager options: reading columns is free, any relationship access raises
+    for column in sa_inspect(type(obj)).column_attrs:
+        if column.key not in obj.__dict__:
+            setattr(obj, column.key, None)
+    make_transient_to_detached(obj)
+    return obj
+
+def test_default_renderings_load_nothing():
+    user = detached(models.User(
+        id=uuid4(), discord_id=1, name="check", interests=[], personality_traits={}, hashed_password="hash",
+    ))
+    pal = detached(models.Pal(id=uuid4(), user_id=user.id, name="pal", personality={}, relationship_status="Just met"))
+    render(user, schemas.User, SparseFields())
+    render(pal, schemas.Pal, SparseFields())
+
+@pytest.fixture
+async def conversations(db, user):
+    """More conversations and messages than the query-watch threshold, so a per-row load fails the test."""
+    for n in range(settings.QUERY_WATCH_THRESHOLD + 2):
+        conversation = await crud_conversation.create_with_messages(db, obj_in=ConversationCreate(user_identifier=user.id))
+        await crud_conversation.add_messages(db, conversation_id=conversation.id, messages=[
+            MessageCreate(content=f"hello {n}", is_from_user=True),
+            MessageCreate(content=f"hi {n}", is_from_user=False),
+        ])
+
+@pytest.mark.parametrize("path", [
+    "/users/me",
+    "/users/me?expand=pal,conversations.messages",
+    "/pals/me",
+    "/conversations/",
+])
+async def test_endpoints_load_relationships_in_batches(client, conversations, path):
+    response = await client.get(f"{settings.API_V1_STR}{path}")
+    assert response.status_code == 200, response.text
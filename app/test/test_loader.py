@@ -0,0 +1,51 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from crud.crud_user import user as crud_user
+from crud.loader import Loader, Loaders, crud_loader
+from db.session import SessionLocal
+
+async def test_keys_in_one_tick_share_a_batch():
+    batches = []
+
+    async def batch_fn(keys):
+        batches.append(sorted(keys))
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = Loader(batch_fn, name="test")
+    assert await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(3)) == [10, 20, 10, None]
+    assert batches == [[1, 2, 3]]
+
+async def test_batches_on_one_lock_never_overlap():
+    running, overlaps = 0, 0
+
+    async def batch_fn(keys):
+        nonlocal running, overlaps
+        running += 1
+        overlaps += running > 1
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {}
+
+    lock = asyncio.Lock()
+    first, second = (Loader(batch_fn, name=name, max_batch=2, lock=lock) for name in ("a", "b"))
+    await asyncio.gather(*(loader.load(key) for loader in (first, second) for key in range(5)))
+    assert overlaps == 0
+
+async def test_loaders_share_one_session(engine, user):
+    async with SessionLocal() as db:
+        loaders = Loaders(db=db)
+        loaders.user.max_batch = 2
+        ids = [user.id] + [uuid4() for _ in range(6)]
+        users, pal, conversation = await asyncio.gather(
+            loaders.user.load_many(ids), loaders.pal.load(user.id), loaders.conversation.load(uuid4()),
+        )
+    assert [found.id if found else None for found in users] == [user.id] + [None] * 6
+    assert pal.user_id == user.id
+    assert conversation is None
+
+def test_crud_loader_needs_one_source():
+    with pytest.raises(ValueError):
+        crud_loader(crud_user)
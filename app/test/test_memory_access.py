@@ -0,0 +1,50 @@
+import asyncio
+from uuid import uuid4
+
+from services.memory_access import BULK_TOUCH, MemoryAccessTracker
+
+class SlowSession:
+    """Stands in for AsyncSession; each bulk UPDATE takes ``delay`` seconds."""
+    def __init__(self, written: list, delay: float, started: asyncio.Event):
+        self.written = written
+        self.delay = delay
+        self.started = started
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, parameters=None):
+        if statement is BULK_TOUCH:
+            self.started.set()
+            await asyncio.sleep(self.delay)
+            self.written.extend(parameters["ids"])
+
+    async def commit(self):
+        pass
+
+async def test_stop_waits_for_the_flush_in_flight():
+    written, started = [], asyncio.Event()
+    tracker = MemoryAccessTracker(flush_interval=60, max_pending=2)
+    tracker.start(lambda: SlowSession(written, 0.05, started))
+    first = [uuid4(), uuid4()]
+    tracker.record_many(first)  # reaching max_pending wakes the flusher
+    await started.wait()
+    late = [uuid4()]
+    tracker.record_many(late)
+    await tracker.stop()
+    assert sorted(written) == sorted(first + late)
+    assert not tracker._pending
+
+async def test_cancelled_flush_keeps_its_batch():
+    written, started = [], asyncio.Event()
+    tracker = MemoryAccessTracker(flush_interval=60, max_pending=100)
+    ids = [uuid4(), uuid4()]
+    tracker.record_many(ids)
+    flush = asyncio.create_task(tracker.flush(SlowSession(written, 1, started)))
+    await started.wait()
+    flush.cancel()
+    await asyncio.gather(flush, return_exceptions=True)
+    assert set(tracker._pending) == set(ids)
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import select, update
+
+from core.config import settings
+from crud.crud_memory import memory as crud_memory
+from models.memory import Memory
+from schemas.memory import MemoryCreate
+from services.memory_consolidation import consolidate_user
+from utils.minhash import band_keys, find_clusters, signatures, similarity
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike "
+    "november oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu"
+).split() * 2
+
+def edited(words, start, prefix):
+    words = list(words)
+    for i in range(start, len(words), 13):
+        words[i] = f"{prefix}{i}"
+    return words
+
+# each text is one edit pass away from the previous one, two passes from the first
+FIRST = " ".join(WORDS)
+SECOND = " ".join(edited(WORDS, 0, "zz"))
+THIRD = " ".join(edited(edited(WORDS, 0, "zz"), 6, "yy"))
+
+def test_clusters_do_not_chain():
+    sigs = signatures([FIRST, SECOND, THIRD])
+    threshold = settings.MEMORY_DEDUP_THRESHOLD
+    assert similarity(sigs[0], sigs[1]) >= threshold
+    assert similarity(sigs[1], sigs[2]) >= threshold
+    assert similarity(sigs[0], sigs[2]) < threshold
+    assert find_clusters(sigs, threshold) == [[0, 1]]
+
+def test_similar_texts_share_a_band():
+    first, second = signatures([FIRST, SECOND])
+    assert set(band_keys(first)) & set(band_keys(second))
+    assert not set(band_keys(first)) & set(band_keys(signatures(["something else entirely"])[0]))
+
+@pytest.fixture
+async def conversation_id(db, user):
+    return user.active_conversation_id
+
+async def test_near_duplicate_is_folded_on_insert(db, user, conversation_id):
+    first = await crud_memory.create_with_user(db, obj_in=MemoryCreate(
+        user_identifier=user.id, conversation_id=conversation_id, content=FIRST, importance=3,
+    ))
+    assert first.lsh_bands == band_keys(signatures([FIRST])[0])
+    folded = await crud_memory.create_with_user(db, obj_in=MemoryCreate(
+        user_identifier=user.id, conversation_id=conversation_id, content=SECOND, importance=8,
+    ))
+    assert (folded.id, folded.importance) == (first.id, 8)
+    other = await crud_memory.create_with_user(db, obj_in=MemoryCreate(
+        user_identifier=user.id, conversation_id=conversation_id, content="likes green tea", importance=2,
+    ))
+    assert other.id != first.id
+
+async def test_consolidation_backfills_bands_and_merges(db, user, conversation_id):
+    memories = await crud_memory.create_multi_with_user(db, objs_in=[
+        MemoryCreate(user_identifier=user.id, conversation_id=conversation_id, content=content, importance=importance)
+        for content, importance in ((FIRST, 5), (SECOND, 4), (THIRD, 2), ("likes green tea", 1))
+    ])
+    await db.execute(update(Memory).where(Memory.user_id == user.id).values(lsh_bands=None))
+    await db.commit()
+
+    report = await consolidate_user(db, user.id)
+    assert (report.memories_before, report.memories_after, report.clusters) == (4, 3, 1)
+    rows = (await db.execute(
+        select(Memory.id, Memory.lsh_bands).where(Memory.user_id == user.id).execution_options(populate_existing=True)
+    )).all()
+    assert {row.id for row in rows} == {memories[0].id, memories[2].id, memories[3].id}
+    assert all(row.lsh_bands for row in rows)
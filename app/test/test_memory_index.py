@@ -0,0 +1,91 @@
+import multiprocessing
+from types import SimpleNamespace
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from core.config import settings
+from services.embedding import HashingEmbedder
+from services.memory_index import MemoryIndex, MemoryIndexStore
+
+DIM = 8
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    data = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+def open_index(path) -> MemoryIndex:
+    return MemoryIndex(path, DIM, "test")
+
+def test_instances_see_each_others_writes(tmp_path):
+    # two instances on one directory stand in for two worker processes
+    first, second = open_index(tmp_path), open_index(tmp_path)
+    ids = [uuid4() for _ in range(4)]
+    data = vectors(4)
+    first.add(ids[:2], data[:2])
+    second.add(ids[2:], data[2:])
+    first.add([ids[0]], data[3:])  # re-adding replaces the older row
+
+    for index in (first, second):
+        assert index.search(data[2], k=1)[0][0] == ids[2]
+        assert len(index) == 4
+    assert second.delete([ids[2]]) == 1
+    assert ids[2] not in {memory_id for memory_id, _ in first.search(data[2], k=4)}
+    assert len(open_index(tmp_path)) == len(first) == 3
+
+def test_torn_append_is_cut_back(tmp_path):
+    index = open_index(tmp_path)
+    ids = [uuid4(), uuid4()]
+    index.add(ids[:1], vectors(1))
+    with open(tmp_path / MemoryIndex.VECTORS, "ab") as f:
+        f.write(b"\0" * 12)  # a writer died part-way through a row
+    index.add(ids[1:], vectors(1, seed=1))
+    assert (tmp_path / MemoryIndex.VECTORS).stat().st_size == 2 * DIM * 4
+    assert [memory_id for memory_id, _ in open_index(tmp_path).search(vectors(1, seed=1)[0], k=1)] == [ids[1]]
+
+def _append(path, count, seed):
+    open_index(path).add([uuid4() for _ in range(count)], vectors(count, seed))
+
+def test_concurrent_processes_append_whole_rows(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_append, args=(tmp_path, 1, seed)) for seed in range(40)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert (tmp_path / MemoryIndex.VECTORS).stat().st_size == 40 * DIM * 4
+    assert len(open_index(tmp_path)) == 40
+
+def test_training_is_left_to_the_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MEMORY_INDEX_IVF_MIN_VECTORS", 64)
+    store = MemoryIndexStore(str(tmp_path), HashingEmbedder(dim=DIM))
+    user_id = uuid4()
+    index = store.index(user_id)
+    index.add([uuid4() for _ in range(100)], vectors(100))
+    assert index.needs_training()
+    assert not (tmp_path / str(user_id) / MemoryIndex.IVF).exists()
+
+    other = MemoryIndex(tmp_path / str(user_id), DIM, "hashing-v1")
+    assert store.train_pending() == 1
+    assert not index.needs_training()
+    other.search(vectors(1)[0], k=5, nprobe=2)
+    assert other._centroids is not None
+
+async def test_store_runs_off_the_event_loop(tmp_path):
+    store = MemoryIndexStore(str(tmp_path), HashingEmbedder(dim=64))
+    user_id = uuid4()
+    memories = [
+        SimpleNamespace(id=uuid4(), user_id=user_id, content=content)
+        for content in ("loves hiking in the alps", "allergic to peanuts", "plays the cello")
+    ]
+    await store.add_memories(memories)
+    [(best, _)] = await store.search(user_id, "hiking the alps", k=1)
+    assert best == memories[0].id
+    assert await store.remove(user_id, [memories[0].id]) == 1
+    assert memories[0].id not in {memory_id for memory_id, _ in await store.search(user_id, "hiking", k=3)}
+
+@pytest.mark.parametrize("k", [0, 1])
+def test_empty_index_finds_nothing(tmp_path, k):
+    assert open_index(tmp_path).search(vectors(1)[0], k=k) == []
@@ -0,0 +1,62 @@
+from uuid import uuid4
+
+from core.querywatch import APP_ROOT, QueryWatch, normalize, watch_queries
+from crud.crud_user import user as crud_user
+
+def test_normalize_folds_values():
+    assert normalize("SELECT * FROM pal WHERE id = $1") == normalize("SELECT  *\nFROM pal WHERE id = $7")
+    assert normalize("SELECT 'a', 1 FROM t") == "SELECT ?, ? FROM t"
+    assert normalize("SELECT * FROM t WHERE id IN ($1, $2, $3)") == "SELECT * FROM t WHERE id IN (?)"
+    assert normalize("INSERT INTO t VALUES ($1), ($2)") == "INSERT INTO t VALUES (?)"
+
+def test_repeated_over_threshold():
+    watch = QueryWatch(threshold=2)
+    for statement in ("SELECT 1", "SELECT 2", "SELECT 3", "SELECT * FROM t"):
+        watch.record(statement)
+    [query] = watch.repeated()
+    assert (query.shape, query.count) == ("SELECT ?", 3)
+    assert "test_querywatch.py" in watch.report()
+
+async def test_per_row_queries_are_attributed(db):
+    with watch_queries(threshold=3) as watch:
+        for _ in range(5):
+            await crud_user.get(db, id=uuid4())
+    [query] = watch.repeated()
+    assert query.count == 5
+    assert any(frame.filename.endswith("crud_base.py") for frame in query.stack)
+
+# the plugin runs in a subprocess so the outer test's watch does not leak into it
+
+def test_plugin_fails_repeating_test(pytester, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", APP_ROOT)
+    pytester.makepyfile(
+        """
+        import pytest
+        from core.querywatch import query_watch
+
+        def test_loop():
+            for n in range(6):
+                query_watch.get().record(f"SELECT {n}")
+
+        @pytest.mark.query_threshold(10)
+        def test_raised_limit():
+            for n in range(6):
+                query_watch.get().record(f"SELECT {n}")
+        """
+    )
+    result = pytester.runpytest_subprocess("-p", "core.querywatch_plugin", "--query-threshold", "5")
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(["*statements repeated more than 5 times*", "*6x SELECT ?*"])
+
+def test_plugin_can_be_disabled(pytester, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", APP_ROOT)
+    pytester.makepyfile(
+        """
+        from core.querywatch import query_watch
+
+        def test_unwatched():
+            assert query_watch.get() is None
+        """
+    )
+    result = pytester.runpytest_subprocess("-p", "core.querywatch_plugin", "--no-query-watch")
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,68 @@
+import asyncio
+from random import randint
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from crud.crud_media import media as crud_media
+from crud.crud_pal import pal as crud_pal
+from crud.crud_user import user as crud_user
+from db.session import SessionLocal
+from models.media import Media
+from models.pal import Pal
+from models.user import User
+from schemas.conversation import MediaCreate, MediaType
+from schemas.pal import PalCreate
+from schemas.user import UserCreateDiscord
+
+WORKERS = 50
+
+async def race(upsert):
+    async def one():
+        async with SessionLocal() as db:
+            return await upsert(db)
+    return await asyncio.gather(*(one() for _ in range(WORKERS)))
+
+async def count(model, *where) -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(model).where(*where))
+
+@pytest.fixture
+async def discord_id(engine):
+    discord_id = randint(10**17, 10**18)
+    yield discord_id
+    async with SessionLocal() as db:
+        await db.execute(delete(Pal).where(Pal.discord_id == discord_id))
+        await db.execute(delete(User).where(User.discord_id == discord_id))
+        await db.execute(delete(Media).where(Media.url == f"https://example.com/{discord_id}.gif"))
+        await db.commit()
+
+@pytest.mark.query_threshold(WORKERS * 2)
+async def test_racing_upserts_make_one_row(discord_id):
+    users = await race(lambda db: crud_user.upsert_discord(db, obj_in=UserCreateDiscord(
+        discord_id=discord_id, name="race", interests=[], personality_traits={},
+    )))
+    assert len({user.id for user in users}) == 1
+    assert await count(User, User.discord_id == discord_id) == 1
+
+    pals = await race(lambda db: crud_pal.upsert_by_user(db, obj_in=PalCreate(
+        user_identifier=discord_id, name="race", personality={},
+    )))
+    assert len({pal.id for pal in pals}) == 1
+    assert await count(Pal, Pal.discord_id == discord_id) == 1
+
+    url = f"https://example.com/{discord_id}.gif"
+    media = await race(lambda db: crud_media.upsert_by_url(db, obj_in=MediaCreate(url=url, type=MediaType.GIF)))
+    assert len({row.id for row in media}) == 1
+    assert await count(Media, Media.url == url) == 1
+
+async def test_upsert_reports_insert_and_updates_only_named_fields(db, discord_id):
+    values = {"discord_id": discord_id, "name": "first", "interests": [], "personality_traits": {}}
+    created, inserted = await crud_user.upsert(db, values=values, conflict=["discord_id"])
+    assert inserted
+    existing, inserted = await crud_user.upsert(db, values={**values, "name": "second"}, conflict=["discord_id"])
+    assert (existing.id, existing.name, inserted) == (created.id, "first", False)
+    updated, inserted = await crud_user.upsert(
+        db, values={**values, "name": "third"}, conflict=["discord_id"], update_fields=["name"]
+    )
+    assert (updated.id, updated.name, inserted) == (created.id, "third", False)
@@ -0,0 +1,23 @@
+from sqlalchemy import Float, Text, cast, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.sql.elements import ColumnElement
+
+from schemas.patch import JSONBPatch
+
+def jsonb_patch(column, patch: JSONBPatch) -> ColumnElement:
+    """
+    SQL expression for ``column`` with ``patch`` applied, for use as an
+    UPDATE value. Increments read the row's current value, so concurrent
+    patches to the same key do not lose updates.
+    """
+    value = func.coalesce(column, func.jsonb_build_object(type_=JSONB), type_=JSONB)
+    if patch.remove:
+        value = value.op("-", return_type=JSONB)(literal(patch.remove, ARRAY(Text)))
+    if patch.merge:
+        value = value.op("||", return_type=JSONB)(literal(patch.merge, JSONB))
+    for key, delta in patch.increment.items():
+        current = func.coalesce(cast(column[key].astext, Float), 0)
+        value = func.jsonb_set(
+            value, literal([key], ARRAY(Text)), func.to_jsonb(current + literal(delta, Float)), type_=JSONB
+        )
+    return value
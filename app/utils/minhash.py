@@ -0,0 +1,87 @@
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence, Set
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+MAX_BUCKET = 64
+
+_SPACES = re.compile(r"\s+")
+_rng = np.random.default_rng(0x5A7)
+# odd multipliers for a multiply-add hash family over uint64 (wraps mod 2**64)
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    text = _SPACES.sub(" ", text.lower()).strip()
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def signature(text: str) -> np.ndarray:
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles(text)),
+        dtype=np.uint64,
+    )
+    with np.errstate(over="ignore"):
+        return (hashes[:, None] * _A + _B).min(axis=0)
+
+def signatures(texts: Sequence[str]) -> np.ndarray:
+    if not texts:
+        return np.empty((0, NUM_PERM), dtype=np.uint64)
+    return np.stack([signature(text) for text in texts])
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+def band_keys(sig: np.ndarray) -> List[int]:
+    """
+    One signed 64-bit key per LSH band of ``sig``; two signatures share a key
+    when they agree on every row of that band. Stored as bigint[] so the
+    database can probe buckets with ``&&``.
+    """
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+def find_clusters(sigs: np.ndarray, threshold: float) -> List[List[int]]:
+    """
+    Group rows of ``sigs`` into clusters whose members are each at least
+    ``threshold`` similar to the cluster's representative (its first row),
+    so a chain of pairwise-similar rows cannot pull in unrelated ones. A row
+    joins the most similar representative sharing an LSH band bucket with
+    it, or starts a cluster; buckets hold at most MAX_BUCKET representatives.
+    """
+    buckets: Dict[int, List[int]] = defaultdict(list)
+    clusters: Dict[int, List[int]] = {}
+    for i, sig in enumerate(sigs):
+        keys = band_keys(sig)
+        best, best_score, seen = None, threshold, set()
+        for key in keys:
+            for representative in buckets.get(key, ()):
+                if representative in seen:
+                    continue
+                seen.add(representative)
+                score = similarity(sig, sigs[representative])
+                if score >= best_score:
+                    best, best_score = representative, score
+        if best is not None:
+            clusters[best].append(i)
+            continue
+        clusters[i] = [i]
+        for key in keys:
+            bucket = buckets[key]
+            if len(bucket) < MAX_BUCKET:
+                bucket.append(i)
+    return [members for members in clusters.values() if len(members) > 1]
@@ -1,21 +1,85 @@
 # utils/user_data.py
 
+from dataclasses import replace
+from typing import Any, Dict, Iterable, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import UUID
 from crud.crud_user import user as user_crud
+from crud.crud_conversation import conversation as conversation_crud
 from crud.crud_memory import memory as memory_crud
+from services.persona import persona_cache
+from services.user_context import UserContextBatch, UserContextSnapshot, user_context_cache
 
-async def get_user_discord_data(db: AsyncSession, discord_id: int, recent_conversations_limit: int = 5):
-    user_data = await user_crud.get_user_data_by_discord_id(db, discord_id, recent_conversations_limit)
+async def get_user_discord_data(
+    db: AsyncSession, discord_id: int, recent_conversations_limit: int = 5
+) -> Optional[Dict[str, Any]]:
+    """
+    The user's ORM objects: ``user``, ``pal``, ``active_conversation`` (with
+    its messages), ``recent_conversations`` and ``important_memories``. For
+    the read-only, cached form of the same data use ``get_user_context``.
+    """
+    user_data = await user_crud.get_user_data_by_discord_id(db, discord_id)
     if not user_data:
         return None
 
+    recent_conversations = await conversation_crud.get_recent_by_user(db, user_data.id, limit=recent_conversations_limit)
     important_memories = await memory_crud.get_by_importance(db, user_data.id, min_importance=7)
+    memory_crud.access_memories(memory.id for memory in important_memories)
 
     return {
         "user": user_data,
         "pal": user_data.pal,
         "active_conversation": user_data.active_conversation,
-        "recent_conversations": user_data.conversations,
+        "recent_conversations": recent_conversations,
         "important_memories": important_memories
     }
+
+def _with_persona(snapshot: UserContextSnapshot, persona_version: int) -> UserContextSnapshot:
+    if snapshot.pal is None:
+        return snapshot
+    return replace(snapshot, persona=persona_cache.persona_for(snapshot.user_id, snapshot.pal, persona_version))
+
+async def get_user_context(
+    db: AsyncSession, discord_id: int, recent_conversations_limit: int = 5
+) -> Optional[UserContextSnapshot]:
+    """
+    The user's context as a read-only snapshot, with the pal's compiled
+    persona: one query on a miss, none on a hit.
+    """
+    key = (discord_id, recent_conversations_limit)
+    snapshot = user_context_cache.get(key)
+    if snapshot is None:
+        version, persona_version = user_context_cache.version(), persona_cache.version()
+        snapshot = await user_crud.get_user_context_by_discord_id(db, discord_id, recent_conversations_limit)
+        if snapshot is None:
+            return None
+        snapshot = _with_persona(snapshot, persona_version)
+        user_context_cache.put(key, snapshot, version)
+
+    memory_crud.access_memories(memory["id"] for memory in snapshot.important_memories)
+    return snapshot
+
+async def get_user_contexts(
+    db: AsyncSession, discord_ids: Iterable[int], recent_conversations_limit: int = 5
+) -> UserContextBatch:
+    batch = UserContextBatch()
+    to_load = []
+    for discord_id in dict.fromkeys(discord_ids):
+        snapshot = user_context_cache.get((discord_id, recent_conversations_limit))
+        if snapshot is None:
+            to_load.append(discord_id)
+        else:
+            batch.found[discord_id] = snapshot
+
+    if to_load:
+        version, persona_version = user_context_cache.version(), persona_cache.version()
+        loaded = await user_crud.get_user_contexts_by_discord_ids(db, to_load, recent_conversations_limit)
+        for discord_id, snapshot in loaded.found.items():
+            snapshot = _with_persona(snapshot, persona_version)
+            user_context_cache.put((discord_id, recent_conversations_limit), snapshot, version)
+            batch.found[discord_id] = snapshot
+        batch.missing = loaded.missing
+
+    memory_crud.access_memories(
+        memory["id"] for snapshot in batch.found.values() for memory in snapshot.important_memories
+    )
+    return batch